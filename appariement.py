@@ -0,0 +1,57 @@
+import argparse
+import time
+
+from src.appariement import (
+    FICHIER_CORRESPONDANCES, SEUIL_AUTO, SEUIL_CANDIDAT, charger_correspondances,
+    proposer_correspondances,
+)
+from src.build_bases import (
+    build_dim_musees, build_fact_freq_excel, build_fact_frequentation, load_raw_source,
+)
+from src.profilage import definir_apercus
+
+
+def main(seuil_auto: float = SEUIL_AUTO, seuil: float = SEUIL_CANDIDAT, sortie: str = None,
+         valider_auto: bool = False):
+    definir_apercus(False)
+    debut = time.perf_counter()
+    chemin = sortie or FICHIER_CORRESPONDANCES
+
+    #Tables brutes, sans les corrections de la table actuelle
+    musees = build_dim_musees(load_raw_source("museo_raw"))
+    fact_freq = build_fact_frequentation(load_raw_source("ent_raw"))
+    fact_excel = build_fact_freq_excel(load_raw_source("freq_raw"))
+
+    #Les décisions déjà relues (valide = oui / non) sont conservées
+    table = proposer_correspondances(
+        musees, fact_freq, fact_excel, existantes=charger_correspondances(chemin),
+        seuil_auto=seuil_auto, seuil=seuil, valider_auto=valider_auto,
+    )
+    table.to_csv(chemin, index=False)
+
+    print(f"{len(table)} paires proposées en {time.perf_counter() - debut:.2f} s")
+    print(table.groupby(["lien", "statut"]).size().to_string())
+    a_relire = table[table["valide"] == ""]
+    if len(a_relire):
+        print("\nÀ relire (colonne valide : oui / non) :")
+        print(a_relire[["lien", "cle_source", "nom_source", "cle_cible", "nom_cible", "score"]]
+              .to_string(index=False))
+    print(f"\nTable de correspondances écrite dans : {chemin}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Propose la table de correspondances Excel / fréquentation / Museofile."
+    )
+    parser.add_argument("--seuil-auto", type=float, default=SEUIL_AUTO,
+                        help="score à partir duquel une paire est jugée sûre (statut auto)")
+    parser.add_argument("--seuil", type=float, default=SEUIL_CANDIDAT,
+                        help="score minimal d'une paire proposée à la relecture")
+    parser.add_argument("--sortie", metavar="FICHIER",
+                        help="CSV de la table (par défaut data/correspondances_ids.csv)")
+    parser.add_argument("--valider-auto", action="store_true",
+                        help="valide d'office les paires auto encore non relues (sans relecture)")
+    args = parser.parse_args()
+
+    main(seuil_auto=args.seuil_auto, seuil=args.seuil, sortie=args.sortie,
+         valider_auto=args.valider_auto)
@@ -0,0 +1,47 @@
+import argparse
+import time
+
+from src.backtest import MODELES, backtester, tableau_metriques
+from src.chemins import OUTPUT_DIR
+from src.modeles import index_spatial
+from src.schema import en_float
+from src.stockage import lire_table
+
+
+def main(modeles=MODELES, premiere_origine: int = None, workers: int = None, sortie: str = None,
+         spatial: bool = False):
+    debut = time.perf_counter()
+    df = en_float(lire_table("df_modele_musees"))
+
+    #Un pli par (modèle, année de coupure), exécutés en parallèle
+    predictions = backtester(df, modeles=modeles, premiere_origine=premiere_origine,
+                             max_workers=workers, spatial=index_spatial() if spatial else None)
+    tableau = tableau_metriques(predictions)
+
+    chemin = sortie or OUTPUT_DIR / "backtest.csv"
+    tableau.to_csv(chemin, index=False)
+
+    par_annee = tableau[tableau["niveau"] != "region"].pivot(index="valeur", columns="modele", values="rmse")
+    print("RMSE par année de coupure :")
+    print(par_annee[[m for m in modeles if m in par_annee.columns]].round(0).to_string())
+    print(f"\n{predictions['origine'].nunique()} origines x {len(modeles)} modèles "
+          f"en {time.perf_counter() - debut:.1f} s")
+    print(f"Métriques (global, par année, par région) écrites dans : {chemin}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest à origine glissante des modèles.")
+    parser.add_argument("--modeles", nargs="+", choices=MODELES, default=list(MODELES),
+                        help="modèles évalués (naif : fréquentation de l'an dernier)")
+    parser.add_argument("--premiere-origine", type=int, default=None,
+                        help="première année de coupure (par défaut la première possible)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processus en parallèle (par défaut : nombre de cœurs ; 1 : sans pool)")
+    parser.add_argument("--sortie", metavar="FICHIER",
+                        help="CSV des métriques (par défaut output/backtest.csv)")
+    parser.add_argument("--spatial", action="store_true",
+                        help="ajoute les variables de voisinage aux modèles")
+    args = parser.parse_args()
+
+    main(modeles=args.modeles, premiere_origine=args.premiere_origine,
+         workers=args.workers, sortie=args.sortie, spatial=args.spatial)
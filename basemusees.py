@@ -1,40 +1,107 @@
+import argparse
+
 from src.chemins import OUTPUT_DIR
-from src.build_bases import (
-    load_raw_data,
-    build_dim_musees,
-    build_fact_frequentation,
-    build_fact_freq_excel,
-    merge_dataset,
-    basic_quality_checks,
-)
-from src.cleaning import clean_and_enrich
+from src.build_bases import load_raw_data
+from src.incremental import build_incremental, sauver_etat, verifier_equivalence
+from src.pipeline import etapes_par_defaut, executer
+from src.profilage import Profileur, definir_apercus
+from src.qualite import afficher_rapport, controler_sorties
+from src.stockage import exporter_sorties
+
+# Étapes nécessaires à l'export et à l'état incrémental
+SORTIES = [
+    "freq_raw", "museo_raw", "correspondances", "musees", "fact_freq", "fact_excel",
+    "df_modele_clean", "encodeur_domaines", "normaliseur_categories",
+]
+
 
+def main(incremental: bool = False, csv: bool = False, jusqua: str = None,
+         depuis: str = None, sans_cache: bool = False, quiet: bool = False,
+         profil: str = None, qualite: bool = False):
+    definir_apercus(not quiet)
+    profileur = Profileur() if profil else None
 
-def main():
-    #Chargement
-    freq_raw, ent_raw, museo_raw = load_raw_data()
+    if incremental:
+        sorties = build_incremental(*load_raw_data(), OUTPUT_DIR, csv=csv)
+        print(f"\nFichiers sauvegardés dans : {OUTPUT_DIR.resolve()}")
+        annees = sorted(int(a) for a in sorties["df_modele"]["annee"].unique())
+        if qualite and annees:
+            #Contrôle des seules partitions réécrites
+            controler(annees=annees)
+        return
 
-    #Construction des tables
-    musees = build_dim_musees(museo_raw)
-    fact_freq = build_fact_frequentation(ent_raw)
-    fact_excel = build_fact_freq_excel(freq_raw)
+    #Chargement, construction des tables, fusion, nettoyage + enrichissement
+    #(chaque étape est relue depuis le cache si ni son code ni ses entrées n'ont changé)
+    if jusqua is not None:
+        resultat = executer(cibles=[jusqua], depuis=depuis, sans_cache=sans_cache,
+                            profileur=profileur)[jusqua]
+        print(f"\nÉtape {jusqua} : {getattr(resultat, 'shape', type(resultat).__name__)}")
+    else:
+        r = executer(cibles=SORTIES, depuis=depuis, sans_cache=sans_cache, profileur=profileur)
 
-    #Fusion
-    df_modele = merge_dataset(musees, fact_freq, fact_excel)
+        #Export
+        tables = {
+            "musees": r["musees"],
+            "fact_freq": r["fact_freq"],
+            "fact_excel": r["fact_excel"],
+            "df_modele": r["df_modele_clean"],
+        }
+        if profileur is None:
+            exporter_sorties(tables, OUTPUT_DIR, csv=csv)
+        else:
+            with profileur.etape("export", entrees=tables, statut="calcul"):
+                exporter_sorties(tables, OUTPUT_DIR, csv=csv)
+        sauver_etat(OUTPUT_DIR, r["freq_raw"], r["museo_raw"], r["fact_freq"],
+                    r["encodeur_domaines"], r["normaliseur_categories"], r["correspondances"])
+        print(f"\nFichiers sauvegardés dans : {OUTPUT_DIR.resolve()}")
+        if qualite:
+            controler()
 
-    #Nettoyage + enrichissement
-    df_modele_clean = clean_and_enrich(df_modele)
+    if profileur is not None:
+        profileur.exporter(profil)
+        print("\nProfil des étapes :")
+        print(profileur.tableau().drop(columns="rss_max_mo").to_string(index=False))
+        print(f"Profil écrit dans : {profil}")
 
-    #Export
-    OUTPUT_DIR.mkdir(exist_ok=True)
-    musees.to_csv(OUTPUT_DIR / "musees.csv", index=False)
-    fact_freq.to_csv(OUTPUT_DIR / "frequentation_annuelle.csv", index=False)
-    fact_excel.to_csv(OUTPUT_DIR / "frequentation_excel_long.csv", index=False)
-    df_modele_clean.to_csv(OUTPUT_DIR / "df_modele_musees.csv", index=False)
 
-    print(f"\nFichiers sauvegardés dans : {OUTPUT_DIR.resolve()}")
+def controler(annees=None):
+    """Règles qualité sur les tables exportées, lignes en échec dans output/qualite/."""
+    print(f"\nContrôles qualité{f' (années {annees})' if annees else ''} :")
+    resultat = controler_sorties(annees=annees)
+    afficher_rapport(resultat)
+    for chemin in resultat.exporter_echecs(OUTPUT_DIR / "qualite"):
+        print(f"Lignes en échec : {chemin}")
 
 
 if __name__ == "__main__":
-    main()
+    noms_etapes = [e.nom for e in etapes_par_defaut()]
+    parser = argparse.ArgumentParser(description="Construction des bases musées.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="ne recalcule que les partitions (musée, année) nouvelles ou modifiées")
+    parser.add_argument("--csv", action="store_true",
+                        help="exporte aussi les tables au format CSV")
+    parser.add_argument("--jusqua", choices=noms_etapes, metavar="ETAPE",
+                        help=f"s'arrête après cette étape, sans export ({', '.join(noms_etapes)})")
+    parser.add_argument("--depuis", choices=noms_etapes, metavar="ETAPE",
+                        help="recalcule cette étape et les suivantes, l'amont est relu du cache")
+    parser.add_argument("--sans-cache", action="store_true",
+                        help="recalcule toutes les étapes")
+    parser.add_argument("--quiet", action="store_true",
+                        help="n'affiche ni les aperçus head() ni les diagnostics des étapes")
+    parser.add_argument("--profil", metavar="FICHIER",
+                        help="mesure temps et mémoire de chaque étape et les écrit "
+                             "dans FICHIER (.json ou .csv)")
+    parser.add_argument("--qualite", action="store_true",
+                        help="applique les règles qualité aux tables exportées "
+                             "(en incrémental : aux seules années réécrites)")
+    parser.add_argument("--verifier-incremental", action="store_true",
+                        help="contrôle que l'ajout incrémental de la dernière année "
+                             "donne le même résultat qu'un build complet")
+    args = parser.parse_args()
 
+    if args.verifier_incremental:
+        verifier_equivalence(*load_raw_data())
+    else:
+        main(incremental=args.incremental, csv=args.csv, jusqua=args.jusqua,
+             depuis=args.depuis, sans_cache=args.sans_cache, quiet=args.quiet,
+             profil=args.profil, qualite=args.qualite)
@@ -0,0 +1,483 @@
+"""Mesures de performance des étapes du pipeline.
+
+Usage : python benchmark.py [chargement coordonnees lecture jointures features prevision spatial appariement echelle ...]
+        python benchmark.py echelle --echelles 1 10 100 --pays 3 --sans-modeles
+"""
+import argparse
+import subprocess
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+from src.build_bases import load_raw_data, sources_brutes, split_coords
+from src.cache import charger_avec_cache
+from src.chemins import OUTPUT_DIR
+
+
+def chronometrer(fonction, repetitions: int = 3):
+    """Renvoie (meilleur temps en secondes, résultat du dernier appel)."""
+    meilleur, resultat = float("inf"), None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur, resultat
+
+
+def bench_chargement():
+    """Cache Arrow : lecture à froid (parsing + écriture) vs lecture à chaud."""
+    import pandas as pd
+
+    print(f"{'source':<12}{'froid (s)':>12}{'chaud (s)':>12}{'gain':>8}")
+    for nom, (chemin, lecteur, options) in sources_brutes().items():
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_dir = Path(tmp)
+
+            debut = time.perf_counter()
+            froid = charger_avec_cache(chemin, lecteur, options, cache_dir=cache_dir)
+            t_froid = time.perf_counter() - debut
+
+            t_chaud, chaud = chronometrer(
+                lambda: charger_avec_cache(chemin, lecteur, options, cache_dir=cache_dir)
+            )
+        pd.testing.assert_frame_equal(froid, chaud)
+        print(f"{nom:<12}{t_froid:>12.3f}{t_chaud:>12.3f}{t_froid / t_chaud:>7.0f}x")
+
+
+def _split_coords_ligne(coord_str):
+    """Ancienne implémentation ligne à ligne (référence de parité)."""
+    import numpy as np
+    import pandas as pd
+
+    if pd.isna(coord_str):
+        return pd.Series({"latitude": np.nan, "longitude": np.nan})
+    try:
+        lat_str, lon_str = str(coord_str).split(",")
+        return pd.Series({
+            "latitude": float(lat_str.strip()),
+            "longitude": float(lon_str.strip())
+        })
+    except Exception:
+        return pd.Series({"latitude": np.nan, "longitude": np.nan})
+
+
+def bench_coordonnees():
+    """Parsing des coordonnées Museofile : apply ligne à ligne vs vectorisé."""
+    import pandas as pd
+
+    museo_raw = load_raw_data()[2]
+    print(f"{'lignes':>8}{'apply (s)':>12}{'vectorisé (s)':>15}{'gain':>8}")
+    for facteur in (1, 10):
+        coords = pd.concat([museo_raw["Coordonnees"]] * facteur, ignore_index=True)
+
+        t_ligne, ref = chronometrer(lambda: coords.apply(_split_coords_ligne), repetitions=1)
+        t_vect, res = chronometrer(lambda: split_coords(coords))
+
+        pd.testing.assert_frame_equal(res[["latitude", "longitude"]], ref, check_exact=True)
+        print(f"{len(coords):>8}{t_ligne:>12.3f}{t_vect:>15.4f}{t_ligne / t_vect:>7.0f}x")
+
+
+def bench_lecture():
+    """df_modele : relecture CSV complète vs Parquet (2022-2023, 6 colonnes)."""
+    import pandas as pd
+
+    from src.stockage import lire_table
+
+    chemin_csv = OUTPUT_DIR / "df_modele_musees.csv"
+    if not chemin_csv.exists():
+        print("Lancer d'abord : python basemusees.py --csv")
+        return
+
+    colonnes = ["id_museofile", "annee", "total", "region", "categorie", "est_idf"]
+    t_csv, _ = chronometrer(lambda: pd.read_csv(chemin_csv))
+    t_complet, _ = chronometrer(lambda: lire_table("df_modele_musees"))
+    t_cible, res = chronometrer(lambda: lire_table(
+        "df_modele_musees", colonnes=colonnes, filtres=[("annee", "in", [2022, 2023])]
+    ))
+    print(f"read_csv complet             : {t_csv:.3f} s")
+    print(f"lire_table complet           : {t_complet:.3f} s")
+    print(f"lire_table 2022-2023, 6 col. : {t_cible:.3f} s  {res.shape}")
+
+
+def _merge_dataset_hash(musees, fact_freq, fact_excel):
+    """Anciennes jointures de merge_dataset par pandas.merge (référence de parité)."""
+    df_f = fact_freq.copy()
+    for col in ["region", "Region", "departement", "Departement"]:
+        if col in df_f.columns:
+            df_f = df_f.drop(columns=[col])
+    df = df_f.merge(
+        musees[[
+            "id_museofile", "nom_officiel", "region", "departement",
+            "categorie", "domaine_thematique",
+            "annee_creation", "latitude", "longitude"
+        ]],
+        on="id_museofile",
+        how="left",
+    )
+    df = df.merge(
+        fact_excel[["id_patrimostat", "annee", "total_frequentation"]],
+        on=["id_patrimostat", "annee"],
+        how="left",
+    )
+    return df
+
+
+def _repliquer(df, facteur, colonnes_ids):
+    """df répété `facteur` fois, identifiants suffixés (_0, _1, ...) pour rester distincts."""
+    import pandas as pd
+
+    copies = []
+    for k in range(facteur):
+        copie = df.copy()
+        for col in colonnes_ids:
+            copie[col] = copie[col].astype(object).where(
+                copie[col].isna(), copie[col].astype(str) + f"_{k}"
+            )
+        copies.append(copie)
+    out = pd.concat(copies, ignore_index=True)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype("category")
+    return out
+
+
+def bench_jointures():
+    """Jointures de merge_dataset : pandas.merge vs positions entières, x1 et x10."""
+    import pandas as pd
+
+    from src.build_bases import (
+        build_dim_musees, build_fact_frequentation, build_fact_freq_excel, joindre_tables,
+    )
+    from src.profilage import definir_apercus
+    from src.schema import appliquer_schema
+
+    definir_apercus(False)
+    freq_raw, ent_raw, museo_raw = load_raw_data()
+    musees = build_dim_musees(museo_raw)
+    fact_freq = build_fact_frequentation(ent_raw)
+    fact_excel = build_fact_freq_excel(freq_raw)
+
+    print(f"{'lignes':>8}{'merge (s)':>12}{'indexé (s)':>12}{'gain':>8}")
+    for facteur in (1, 10):
+        tables = (
+            _repliquer(musees, facteur, ["id_museofile"]),
+            _repliquer(fact_freq, facteur, ["id_museofile", "id_patrimostat"]),
+            _repliquer(fact_excel, facteur, ["id_patrimostat"]),
+        )
+        t_merge, ref = chronometrer(lambda: _merge_dataset_hash(*tables))
+        t_index, (res, _) = chronometrer(lambda: joindre_tables(*tables))
+
+        # Même contenu une fois au schéma compact (catégories fusionnées en object par merge)
+        pd.testing.assert_frame_equal(appliquer_schema(res), appliquer_schema(ref))
+        print(f"{len(res):>8}{t_merge:>12.3f}{t_index:>12.3f}{t_merge / t_index:>7.1f}x")
+
+
+def _features_merge(df):
+    """Lags t-1..t-3 et max sur 3 ans par auto-jointures décalées (référence)."""
+    out = df[["id_museofile", "annee", "total"]].copy()
+    for k in (1, 2, 3):
+        decale = df[["id_museofile", "annee", "total"]].copy()
+        decale["annee"] = decale["annee"] + k
+        decale = decale.rename(columns={"total": f"total_t_{k}"})
+        out = out.merge(decale, on=["id_museofile", "annee"], how="left")
+    out["total_max_3ans"] = out[["total_t_1", "total_t_2", "total_t_3"]].max(axis=1)
+    return out[["total_t_1", "total_t_2", "total_t_3", "total_max_3ans"]]
+
+
+def bench_features():
+    """Lags et max 3 ans : auto-jointures vs moteur de features (src/features.py)."""
+    import pandas as pd
+
+    from src.build_bases import (
+        build_dim_musees, build_fact_frequentation, build_fact_freq_excel, merge_dataset,
+    )
+    from src.features import calculer_features
+    from src.profilage import definir_apercus
+    from src.schema import en_float
+
+    definir_apercus(False)
+    freq_raw, ent_raw, museo_raw = load_raw_data()
+    df = merge_dataset(
+        build_dim_musees(museo_raw), build_fact_frequentation(ent_raw), build_fact_freq_excel(freq_raw)
+    )
+    # Référence comparable : un musée par année, identifiant renseigné
+    df = en_float(df[df["id_museofile"].notna()].drop_duplicates(["id_museofile", "annee"]))
+
+    print(f"{'lignes':>8}{'jointures (s)':>15}{'moteur (s)':>12}{'gain':>8}")
+    for facteur in (1, 10):
+        panel = _repliquer(df, facteur, ["id_museofile", "id_patrimostat"])
+        t_merge, ref = chronometrer(lambda: _features_merge(panel))
+        t_moteur, res = chronometrer(lambda: calculer_features(
+            panel, lags={"total": (1, 2, 3)}, maximum={"total": (3,)}
+        ))
+        pd.testing.assert_frame_equal(res.reset_index(drop=True), ref, check_dtype=False)
+        print(f"{len(panel):>8}{t_merge:>15.3f}{t_moteur:>12.4f}{t_merge / t_moteur:>7.0f}x")
+
+
+def bench_prevision():
+    """Prévision N+1 (variables + score par lots) sur l'historique répété x1, x10, x100."""
+    from src.modeles import charger_modele
+    from src.prevision import COLONNES_LASSO, charger_historique, derniere_annee, donnees_prevision, scorer
+
+    try:
+        paquets = {nom: charger_modele(nom) for nom in ("lasso", "foret")}
+    except FileNotFoundError:
+        print("Lancer d'abord : python entrainement.py")
+        return
+    annee = derniere_annee() + 1
+
+    print(f"{'modèle':<8}{'musées':>9}{'temps (s)':>12}{'µs / musée':>12}")
+    for nom, paquet in paquets.items():
+        historique = charger_historique(annee, colonnes=COLONNES_LASSO if nom == "lasso" else None)
+        for facteur in (1, 10, 100):
+            panel = _repliquer(historique, facteur, ["id_museofile"])
+            temps, res = chronometrer(lambda: scorer(paquet, donnees_prevision(panel, annee)))
+            print(f"{nom:<8}{len(res):>9}{temps:>12.3f}{temps / len(res) * 1e6:>12.1f}")
+
+
+def _voisins_boucle(musees, rayon_km):
+    """Nombre de voisins à moins de rayon_km, musée par musée (référence O(n²))."""
+    import numpy as np
+
+    from src.spatial import RAYON_TERRE_KM
+
+    lat = np.radians(musees["latitude"].to_numpy(dtype=float))
+    lon = np.radians(musees["longitude"].to_numpy(dtype=float))
+    nombres = np.zeros(len(musees))
+    for i in range(len(musees)):
+        a = np.sin((lat - lat[i]) / 2) ** 2 + np.cos(lat[i]) * np.cos(lat) * np.sin((lon - lon[i]) / 2) ** 2
+        distances = 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(a))
+        nombres[i] = (distances < rayon_km).sum() - 1
+    return nombres
+
+
+def bench_spatial():
+    """Voisinage à 10 km : boucle par musée vs BallTree, musées répétés x1 et x10 (décalés en longitude)."""
+    import numpy as np
+
+    from src.spatial import IndexSpatial
+    from src.stockage import lire_table
+
+    musees = lire_table("musees", colonnes=["id_museofile", "latitude", "longitude"])
+    musees = musees[musees["latitude"].notna()]
+
+    print(f"{'musées':>8}{'boucle (s)':>12}{'BallTree (s)':>14}{'gain':>8}")
+    for facteur in (1, 10):
+        copies = _repliquer(musees, facteur, ["id_museofile"])
+        # Copie k décalée de 10k degrés : plus de surface, même densité
+        copies["longitude"] += np.repeat(np.arange(facteur) * 10.0, len(musees))
+
+        t_boucle, ref = chronometrer(lambda: _voisins_boucle(copies, 10), repetitions=1)
+        t_arbre, res = chronometrer(
+            lambda: np.asarray(IndexSpatial(copies).voisinage(10).sum(axis=1)).ravel()
+        )
+        assert np.array_equal(res, ref)
+        print(f"{len(copies):>8}{t_boucle:>12.3f}{t_arbre:>14.4f}{t_boucle / t_arbre:>7.0f}x")
+
+
+def _fiches_appariement(facteur):
+    """Tous les musées de l'Excel et de la fréquentation, répétés `facteur` fois (communes comprises)."""
+    import pandas as pd
+
+    from src.appariement import normaliser
+    from src.stockage import NOMS_SORTIES, lire_table
+
+    excel = lire_table(NOMS_SORTIES["fact_excel"],
+                       colonnes=["id_patrimostat", "nom_musee_excel", "ville_excel"])
+    freq = lire_table(NOMS_SORTIES["fact_freq"], colonnes=["id_patrimostat", "nom_du_musee", "ville"])
+    fiches = []
+    for df, nom, ville in [(excel, "nom_musee_excel", "ville_excel"), (freq, "nom_du_musee", "ville")]:
+        df = df.astype(object).drop_duplicates("id_patrimostat")
+        f = pd.DataFrame({
+            "cle": df["id_patrimostat"].astype(str).to_numpy(),
+            "nom": df[nom].to_numpy(),
+            "ville": df[ville].to_numpy(),
+            "commune": normaliser(df[ville]).to_numpy(),
+        })
+        f = _repliquer(f, facteur, ["cle", "commune"])
+        fiches.append(f.assign(tout="tout"))
+    return fiches
+
+
+def bench_appariement():
+    """Appariement Excel -> fréquentation (tous les musées) : produit complet vs blocage par commune.
+
+    Le produit complet n'est mesuré qu'à x1 : à x3, ses ~14 M paires ne tiennent plus en mémoire.
+    """
+    from src.appariement import apparier
+
+    print(f"{'musées':>8}{'paires produit':>16}{'paires bloc':>13}"
+          f"{'produit (s)':>13}{'bloc (s)':>10}{'exacts produit':>16}{'exacts bloc':>13}")
+    for facteur in (1, 10):
+        sources, cibles = _fiches_appariement(facteur)
+        n_bloc = int(sources["commune"].value_counts().mul(
+            cibles["commune"].value_counts(), fill_value=0).sum())
+        t_bloc, res = chronometrer(lambda: apparier(sources, cibles, blocs=("commune",)))
+        # Part des musées retrouvés sous leur propre identifiant
+        exacts = (res["cle_source"] == res["cle_cible"]).sum() / len(sources)
+        if facteur == 1:
+            t_produit, ref = chronometrer(lambda: apparier(sources, cibles, blocs=("tout",)), repetitions=1)
+            produit = f"{t_produit:>13.2f}{t_bloc:>10.3f}"
+            exacts_ref = f"{(ref['cle_source'] == ref['cle_cible']).sum() / len(sources):>16.1%}"
+        else:
+            produit, exacts_ref = f"{'-':>13}{t_bloc:>10.3f}", f"{'-':>16}"
+        print(f"{len(sources):>8}{len(sources) * len(cibles):>16}{n_bloc:>13}"
+              f"{produit}{exacts_ref}{exacts:>13.1%}")
+
+
+# Mesures de bench_echelle, cumulées d'un commit à l'autre
+FICHIER_HISTORIQUE = OUTPUT_DIR / "benchmarks" / "echelle.csv"
+
+
+def version_code() -> str:
+    """Commit courant (abrégé), suffixé "+modifie" si des fichiers suivis ont changé."""
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True).stdout.strip()
+
+    commit = git("rev-parse", "--short", "HEAD") or "inconnu"
+    return commit + ("+modifie" if git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def profiler_echelle(echelle, pays=1, modeles=True, reference=None):
+    """Temps et mémoire de chaque fonction de src/ sur des données synthétiques x echelle.
+
+    Génération et écriture des fichiers bruts (src/synthetique.py), puis
+    pipeline complet sans cache (lectures, tables, fusion, composants,
+    nettoyage), règles qualité, variables et modèles.
+    """
+    from src.modeles import entrainer_foret, entrainer_lasso, preparer_variables
+    from src.pipeline import etapes_par_defaut, executer
+    from src.profilage import Profileur
+    from src.qualite import evaluer
+    from src.schema import en_float
+    from src.synthetique import ecrire_sources, generer_sources
+
+    profileur = Profileur()
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        with profileur.etape("generer_sources", statut="synthese") as m:
+            m["sortie"] = sources = generer_sources(echelle, pays=pays, reference=reference)
+        with profileur.etape("ecrire_sources", entrees=sources, statut="synthese"):
+            ecrire_sources(sources, data_dir)
+        del sources
+
+        r = executer(
+            etapes_par_defaut(data_dir, use_cache=False),
+            cibles=["musees", "fact_freq", "fact_excel", "df_modele_clean"],
+            sans_cache=True, cache_dir=Path(tmp) / "etapes", profileur=profileur,
+        )
+    tables = {"musees": r["musees"], "fact_freq": r["fact_freq"],
+              "fact_excel": r["fact_excel"], "df_modele": r["df_modele_clean"]}
+    with profileur.etape("qualite.evaluer", entrees=tables, statut="calcul"):
+        evaluer(tables)
+
+    df = en_float(r["df_modele_clean"])
+    del r, tables
+    variables = profileur.profiler(preparer_variables)(df)
+    if modeles:
+        # Sans le cache disque du préprocesseur : ajustement complet à chaque mesure
+        profileur.profiler(entrainer_lasso)(variables, memoire=None)
+        profileur.profiler(entrainer_foret)(variables)
+
+    return profileur.tableau().drop(columns="rss_max_mo").assign(echelle=echelle, pays=pays)
+
+
+def comparer_commits(historique, commit):
+    """Durées du commit vs celles du dernier autre commit mesuré (mêmes échelle et pays)."""
+    actuel = historique[historique["commit"] == commit]
+    autres = historique[historique["commit"] != commit]
+    if autres.empty:
+        return None
+    precedent = autres["commit"].iloc[-1]
+    cles = ["echelle", "pays", "etape"]
+    avant = autres[autres["commit"] == precedent].drop_duplicates(cles, keep="last")
+    comparaison = actuel.drop_duplicates(cles, keep="last").merge(
+        avant[cles + ["duree_s"]], on=cles, suffixes=("", "_" + precedent)
+    )
+    comparaison["ratio"] = comparaison["duree_s"] / comparaison["duree_s_" + precedent]
+    return comparaison[cles + ["duree_s_" + precedent, "duree_s", "ratio"]]
+
+
+def bench_echelle(echelles=(1, 10), pays=1, modeles=True, historique=FICHIER_HISTORIQUE):
+    """Pipeline et modèles sur données synthétiques x1, x10... ; mesures ajoutées à l'historique."""
+    import pandas as pd
+
+    from src.profilage import definir_apercus
+    from src.synthetique import charger_reference
+
+    definir_apercus(False)
+    reference = charger_reference()
+    commit = version_code()
+    if modeles:
+        # Imports de sklearn faits hors mesures
+        from src.modeles import construire_foret, construire_lasso
+        construire_lasso(memoire=None)
+        construire_foret()
+    mesures = pd.concat(
+        [profiler_echelle(e, pays=pays, modeles=modeles, reference=reference) for e in echelles],
+        ignore_index=True,
+    )
+    mesures.insert(0, "commit", commit)
+    mesures.insert(1, "date", pd.Timestamp.now().isoformat(timespec="seconds"))
+
+    print(mesures.pivot_table(index="etape", columns="echelle", values="duree_s", sort=False)
+          .round(3).to_string())
+    print("\nPic mémoire tracemalloc (Mo) :")
+    print(mesures.pivot_table(index="etape", columns="echelle", values="pic_tracemalloc_mo", sort=False)
+          .round(1).to_string())
+
+    historique = Path(historique)
+    historique.parent.mkdir(parents=True, exist_ok=True)
+    if historique.exists():
+        mesures = pd.concat([pd.read_csv(historique, dtype={"commit": str}), mesures], ignore_index=True)
+    mesures.to_csv(historique, index=False)
+    print(f"\nMesures ajoutées à : {historique} (commit {commit})")
+
+    comparaison = comparer_commits(mesures, commit)
+    if comparaison is not None and not comparaison.empty:
+        print("\nDurées (s) vs commit précédent :")
+        print(comparaison.round(3).to_string(index=False))
+
+
+BENCHMARKS = {
+    "chargement": bench_chargement,
+    "coordonnees": bench_coordonnees,
+    "lecture": bench_lecture,
+    "jointures": bench_jointures,
+    "features": bench_features,
+    "prevision": bench_prevision,
+    "spatial": bench_spatial,
+    "appariement": bench_appariement,
+    "echelle": bench_echelle,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("noms", nargs="*",
+                        help=f"benchmarks à lancer parmi {list(BENCHMARKS)} (tous par défaut)")
+    parser.add_argument("--echelles", type=float, nargs="+", default=[1, 10],
+                        help="echelle : volumes synthétiques, en multiples des données réelles")
+    parser.add_argument("--pays", type=int, default=1,
+                        help="echelle : nombre de pays des données synthétiques")
+    parser.add_argument("--sans-modeles", action="store_true",
+                        help="echelle : sans l'entraînement du LASSO et du Random Forest")
+    parser.add_argument("--historique", default=FICHIER_HISTORIQUE,
+                        help="echelle : CSV cumulant les mesures par commit")
+    args = parser.parse_args()
+    inconnus = set(args.noms) - set(BENCHMARKS)
+    if inconnus:
+        parser.error(f"benchmarks inconnus : {sorted(inconnus)}")
+
+    benchmarks = dict(BENCHMARKS, echelle=partial(
+        bench_echelle, echelles=args.echelles, pays=args.pays,
+        modeles=not args.sans_modeles, historique=args.historique,
+    ))
+    for nom in args.noms or benchmarks:
+        print(f"\n=== {nom} ===")
+        benchmarks[nom]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+
+from src.chemins import MODELES_DIR
+from src.modeles import (
+    ANNEE_COUPURE, entrainer_foret, entrainer_lasso, index_spatial, preparer_variables, sauver_modele,
+)
+from src.schema import en_float
+from src.stockage import lire_table
+
+
+def main(annee_coupure: int = ANNEE_COUPURE, annee_test: int = None, n_jobs: int = -1,
+         spatial: bool = False):
+    #Chargement de df_modele (construit par basemusees.py) et préparation des variables
+    #(variables de voisinage en option, index construit sur la table musees)
+    index = index_spatial() if spatial else None
+    df = preparer_variables(en_float(lire_table("df_modele_musees")), index)
+
+    #LASSO (conjoncturel) : entraîné sur les années < annee_coupure
+    print(f"Entraînement du LASSO (années < {annee_coupure})...")
+    lasso = entrainer_lasso(df, annee_coupure=annee_coupure, n_jobs=n_jobs, spatial=spatial)
+    print(f"  {lasso['n_lignes']} lignes, métriques : {lasso['metriques']}")
+
+    #Random Forest (structurel) : entraîné sur les années < annee_test
+    print("Entraînement du Random Forest...")
+    foret = entrainer_foret(df, annee_test=annee_test, n_jobs=n_jobs)
+    print(f"  {foret['n_lignes']} lignes, {len(foret['features'])} variables, "
+          f"métriques : {foret['metriques']}")
+
+    #Sauvegarde
+    for nom, paquet in [("lasso", lasso), ("foret", foret)]:
+        chemin = sauver_modele(paquet, nom)
+        print(f"Modèle {nom} sauvegardé : {chemin}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entraînement et sauvegarde des modèles.")
+    parser.add_argument("--annee-coupure", type=int, default=ANNEE_COUPURE,
+                        help="LASSO : années d'entraînement < ANNEE_COUPURE, test au-delà")
+    parser.add_argument("--annee-test", type=int, default=None,
+                        help="Random Forest : année de test (par défaut la dernière)")
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                        help="nombre de cœurs pour les plis de LassoCV et les arbres (-1 : tous)")
+    parser.add_argument("--spatial", action="store_true",
+                        help="ajoute les variables de voisinage (musées à 10 / 50 km, distance au géant)")
+    args = parser.parse_args()
+
+    main(annee_coupure=args.annee_coupure, annee_test=args.annee_test, n_jobs=args.n_jobs,
+         spatial=args.spatial)
+    print(f"\nModèles dans : {MODELES_DIR.resolve()}")
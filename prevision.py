@@ -0,0 +1,47 @@
+import argparse
+import time
+
+from src.modeles import charger_modele, index_spatial
+from src.prevision import (
+    COLONNES_LASSO, TAILLE_LOT, charger_historique, chemin_previsions, derniere_annee,
+    donnees_prevision, scorer,
+)
+
+
+def main(modele: str = "lasso", annee: int = None, sortie: str = None,
+         taille_lot: int = TAILLE_LOT):
+    debut = time.perf_counter()
+    paquet = charger_modele(modele)
+
+    #Année cible : par défaut N+1 (aucun réel connu) ; une année de df_modele
+    #donne une prévision a posteriori avec son erreur
+    annee = derniere_annee() + 1 if annee is None else annee
+    historique = charger_historique(annee, colonnes=COLONNES_LASSO if modele == "lasso" else None)
+    #Modèle entraîné avec les variables de voisinage : index des musées
+    spatial = index_spatial() if paquet.get("spatial") else None
+    donnees = donnees_prevision(historique, annee, spatial)
+
+    resultats = scorer(paquet, donnees, taille_lot=taille_lot)
+    chemin = sortie or chemin_previsions(modele, annee)
+    resultats.to_csv(chemin, index=False)
+
+    print(f"{resultats['Predit'].notna().sum()} musées scorés sur {len(resultats)} pour {annee} "
+          f"(modèle {modele}) en {time.perf_counter() - debut:.2f} s")
+    if resultats["Reel"].notna().any():
+        print(f"Erreur relative médiane : {resultats['Erreur_Rel'].abs().median():.1f} %")
+    print(f"Prévisions écrites dans : {chemin}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prévision de fréquentation par musée.")
+    parser.add_argument("--modele", choices=["lasso", "foret"], default="lasso",
+                        help="modèle sauvegardé par entrainement.py")
+    parser.add_argument("--annee", type=int, default=None,
+                        help="année à prévoir (par défaut : dernière année de df_modele + 1)")
+    parser.add_argument("--sortie", metavar="FICHIER",
+                        help="CSV de sortie (par défaut output/previsions_<modele>_<annee>.csv)")
+    parser.add_argument("--taille-lot", type=int, default=TAILLE_LOT,
+                        help="nombre de lignes prédites par appel au modèle")
+    args = parser.parse_args()
+
+    main(modele=args.modele, annee=args.annee, sortie=args.sortie, taille_lot=args.taille_lot)
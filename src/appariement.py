@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .chemins import DATA_DIR
+
+# Table de correspondances relue (versionnée avec les données)
+FICHIER_CORRESPONDANCES = DATA_DIR / "correspondances_ids.csv"
+
+# Score (cosinus TF-IDF des trigrammes) au-delà duquel une paire est jugée
+# sûre (statut auto) ; entre les deux seuils, elle est à vérifier. Dans les
+# deux cas, seule la relecture (valide = oui) la fait entrer dans le build
+SEUIL_AUTO = 0.8
+SEUIL_CANDIDAT = 0.3
+
+# Liens produits :
+# - excel : id_patrimostat de l'Excel absent de la fréquentation -> id_patrimostat
+#   de la fréquentation sans historique Excel (identifiant renuméroté) ;
+# - museofile : id_patrimostat dont l'id_museofile est manquant ou inconnu
+#   de Museofile -> id_museofile d'un musée Museofile non référencé
+COLONNES_CORRESPONDANCES = [
+    "lien", "cle_source", "cle_cible", "nom_source", "ville_source",
+    "nom_cible", "ville_cible", "bloc", "score", "statut", "valide",
+]
+
+# Mots sans pouvoir discriminant dans les noms de musées
+MOTS_VIDES = {
+    "musee", "musees", "museum", "de", "du", "des", "la", "le", "les", "l", "d",
+    "et", "a", "au", "aux", "en", "sur",
+}
+ABREVIATIONS = {r"\bst\b": "saint", r"\bste\b": "sainte", r"\bmal\b": "marechal"}
+
+
+def normaliser(textes: pd.Series) -> pd.Series:
+    """Minuscules sans accents ni ponctuation, abréviations développées.
+
+    "ST-ÉTIENNE" et "Saint-Etienne" donnent tous deux "saint etienne".
+    """
+    out = (
+        textes.astype("string").fillna("")
+        .str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+        .str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+    )
+    for motif, remplacement in ABREVIATIONS.items():
+        out = out.str.replace(motif, remplacement, regex=True)
+    return out.str.strip()
+
+
+def normaliser_noms(noms: pd.Series) -> pd.Series:
+    """Noms normalisés sans les mots vides ("Musée de la Mode" -> "mode")."""
+    mots = normaliser(noms).str.split()
+    return mots.map(lambda m: " ".join(x for x in m if x not in MOTS_VIDES))
+
+
+def code_departement(id_patrimostat: pd.Series) -> pd.Series:
+    """Département d'après l'id Patrimostat (2 premiers chiffres sur 7, zéro initial rétabli)."""
+    return id_patrimostat.astype("string").str.zfill(7).str[:2]
+
+
+def scores_paires(noms_source: pd.Series, noms_cible: pd.Series,
+                  i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Similarité cosinus des paires (i, j) sur les trigrammes de caractères.
+
+    Les noms sont vectorisés une fois (TF-IDF creux, normes L2) ; le score
+    d'une paire est le produit scalaire des deux lignes, calculé pour
+    toutes les paires d'un coup.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    if len(i) == 0:
+        return np.empty(0)
+    vecteur = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 3))
+    vecteur.fit(pd.concat([noms_source, noms_cible]))
+    A = vecteur.transform(noms_source)
+    B = vecteur.transform(noms_cible)
+    return np.asarray(A[i].multiply(B[j]).sum(axis=1)).ravel()
+
+
+def apparier(
+    sources: pd.DataFrame,
+    cibles: pd.DataFrame,
+    blocs: Sequence[str] = ("commune", "departement"),
+    seuil: float = SEUIL_CANDIDAT,
+) -> pd.DataFrame:
+    """Meilleure cible de chaque source, comparée seulement dans son bloc.
+
+    sources, cibles : colonnes cle, nom, ville et une colonne par clé de
+    blocage. Les blocs sont essayés dans l'ordre (commune puis
+    département) : une source appariée dans sa commune n'est plus comparée
+    au reste du département. Seules les paires d'un même bloc sont scorées
+    (jointure sur la clé de bloc), jamais le produit source x cible.
+    Chaque cible est attribuée au plus une fois (meilleur score d'abord).
+    """
+    sources = sources.reset_index(drop=True)
+    cibles = cibles.reset_index(drop=True)
+    noms_s, noms_c = normaliser_noms(sources["nom"]), normaliser_noms(cibles["nom"])
+
+    retenues: List[pd.DataFrame] = []
+    restantes_s = pd.Series(True, index=sources.index)
+    restantes_c = pd.Series(True, index=cibles.index)
+    for bloc in blocs:
+        gauche = sources.loc[restantes_s & sources[bloc].ne(""), [bloc]].reset_index()
+        droite = cibles.loc[restantes_c & cibles[bloc].ne(""), [bloc]].reset_index()
+        paires = gauche.merge(droite, on=bloc, suffixes=("_s", "_c"))
+        if paires.empty:
+            continue
+        i, j = paires["index_s"].to_numpy(), paires["index_c"].to_numpy()
+        paires["score"] = scores_paires(noms_s, noms_c, i, j)
+        paires = paires[paires["score"] >= seuil].sort_values("score", ascending=False, kind="stable")
+        # Un à un, glouton : meilleure paire d'abord
+        prises_s, prises_c, garder = set(), set(), []
+        for s, c in zip(paires["index_s"], paires["index_c"]):
+            garder.append(s not in prises_s and c not in prises_c)
+            if garder[-1]:
+                prises_s.add(s)
+                prises_c.add(c)
+        paires = paires[np.array(garder, dtype=bool)].assign(bloc=bloc)
+        restantes_s[paires["index_s"]] = False
+        restantes_c[paires["index_c"]] = False
+        retenues.append(paires)
+
+    if not retenues:
+        return pd.DataFrame(columns=COLONNES_CORRESPONDANCES[1:-2])
+    paires = pd.concat(retenues, ignore_index=True)
+    s, c = sources.loc[paires["index_s"]], cibles.loc[paires["index_c"]]
+    return pd.DataFrame({
+        "cle_source": s["cle"].to_numpy(),
+        "cle_cible": c["cle"].to_numpy(),
+        "nom_source": s["nom"].to_numpy(),
+        "ville_source": s["ville"].to_numpy(),
+        "nom_cible": c["nom"].to_numpy(),
+        "ville_cible": c["ville"].to_numpy(),
+        "bloc": paires["bloc"].to_numpy(),
+        "score": paires["score"].round(3).to_numpy(),
+    })
+
+
+def _derniere_fiche(fact_freq: pd.DataFrame) -> pd.DataFrame:
+    # Nom, ville et musée de la dernière année de chaque id_patrimostat
+    colonnes = ["id_patrimostat", "id_museofile", "nom_du_musee", "ville", "departement", "annee"]
+    fiches = fact_freq[colonnes].astype({c: object for c in colonnes[:-1]})
+    return fiches.sort_values("annee", kind="stable").drop_duplicates("id_patrimostat", keep="last")
+
+
+def candidats_excel(fact_freq: pd.DataFrame, fact_excel: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Sources (ids de l'Excel absents de la fréquentation) et cibles (l'inverse)."""
+    fiches = _derniere_fiche(fact_freq)
+    excel = fact_excel.drop_duplicates("id_patrimostat")
+    ids_excel = set(excel["id_patrimostat"].astype(str))
+    ids_freq = set(fiches["id_patrimostat"].astype(str))
+
+    sources = excel[~excel["id_patrimostat"].astype(str).isin(ids_freq)]
+    cibles = fiches[~fiches["id_patrimostat"].astype(str).isin(ids_excel)]
+    return {
+        "sources": pd.DataFrame({
+            "cle": sources["id_patrimostat"].astype(str).to_numpy(),
+            "nom": sources["nom_musee_excel"].to_numpy(),
+            "ville": sources["ville_excel"].to_numpy(),
+            "commune": normaliser(sources["ville_excel"]).to_numpy(),
+            "departement": code_departement(sources["id_patrimostat"]).to_numpy(),
+        }),
+        "cibles": pd.DataFrame({
+            "cle": cibles["id_patrimostat"].astype(str).to_numpy(),
+            "nom": cibles["nom_du_musee"].to_numpy(),
+            "ville": cibles["ville"].to_numpy(),
+            "commune": normaliser(cibles["ville"]).to_numpy(),
+            "departement": code_departement(cibles["id_patrimostat"]).to_numpy(),
+        }),
+    }
+
+
+def candidats_museofile(musees: pd.DataFrame, fact_freq: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Sources (ids Patrimostat sans musée Museofile) et cibles (musées non référencés)."""
+    fiches = _derniere_fiche(fact_freq)
+    connus = set(musees["id_museofile"].dropna().astype(str))
+    references = set(fiches["id_museofile"].dropna().astype(str))
+
+    sources = fiches[~fiches["id_museofile"].astype(str).isin(connus) | fiches["id_museofile"].isna()]
+    cibles = musees[~musees["id_museofile"].astype(str).isin(references)]
+    return {
+        "sources": pd.DataFrame({
+            "cle": sources["id_patrimostat"].astype(str).to_numpy(),
+            "nom": sources["nom_du_musee"].to_numpy(),
+            "ville": sources["ville"].to_numpy(),
+            "commune": normaliser(sources["ville"]).to_numpy(),
+            "departement": normaliser(sources["departement"]).to_numpy(),
+        }),
+        "cibles": pd.DataFrame({
+            "cle": cibles["id_museofile"].astype(str).to_numpy(),
+            "nom": cibles["nom_officiel"].to_numpy(),
+            "ville": cibles["ville"].to_numpy(),
+            "commune": normaliser(cibles["ville"]).to_numpy(),
+            "departement": normaliser(cibles["departement"]).to_numpy(),
+        }),
+    }
+
+
+def proposer_correspondances(
+    musees: pd.DataFrame,
+    fact_freq: pd.DataFrame,
+    fact_excel: pd.DataFrame,
+    existantes: Optional[pd.DataFrame] = None,
+    seuil_auto: float = SEUIL_AUTO,
+    seuil: float = SEUIL_CANDIDAT,
+    valider_auto: bool = False,
+) -> pd.DataFrame:
+    """Table de correspondances proposée (liens excel et museofile).
+
+    statut "auto" (score >= seuil_auto) ou "a_verifier". La colonne valide
+    reste vide, à renseigner oui / non à la relecture ; avec
+    valider_auto=True, les paires "auto" sont validées d'office. Les
+    décisions déjà relues dans `existantes` sont conservées pour les mêmes
+    paires.
+    """
+    blocs = []
+    for lien, candidats in (
+        ("excel", candidats_excel(fact_freq, fact_excel)),
+        ("museofile", candidats_museofile(musees, fact_freq)),
+    ):
+        paires = apparier(candidats["sources"], candidats["cibles"], seuil=seuil)
+        blocs.append(paires.assign(lien=lien))
+    table = pd.concat([b for b in blocs if len(b)] or blocs, ignore_index=True)
+    table["statut"] = np.where(table["score"] >= seuil_auto, "auto", "a_verifier")
+    table["valide"] = np.where(valider_auto & (table["statut"] == "auto"), "oui", "")
+
+    if existantes is not None and not existantes.empty:
+        cles = ["lien", "cle_source", "cle_cible"]
+        relues = existantes.loc[existantes["valide"].isin(["oui", "non"]), cles + ["valide"]]
+        # merge how="left" garde l'ordre des lignes de table
+        defaut = table["valide"].to_numpy()
+        table = table.drop(columns="valide").merge(relues, on=cles, how="left")
+        table["valide"] = table["valide"].fillna(pd.Series(defaut, index=table.index))
+    return table[COLONNES_CORRESPONDANCES].sort_values(["lien", "cle_source"], ignore_index=True)
+
+
+def charger_correspondances(chemin: Path = FICHIER_CORRESPONDANCES) -> pd.DataFrame:
+    """Table de correspondances relue (vide si le fichier n'existe pas)."""
+    if not Path(chemin).exists():
+        return pd.DataFrame(columns=COLONNES_CORRESPONDANCES)
+    return pd.read_csv(chemin, dtype=str, keep_default_na=False)
+
+
+def correspondances_validees(correspondances: Optional[pd.DataFrame], lien: str) -> Dict[str, str]:
+    """cle_source -> cle_cible des paires validées (valide = oui) d'un lien."""
+    if correspondances is None or correspondances.empty:
+        return {}
+    ok = correspondances[(correspondances["lien"] == lien) & (correspondances["valide"] == "oui")]
+    return dict(zip(ok["cle_source"], ok["cle_cible"]))
+
+
+def corriger_museofile(fact_freq: pd.DataFrame, correspondances: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """id_museofile renseigné d'après le lien museofile (clé : id_patrimostat)."""
+    table = correspondances_validees(correspondances, "museofile")
+    if not table:
+        return fact_freq
+    nouveaux = fact_freq["id_patrimostat"].astype(str).map(table)
+    return fact_freq.assign(
+        id_museofile=nouveaux.where(nouveaux.notna(), fact_freq["id_museofile"].astype(object))
+    )
+
+
+def renumeroter_excel(fact_excel: pd.DataFrame, correspondances: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """id_patrimostat de l'Excel remplacés par ceux de la fréquentation (lien excel)."""
+    table = correspondances_validees(correspondances, "excel")
+    if not table:
+        return fact_excel
+    ids = fact_excel["id_patrimostat"].astype(object)
+    return fact_excel.assign(id_patrimostat=ids.map(table).fillna(ids))
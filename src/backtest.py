@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .modeles import (
+    FEATURES_CAT, FEATURES_NUM, FEATURES_SPATIALES, HISTORIQUE_LASSO, TARGET, construire_foret,
+    construire_lasso, indicatrices_structurelles, plis_par_musee, preparer_variables,
+)
+from .spatial import IndexSpatial
+
+MODELES = ("naif", "lasso", "foret")
+
+# Données préparées une fois, partagées par les plis (copie par processus)
+_DONNEES: Dict = {}
+
+
+def preparer_backtest(df: pd.DataFrame, spatial: Optional[IndexSpatial] = None) -> Dict:
+    """Variables calculées une seule fois pour tous les plis.
+
+    df : df_modele en float (en_float). Les plis se contentent ensuite de
+    sélectionner des lignes. Une ligne est évaluable si son historique
+    t-1 et t-3 est connu (lignes du LASSO) : tous les modèles sont testés
+    sur ces lignes, pour des métriques comparables. Avec un index spatial,
+    les variables de voisinage entrent dans le LASSO et le Random Forest.
+    """
+    df = preparer_variables(df, spatial).dropna(subset=[TARGET]).reset_index(drop=True)
+    X_foret = indicatrices_structurelles(df)
+    return {
+        "df": df,
+        "features_num": FEATURES_NUM + (FEATURES_SPATIALES if spatial is not None else []),
+        "annees": df["annee"].to_numpy(),
+        "evaluable": df[HISTORIQUE_LASSO].notna().all(axis=1).to_numpy(),
+        "X_foret": X_foret.drop(columns=["annee"]),
+    }
+
+
+def origines(donnees: Dict, premiere: Optional[int] = None) -> List[int]:
+    """Années de coupure possibles : lignes évaluables avant et pendant l'année."""
+    annees, evaluable = donnees["annees"], donnees["evaluable"]
+    candidates = np.unique(annees[evaluable])
+    possibles = [int(a) for a in candidates if (evaluable & (annees < a)).any()]
+    return [a for a in possibles if premiere is None or a >= premiere]
+
+
+def _initialiser(donnees: Dict) -> None:
+    _DONNEES.update(donnees)
+
+
+def evaluer_pli(modele: str, origine: int, donnees: Optional[Dict] = None) -> pd.DataFrame:
+    """Entraîne `modele` sur les années < origine et prédit l'année origine.
+
+    Fenêtre croissante : tout le passé disponible sert à l'entraînement.
+    Renvoie une ligne par musée testé (réel et prédit, en visiteurs).
+    """
+    d = donnees if donnees is not None else _DONNEES
+    df, annees, evaluable = d["df"], d["annees"], d["evaluable"]
+    test = evaluable & (annees == origine)
+
+    if modele == "naif":
+        # Baseline : la fréquentation de l'an dernier
+        predit = df.loc[test, "total_t_1"].to_numpy()
+    elif modele == "lasso":
+        train = evaluable & (annees < origine)
+        features = d["features_num"] + FEATURES_CAT
+        with warnings.catch_warnings():
+            # Contexte jamais vu à l'entraînement (ex : is_reprise) : indicatrice à 0
+            warnings.filterwarnings("ignore", message="Found unknown categories")
+            lasso = construire_lasso(d["features_num"], n_jobs=1, memoire=None,
+                                     cv=plis_par_musee(df.loc[train, "id_museofile"]))
+            lasso.fit(df.loc[train, features], df.loc[train, TARGET])
+            predit = lasso.predict(df.loc[test, features])
+    elif modele == "foret":
+        train = annees < origine
+        X = d["X_foret"]
+        medianes = X[train].median()
+        foret = construire_foret(n_jobs=1)
+        foret.fit(X[train].fillna(medianes), np.log1p(df.loc[train, TARGET]))
+        predit = np.expm1(foret.predict(X[test].fillna(medianes)))
+    else:
+        raise ValueError(f"Modèle inconnu : {modele} (attendu : {', '.join(MODELES)})")
+
+    return pd.DataFrame({
+        "modele": modele,
+        "origine": origine,
+        "region": df.loc[test, "region"].astype(str).to_numpy(),
+        "reel": df.loc[test, TARGET].to_numpy(),
+        "predit": predit,
+    })
+
+
+def _metriques(groupe: pd.DataFrame) -> pd.Series:
+    erreur = groupe["predit"] - groupe["reel"]
+    ecart = groupe["reel"] - groupe["reel"].mean()
+    sst = float((ecart ** 2).sum())
+    return pd.Series({
+        "n": len(groupe),
+        "rmse": float(np.sqrt((erreur ** 2).mean())),
+        "mae": float(erreur.abs().mean()),
+        "r2": 1 - float((erreur ** 2).sum()) / sst if len(groupe) > 1 and sst > 0 else np.nan,
+    })
+
+
+def tableau_metriques(predictions: pd.DataFrame) -> pd.DataFrame:
+    """RMSE / MAE / R² par modèle : toutes origines, par année, par région.
+
+    Format long : une ligne par (modele, niveau, valeur), niveau valant
+    "global", "annee" ou "region".
+    """
+    blocs = []
+    for niveau, cle in [("global", None), ("annee", "origine"), ("region", "region")]:
+        cles = ["modele"] + ([cle] if cle else [])
+        bloc = (
+            predictions.groupby(cles, sort=True)[["reel", "predit"]]
+            .apply(_metriques)
+            .reset_index()
+        )
+        bloc.insert(1, "niveau", niveau)
+        bloc.insert(2, "valeur", bloc.pop(cle).astype(str) if cle else "toutes")
+        blocs.append(bloc)
+    tableau = pd.concat(blocs, ignore_index=True)
+    tableau["n"] = tableau["n"].astype(int)
+    return tableau
+
+
+def backtester(
+    df: pd.DataFrame,
+    modeles: Sequence[str] = MODELES,
+    premiere_origine: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    spatial: Optional[IndexSpatial] = None,
+) -> pd.DataFrame:
+    """Évaluation à origine glissante : un pli par (modèle, année de coupure).
+
+    Les variables sont calculées une fois (preparer_backtest) ; chaque
+    processus du pool les reçoit une fois à son démarrage, puis ne reçoit
+    que (modèle, origine). Avec max_workers=1, les plis s'exécutent dans le
+    processus courant. Renvoie les prédictions de tous les plis
+    (tableau_metriques pour les agréger).
+    """
+    donnees = preparer_backtest(df, spatial)
+    plis = [(m, o) for o in origines(donnees, premiere_origine) for m in modeles]
+
+    if max_workers == 1:
+        resultats = [evaluer_pli(m, o, donnees) for m, o in plis]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_initialiser,
+                                 initargs=(donnees,)) as pool:
+            resultats = list(pool.map(evaluer_pli, *zip(*plis)))
+    return pd.concat(resultats, ignore_index=True)
@@ -1,26 +1,62 @@
 from __future__ import annotations
 
-from typing import Tuple
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
 import numpy as np
 import pandas as pd
 
+from .appariement import corriger_museofile, correspondances_validees, renumeroter_excel
+from .cache import charger_avec_cache, typer_colonnes
 from .chemins import DATA_DIR
+from .jointures import IndexDimension, jointure_gauche
+from .profilage import afficher, apercu
+from .qualite import afficher_rapport, evaluer
+from .schema import appliquer_schema
+
+
+def sources_brutes(data_dir: Path = DATA_DIR) -> Dict[str, Tuple[Path, Callable[..., pd.DataFrame], dict]]:
+    """Chemin, lecteur pandas et options de lecture de chaque fichier brut.
+
+    data_dir : dossier des fichiers (par défaut data/ ; ex : données
+    synthétiques de src/synthetique.py).
+    """
+    freq_path = data_dir / "frequentation-totale-mdf-2001-a-2016-data-def9.xlsx"
+    entrees_path = data_dir / "ENTREES_ET_CATEGORIES_DE_PUBLIC-2.csv"
+    museo_path = data_dir / "museofile (1).csv"  # ton vrai fichier
+
+    # Typage explicite : les identifiants restent des chaînes (zéros initiaux)
+    return {
+        "freq_raw": (freq_path, pd.read_excel, {"dtype": {"REF DU MUSEE": str}}),
+        "ent_raw": (entrees_path, pd.read_csv, {
+            "sep": ";",
+            "dtype": {"IDPatrimostat": str, "IDMuseofile": str, "codeInseeCommune": str},
+        }),
+        "museo_raw": (museo_path, pd.read_csv, {"sep": "|", "dtype": str}),
+    }
+
+
+def load_raw_source(nom: str, use_cache: bool = True, data_dir: Path = DATA_DIR) -> pd.DataFrame:
+    """Charge un fichier brut (freq_raw, ent_raw ou museo_raw)."""
+    chemin, lecteur, options = sources_brutes(data_dir)[nom]
+    if use_cache:
+        return charger_avec_cache(chemin, lecteur, options)
+    return typer_colonnes(lecteur(chemin, **options))
+
+
+def load_raw_data(use_cache: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Charge les 3 fichiers bruts depuis le dossier data/.
+
+    Avec use_cache=True, chaque fichier n'est parsé qu'une fois : les lectures
+    suivantes passent par le cache Arrow tant que le fichier n'a pas changé.
+    """
+    afficher("Chargement des données brutes...")
+    freq_raw, ent_raw, museo_raw = (
+        load_raw_source(nom, use_cache) for nom in ("freq_raw", "ent_raw", "museo_raw")
+    )
 
-
-def load_raw_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """Charge les 3 fichiers bruts depuis le dossier data/."""
-    freq_path = DATA_DIR / "frequentation-totale-mdf-2001-a-2016-data-def9.xlsx"
-    entrees_path = DATA_DIR / "ENTREES_ET_CATEGORIES_DE_PUBLIC-2.csv"
-    museo_path = DATA_DIR / "museofile (1).csv"  # ton vrai fichier
-
-    print("Chargement des données brutes...")
-    freq_raw = pd.read_excel(freq_path)
-    ent_raw = pd.read_csv(entrees_path, sep=";")
-    museo_raw = pd.read_csv(museo_path, sep="|")
-
-    print(f"  freq_raw shape  : {freq_raw.shape}")
-    print(f"  ent_raw shape   : {ent_raw.shape}")
-    print(f"  museo_raw shape : {museo_raw.shape}")
+    afficher(f"  freq_raw shape  : {freq_raw.shape}")
+    afficher(f"  ent_raw shape   : {ent_raw.shape}")
+    afficher(f"  museo_raw shape : {museo_raw.shape}")
     return freq_raw, ent_raw, museo_raw
 
 
@@ -52,28 +88,70 @@ def build_dim_musees(museo_raw: pd.DataFrame) -> pd.DataFrame:
     musees = musees.drop(columns=[c for c in cols_to_drop if c in musees.columns], errors="ignore")
 
     # Séparation lat/lon
-    def split_coords(coord_str):
-        if pd.isna(coord_str):
-            return pd.Series({"latitude": np.nan, "longitude": np.nan})
-        try:
-            lat_str, lon_str = str(coord_str).split(",")
-            return pd.Series({
-                "latitude": float(lat_str.strip()),
-                "longitude": float(lon_str.strip())
-            })
-        except Exception:
-            return pd.Series({"latitude": np.nan, "longitude": np.nan})
-
     if "coordonnees" in musees.columns:
-        coords = musees["coordonnees"].apply(split_coords)
+        coords = split_coords(musees["coordonnees"])
         musees = pd.concat([musees, coords], axis=1)
 
     return musees
 
 
+def _lire_flottants(textes: pd.Series) -> np.ndarray:
+    """float() de chaque chaîne, NaN si illisible ou manquante.
 
-def build_fact_frequentation(ent_raw: pd.DataFrame) -> pd.DataFrame:
-    """Construit la table de fréquentation annuelle (ENTREES...)."""
+    pd.to_numeric traite la masse des valeurs ; seules celles qu'il refuse
+    mais que float() accepte (ex : "1_0", chiffres pleine chasse) passent
+    par float(), une à une.
+    """
+    lisibles = pd.to_numeric(textes, errors="coerce").notna().to_numpy()
+    valeurs = np.full(len(textes), np.nan)
+    # Conversion finale par float() (même arrondi que l'ancien parseur,
+    # le parseur rapide de to_numeric peut différer sur le dernier bit)
+    valeurs[lisibles] = textes[lisibles].to_numpy(dtype=object).astype(np.float64)
+    for i in np.flatnonzero(~lisibles & textes.notna().to_numpy()):
+        try:
+            valeurs[i] = float(textes.iloc[i])
+        except ValueError:
+            pass
+    return valeurs
+
+
+def split_coords(coordonnees: pd.Series) -> pd.DataFrame:
+    """Sépare une série "lat, lon" en colonnes latitude / longitude (float64).
+
+    Version vectorisée du parseur ligne à ligne d'origine (split(",") puis
+    float()), dont elle reprend la lecture des nombres. Différences voulues :
+    une coordonnée n'est gardée que si les deux parties sont lues, finies et
+    dans les bornes (latitude dans [-90, 90], longitude dans [-180, 180]) ;
+    sinon les deux valent NaN ("nan, 2" ou "inf, 1" donnaient une partie
+    lue). La colonne booléenne coords_valides indique les lignes gardées.
+    """
+    # Exactement une virgule : sinon les deux groupes sont manquants
+    parties = coordonnees.astype("string").str.extract(r"^([^,]*),([^,]*)$")
+
+    lat = _lire_flottants(parties[0].str.strip())
+    lon = _lire_flottants(parties[1].str.strip())
+    with np.errstate(invalid="ignore"):
+        valides = (np.isfinite(lat) & np.isfinite(lon)
+                   & (np.abs(lat) <= 90) & (np.abs(lon) <= 180))
+    lat[~valides] = np.nan
+    lon[~valides] = np.nan
+
+    return pd.DataFrame({
+        "latitude": lat,
+        "longitude": lon,
+        "coords_valides": valides,
+    }, index=coordonnees.index)
+
+
+def build_fact_frequentation(
+    ent_raw: pd.DataFrame,
+    correspondances: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """Construit la table de fréquentation annuelle (ENTREES...).
+
+    Les id_museofile manquants ou inconnus de Museofile sont remplacés par
+    ceux de la table de correspondances relue (src/appariement.py).
+    """
     freq = ent_raw.copy()
     
     col_to_drop = [
@@ -102,9 +180,13 @@ def build_fact_frequentation(ent_raw: pd.DataFrame) -> pd.DataFrame:
 
     freq = freq.sort_values(["id_patrimostat", "annee"])
     freq = freq.drop_duplicates(subset=["id_patrimostat", "annee"], keep="first")
+    freq = corriger_museofile(freq, correspondances)
+
+    # Parts calculées en float, puis effectifs en Int32 et chaînes en category
+    freq = appliquer_schema(freq, "fact_freq")
 
-    print("\nAperçu fact_frequentation :")
-    print(freq[["id_patrimostat", "id_museofile", "annee", "total", "payant", "gratuit"]].head())
+    apercu("\nAperçu fact_frequentation :", freq,
+           ["id_patrimostat", "id_museofile", "annee", "total", "payant", "gratuit"])
 
     return freq
 
@@ -136,87 +218,101 @@ def build_fact_freq_excel(freq_raw: pd.DataFrame) -> pd.DataFrame:
 
     freq_long["annee"] = freq_long["annee"].astype(int)
 
-    print("\nAperçu fact_freq_excel :")
-    print(freq_long[["id_patrimostat", "annee", "total_frequentation"]].head())
+    apercu("\nAperçu fact_freq_excel :", freq_long,
+           ["id_patrimostat", "annee", "total_frequentation"])
 
     return freq_long
 
 
-def merge_dataset(
+def joindre_tables(
     musees: pd.DataFrame,
     fact_freq: pd.DataFrame,
     fact_excel: pd.DataFrame
-) -> pd.DataFrame:
-    """Fusionne les tables en df_modele (musee x annee)."""
-    df_f = fact_freq.copy()
-
-    # On supprime d'éventuelles colonnes region/departement côté fréquentation
-    for col in ["region", "Region", "departement", "Departement"]:
-        if col in df_f.columns:
-            df_f = df_f.drop(columns=[col])
-
-    df = df_f.merge(
-        musees[
+) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """Jointures de merge_dataset, par positions entières (src/jointures.py).
+
+    Contrat : id_museofile unique dans musees et (id_patrimostat, annee)
+    unique dans fact_excel, sinon MergeError. Le pd.merge d'origine
+    acceptait une clé de dimension dupliquée et multipliait alors les lignes
+    de fréquentation. Renvoie aussi les clés sans correspondance.
+    """
+    # Les colonnes region/departement de Museofile remplacent celles de la fréquentation
+    df = fact_freq.drop(columns=["Region", "Departement"], errors="ignore")
+
+    return jointure_gauche(df, [
+        (
+            IndexDimension(musees, ["id_museofile"], nom="musees"),
             [
-                "id_museofile", "nom_officiel", "region", "departement",
+                "nom_officiel", "region", "departement",
                 "categorie", "domaine_thematique",
                 "annee_creation", "latitude", "longitude"
-            ]
-        ],
-        on="id_museofile",
-        how="left",
-    )
+            ],
+        ),
+        (
+            IndexDimension(fact_excel, ["id_patrimostat", "annee"], nom="fact_excel"),
+            ["total_frequentation"],
+        ),
+    ])
 
-    # Par sécurité si pandas a créé region_x / region_y
-    if "region_y" in df.columns:
-        df = df.rename(columns={"region_y": "region"})
-        df = df.drop(columns=["region_x"], errors="ignore")
-    if "departement_y" in df.columns:
-        df = df.rename(columns={"departement_y": "departement"})
-        df = df.drop(columns=["departement_x"], errors="ignore")
-
-    df = df.merge(
-        fact_excel[["id_patrimostat", "annee", "total_frequentation"]],
-        on=["id_patrimostat", "annee"],
-        how="left",
-    )
 
-    print("\nAperçu df_modele (fusion) :")
-    print(
-        df[
-            ["id_patrimostat", "id_museofile", "annee",
-             "total", "total_frequentation", "nom_officiel", "region"]
-        ].head()
-    )
-    print(f"\nTaille df_modele : {df.shape}")
+def merge_dataset(
+    musees: pd.DataFrame,
+    fact_freq: pd.DataFrame,
+    fact_excel: pd.DataFrame,
+    correspondances: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """Fusionne les tables en df_modele (musee x annee).
+
+    Les id_patrimostat de l'Excel renumérotés depuis sont d'abord remplacés
+    par l'identifiant actuel (table de correspondances relue), pour que
+    leur historique 2001-2016 soit rattaché. Une ligne par ligne de
+    fact_freq : lève MergeError si un id_museofile de musees ou un couple
+    (id_patrimostat, annee) de fact_excel (après renumérotation) est dupliqué.
+    """
+    renumerotes = correspondances_validees(correspondances, "excel")
+    if renumerotes:
+        n = fact_excel["id_patrimostat"].astype(str).isin(renumerotes.keys()).sum()
+        afficher(f"  Historique Excel rattaché par correspondances : {n} lignes "
+                 f"({len(renumerotes)} id_patrimostat)")
+        fact_excel = renumeroter_excel(fact_excel, correspondances)
+
+    df, non_apparies = joindre_tables(musees, fact_freq, fact_excel)
+    sans_musee, sans_excel = non_apparies["musees"], non_apparies["fact_excel"]
+    afficher(f"  Sans musée Museofile : {sans_musee['n_lignes'].sum()} lignes "
+             f"({len(sans_musee)} id_museofile)")
+    afficher(f"  Sans fréquentation Excel : {sans_excel['n_lignes'].sum()} lignes "
+             f"({len(sans_excel)} couples id_patrimostat x annee)")
+
+    df = appliquer_schema(df, "df_modele")
+
+    apercu("\nAperçu df_modele (fusion) :", df,
+           ["id_patrimostat", "id_museofile", "annee",
+            "total", "total_frequentation", "nom_officiel", "region"])
+    afficher(f"\nTaille df_modele : {df.shape}")
 
     return df
 
 
-def basic_quality_checks(musees, fact_freq, fact_excel, df_modele):
-    """Quelques contrôles qualité simples sur les tables construites."""
-
-    #Nombre de musées et d'années
-    n_musees_dim = musees["id_museofile"].nunique()
-    n_musees_fact = fact_freq["id_museofile"].nunique()
-    n_musees_modele = df_modele["id_museofile"].nunique()
-    annees = sorted(df_modele["annee"].unique())
+def basic_quality_checks(musees, fact_freq, fact_excel, df_modele, annees=None):
+    """Contrôles qualité des tables construites (règles de src/qualite.py).
 
-    print(f"Nombre de musées (dim_musees)      : {n_musees_dim}")
-    print(f"Nombre de musées (fact_frequent.) : {n_musees_fact}")
-    print(f"Nombre de musées (df_modele)      : {n_musees_modele}")
-    print(f"Années couvertes dans df_modele   : {annees[0]}–{annees[-1]}")
-
-    #Doublons (id_museofile, annee)
-    dup = df_modele.duplicated(subset=["id_museofile", "annee"]).sum()
-    print(f"Doublons (id_museofile, annee) : {dup}")
-    if dup > 0:
-        print("Il y a des doublons musée/année dans df_modele.")
-
-    # 3. Valeurs négatives aberrantes sur 'total'
-    if "total" in df_modele.columns:
-        neg_total = (df_modele["total"] < 0).sum()
-        print(f"Entrées totales négatives : {neg_total}")
-        if neg_total > 0:
-            print("Certaines lignes ont un total < 0.")
+    Affiche un résumé puis le rapport des règles, et renvoie le résultat
+    (rapport et lignes en échec exportables). annees : ne contrôle que
+    ces partitions, par exemple une année ajoutée.
+    """
+    tables = {"musees": musees, "fact_freq": fact_freq, "fact_excel": fact_excel, "df_modele": df_modele}
 
+    #Règles (unicité, plages, sommes, continuité, couverture, manquants) ; nombres
+    #de musées et années tirés du même balayage des colonnes
+    resultat = evaluer(tables, annees=annees, resume={
+        "musees": ["id_museofile"], "fact_freq": ["id_museofile"], "df_modele": ["id_museofile", "annee"],
+    })
+    resume = resultat.resume.set_index(["table", "colonne"])
+    print(f"Nombre de musées (dim_musees)      : {resume.loc[('musees', 'id_museofile'), 'n_distincts']}")
+    print(f"Nombre de musées (fact_frequent.) : {resume.loc[('fact_freq', 'id_museofile'), 'n_distincts']}")
+    print(f"Nombre de musées (df_modele)      : {resume.loc[('df_modele', 'id_museofile'), 'n_distincts']}")
+    annees_df = resume.loc[("df_modele", "annee")]
+    print(f"Années couvertes dans df_modele   : {int(annees_df['min'])}–{int(annees_df['max'])}")
+
+    afficher_rapport(resultat)
+    return resultat
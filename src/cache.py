@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+
+from .chemins import CACHE_DIR
+
+# À incrémenter si le format du cache ou le typage des colonnes change
+VERSION_CACHE = 1
+
+
+def empreinte_fichier(chemin: Path, taille_bloc: int = 1 << 20) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier (lu par blocs)."""
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def typer_colonnes(df: pd.DataFrame) -> pd.DataFrame:
+    """Rend les colonnes objet homogènes pour Arrow.
+
+    Les colonnes qui mélangent nombres et textes (ex : années de l'Excel avec
+    des codes 'NC', 'SO', 'F') sont converties en texte, valeurs manquantes
+    conservées. Les colonnes déjà homogènes ne sont pas modifiées.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        valeurs = df[col].dropna()
+        if valeurs.map(type).nunique() > 1:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def charger_avec_cache(
+    chemin: Path,
+    lecteur: Callable[..., pd.DataFrame],
+    options: Optional[dict] = None,
+    cache_dir: Path = CACHE_DIR,
+) -> pd.DataFrame:
+    """Lit un fichier brut en passant par un cache Arrow IPC (Feather v2).
+
+    La clé du cache combine l'empreinte du contenu du fichier, les options de
+    lecture et la version du cache : tant que le fichier source ne change pas,
+    la lecture se fait directement depuis le fichier Arrow (mappé en mémoire,
+    colonnes déjà typées). Le nom du cache porte aussi une empreinte du
+    dossier du fichier : les caches de deux dossiers de données (ex : data/
+    et des données synthétiques de mêmes noms) coexistent.
+    """
+    from pyarrow import feather
+
+    options = options or {}
+    signature = json.dumps(
+        {"options": options, "version": VERSION_CACHE}, sort_keys=True, default=str
+    )
+    cle = hashlib.sha256(
+        (empreinte_fichier(chemin) + signature).encode("utf-8")
+    ).hexdigest()[:16]
+    dossier = hashlib.sha256(str(Path(chemin).resolve().parent).encode("utf-8")).hexdigest()[:8]
+    chemin_cache = cache_dir / f"{Path(chemin).stem}-{dossier}-{cle}.arrow"
+
+    if not chemin_cache.exists():
+        ecrire_cache(typer_colonnes(lecteur(chemin, **options)), chemin_cache)
+
+    # Relecture systématique : froid et chaud renvoient exactement le même frame
+    return feather.read_table(chemin_cache, memory_map=True).to_pandas()
+
+
+def ecrire_cache(df: pd.DataFrame, chemin_cache: Path) -> None:
+    """Écrit un frame au format Arrow IPC en remplaçant les versions périmées.
+
+    Versions périmées : caches de même nom au dernier segment (la clé) près,
+    c'est-à-dire du même fichier source dans le même dossier.
+    """
+    from pyarrow import feather
+
+    cache_dir = chemin_cache.parent
+    prefixe = chemin_cache.stem.rsplit("-", 1)[0]
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Anciennes versions du même fichier (même dossier) : on les remplace
+    for ancien in cache_dir.glob(f"{prefixe}-*.arrow"):
+        ancien.unlink()
+    # Non compressé pour pouvoir être mappé en mémoire à la relecture
+    tmp = chemin_cache.with_suffix(".tmp")
+    feather.write_feather(df, tmp, compression="uncompressed")
+    tmp.replace(chemin_cache)
+
+
+def empreinte_frame(df: pd.DataFrame) -> str:
+    """Empreinte SHA-256 du contenu d'un DataFrame (valeurs + noms de colonnes)."""
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
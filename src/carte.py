@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import html
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .chemins import CACHE_DIR
+
+# Contours des régions (cartiflette), téléchargés une fois
+CACHE_CARTES_DIR = CACHE_DIR / "cartes"
+FICHIER_REGIONS = "regions_metropole_2022.geojson"
+
+# Couleur de chaque thème de la carte
+COULEURS_THEMES = {
+    "Art & Beaux-Arts": "#FF007F",
+    "Histoire": "#4B0082",
+    "Sciences & Techniques": "#9400D3",
+    "Archéologie": "#FF69B4",
+    "Autre": "#D8BFD8",
+}
+
+# Thème d'un musée d'après ses indicateurs de domaine (premier trouvé)
+DOMAINES_THEMES = [
+    ("Art & Beaux-Arts", ["is_beaux_arts", "is_art_moderne_et_contemporain",
+                          "is_arts_décoratifs", "is_photographie"]),
+    ("Histoire", ["is_histoire", "is_militaria"]),
+    ("Sciences & Techniques", ["is_technique_et_industrie", "is_sciences_de_la_nature",
+                               "is_sciences_fondamentales"]),
+    ("Archéologie", ["is_archéologie", "is_egyptien"]),
+]
+
+# France métropolitaine (lat, lon)
+LATITUDES_METROPOLE = (41, 52)
+LONGITUDES_METROPOLE = (-6, 10)
+
+
+def en_metropole(df: pd.DataFrame) -> pd.Series:
+    """Lignes dont les coordonnées tombent en France métropolitaine."""
+    return (
+        df["latitude"].between(*LATITUDES_METROPOLE)
+        & df["longitude"].between(*LONGITUDES_METROPOLE)
+    )
+
+
+def theme_carte(df: pd.DataFrame) -> pd.Series:
+    """Thème de la carte de chaque ligne ("Autre" si aucun domaine reconnu)."""
+    conditions = [
+        df[[c for c in colonnes if c in df.columns]].fillna(0).astype(bool).any(axis=1)
+        for _, colonnes in DOMAINES_THEMES
+    ]
+    return pd.Series(
+        np.select(conditions, [theme for theme, _ in DOMAINES_THEMES], default="Autre"),
+        index=df.index,
+    )
+
+
+def agreger_musees(df: pd.DataFrame) -> pd.DataFrame:
+    """Une ligne par musée localisé : sa dernière année, le nombre d'années et la moyenne.
+
+    Frame précalculé de la carte (thème et textes des popups compris).
+    """
+    df = df.dropna(subset=["latitude", "longitude", "id_museofile"])
+    stats = df.groupby("id_museofile", observed=True)["total"].agg(
+        annees_connues="count", total_moyen="mean"
+    )
+    # Ligne la plus récente de chaque musée
+    dernier = df.sort_values("annee", ascending=False, kind="stable").drop_duplicates("id_museofile")
+    return points_carte(dernier.join(stats, on="id_museofile"))
+
+
+def points_carte(df: pd.DataFrame) -> pd.DataFrame:
+    """Lignes localisées de df avec thème, popup et infobulle.
+
+    Appliqué directement à df_modele, donne un point par musée x année
+    (à afficher avec carte_musees(..., cluster=True)).
+    """
+    points = df.dropna(subset=["latitude", "longitude"]).copy()
+    points["theme"] = theme_carte(points)
+    points["popup"] = popups_html(points)
+    points["tooltip"] = _echapper(points["nom_officiel"]) + " (" + points["theme"] + ")"
+    return points.reset_index(drop=True)
+
+
+def _echapper(serie: pd.Series) -> pd.Series:
+    """Texte d'une colonne échappé pour l'HTML (noms avec &, <, ...)."""
+    return serie.astype(str).map(html.escape)
+
+
+def popups_html(points: pd.DataFrame) -> pd.Series:
+    """HTML du popup de chaque point, construit par opérations sur colonnes."""
+    visiteurs = points["total"].fillna(0).round().astype(np.int64).map("{:,}".format)
+    annee = points["annee"].astype("Int64").astype(str).replace("<NA>", "?")
+    return (
+        '<div style="font-family:sans-serif; width:180px">'
+        + "<b>" + _echapper(points["nom_officiel"]) + "</b><br>"
+        + '<i style="color:gray">' + _echapper(points["ville"]) + "</i><br>"
+        + '<hr style="margin:5px 0">'
+        + "<b>Thème :</b> " + points["theme"] + "<br>"
+        + "<b>Visiteurs (" + annee + ") :</b> " + visiteurs
+        + "</div>"
+    )
+
+
+def geojson_points(points: pd.DataFrame, proprietes=("popup", "tooltip")) -> Dict:
+    """FeatureCollection GeoJSON des points (une Feature par ligne)."""
+    lon = points["longitude"].to_numpy(dtype=float).tolist()
+    lat = points["latitude"].to_numpy(dtype=float).tolist()
+    valeurs = [points[p].astype(str).tolist() for p in proprietes]
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [x, y]},
+                "properties": dict(zip(proprietes, props)),
+            }
+            for x, y, *props in zip(lon, lat, *valeurs)
+        ],
+    }
+
+
+def contours_regions(cache_dir: Path = CACHE_CARTES_DIR) -> Path:
+    """Fichier GeoJSON des régions métropolitaines, téléchargé au premier appel.
+
+    Les appels suivants relisent la copie locale (hors ligne).
+    """
+    chemin = cache_dir / FICHIER_REGIONS
+    if not chemin.exists():
+        from cartiflette import carti_download
+
+        france = carti_download(
+            values=["France"],
+            crs=4326,
+            borders="REGION",
+            vectorfile_format="geojson",
+            simplification=50,
+            filter_by="FRANCE_ENTIERE",
+            source="EXPRESS-COG-CARTO-TERRITOIRE",
+            year=2022,
+        )
+        # Métropole seulement
+        france = france.loc[pd.to_numeric(france["INSEE_REG"], errors="coerce") > 10]
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        chemin.write_text(france.to_json(), encoding="utf-8")
+    return chemin
+
+
+# Marqueur créé côté navigateur pour chaque ligne [lat, lon, popup, couleur]
+_CALLBACK_CLUSTER = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 5, color: row[3], fillColor: row[3], fillOpacity: 0.6
+    });
+    marker.bindPopup(row[2], {maxWidth: 250});
+    return marker;
+};
+"""
+
+
+def carte_musees(points: pd.DataFrame, regions: Optional[Path] = None, cluster: bool = False):
+    """Carte folium à calques (un par thème) des points de agreger_musees.
+
+    Chaque calque est une seule couche GeoJSON (ou, avec cluster=True, un
+    FastMarkerCluster : marqueurs créés et regroupés par le navigateur,
+    adapté à une ligne par musée x année). Les contours des régions
+    (contours_regions) sont ajoutés en fond si fournis.
+    """
+    import folium
+    from folium.plugins import FastMarkerCluster
+
+    carte = folium.Map(location=[46.5, 2.5], zoom_start=6, tiles="CartoDB positron")
+
+    if regions is not None:
+        folium.GeoJson(
+            json.loads(Path(regions).read_text(encoding="utf-8")),
+            name="Régions",
+            style_function=lambda _: {"color": "black", "weight": 1, "fillOpacity": 0},
+            control=False,
+        ).add_to(carte)
+
+    for theme, couleur in COULEURS_THEMES.items():
+        sous_ensemble = points[points["theme"] == theme]
+        if sous_ensemble.empty:
+            continue
+        if cluster:
+            lignes = sous_ensemble[["latitude", "longitude", "popup"]].assign(couleur=couleur)
+            FastMarkerCluster(lignes.values.tolist(), callback=_CALLBACK_CLUSTER, name=theme).add_to(carte)
+        else:
+            folium.GeoJson(
+                geojson_points(sous_ensemble),
+                name=theme,
+                marker=folium.CircleMarker(radius=5, fill=True, fill_opacity=0.6),
+                style_function=lambda _, c=couleur: {"color": c, "fillColor": c},
+                popup=folium.GeoJsonPopup(fields=["popup"], labels=False, max_width=250),
+                tooltip=folium.GeoJsonTooltip(fields=["tooltip"], labels=False),
+            ).add_to(carte)
+
+    folium.LayerControl(collapsed=False).add_to(carte)
+    return carte
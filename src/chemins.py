@@ -1,4 +1,3 @@
-
 from pathlib import Path
 
 # Dossier racine du projet = dossier parent de src/
@@ -7,5 +6,11 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT_DIR / "data"
 OUTPUT_DIR = ROOT_DIR / "output"
 
+# Cache colonnaire des fichiers bruts (reconstructible, non versionné)
+CACHE_DIR = ROOT_DIR / "cache"
+
+# Modèles entraînés (joblib), régénérés par entrainement.py
+MODELES_DIR = ROOT_DIR / "modeles"
+
 # On s'assure que le dossier output existe
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -1,9 +1,28 @@
+from typing import Optional
+
 import numpy as np
 import pandas as pd
 
-def clean_and_enrich(df: pd.DataFrame) -> pd.DataFrame:
-    """Nettoie df_modele et ajoute des variables dérivées utiles pour la modélisation."""
-    df = df.copy()
+from .encodeurs import EncodeurDomaines, NormaliseurCategories, nettoyer_domaines
+from .features import calculer_features
+from .profilage import afficher, apercu
+from .schema import appliquer_schema, en_float
+
+def clean_and_enrich(
+    df: pd.DataFrame,
+    encodeur_domaines: Optional[EncodeurDomaines] = None,
+    normaliseur_categories: Optional[NormaliseurCategories] = None,
+) -> pd.DataFrame:
+    """Nettoie df_modele et ajoute des variables dérivées utiles pour la modélisation.
+
+    encodeur_domaines / normaliseur_categories : composants déjà ajustés à
+    réutiliser (colonnes is_<domaine>, catégories rares) ; par défaut ils
+    sont ajustés sur df.
+
+    Les calculs se font en float (effectifs Int32 convertis), le résultat
+    est remis au schéma compact de src/schema.py.
+    """
+    df = en_float(df)
 
     # ==============================================================================
     # 1. TYPAGE ET NETTOYAGE DE BASE
@@ -44,57 +63,29 @@ def clean_and_enrich(df: pd.DataFrame) -> pd.DataFrame:
         # Indicateur 
         df["age_musee_missing"] = df["age_musee"].isna().astype(int)
 
-    # Lags (Année précédente)
-    df_lag = df[["id_museofile", "annee", "total"]].copy()
-    df_lag["annee"] = df_lag["annee"] + 1 
-    df_lag = df_lag.rename(columns={"total": "total_t_1"})
-    
-    df = df.merge(df_lag, on=["id_museofile", "annee"], how="left")
-
-    # Calcul de la croissance
-    df["croissance_total"] = np.where(
-        (df["total_t_1"] > 0) & (df["total_t_1"].notna()),
-        (df["total"] - df["total_t_1"]) / df["total_t_1"],
-        np.nan
-    )
-    df["croissance_total"] = df["croissance_total"].replace([np.inf, -np.inf], np.nan)
+    # Lag (année précédente du même musée) et croissance, sur le panel trié
+    # une fois : une année manquante laisse total_t_1 vide
+    temporelles = calculer_features(df, lags={"total": (1,)}, croissance={"total": (1,)})
+    df[temporelles.columns.tolist()] = temporelles
 
     # ==============================================================================
     # 3. GESTION INTELLIGENTE DES DOMAINES (Multi-label)
     # ==============================================================================
     if "domaine_thematique" in df.columns:
-        print("Traitement des domaines thématiques...")
-        
-        def clean_text_domain(x):
-            if pd.isna(x): return None
-            x = str(x).lower().strip().rstrip(".")
-            # Uniformisation des séparateurs
-            x = x.replace(";", "/").replace(",", "/").replace("|", "/").replace(".", " /")
-            x = " ".join(x.split())
-            return x
-
-        # Nettoyage et transformation en liste
-        df["domaine_clean"] = df["domaine_thematique"].apply(clean_text_domain)
-        df["domaine_list"] = df["domaine_clean"].apply(lambda x: x.split("/") if pd.notna(x) else [])
-
-        # Identification des Top Domaines (> 50 occurrences)
-        all_domaines = df["domaine_list"].explode().str.strip()
-        compte_domaines = all_domaines.value_counts()
-        SEUIL_DOMAINE = 50
-        domaines_a_garder = compte_domaines[compte_domaines > SEUIL_DOMAINE].index.tolist()
-
-        # Création des colonnes binaires (is_beaux_arts, is_histoire...)
-        for dom in domaines_a_garder:
-            if pd.isna(dom) or dom == "": continue
-            
-            # Nom de colonne propre (ex: "beaux-arts" -> "is_beaux_arts")
-            col_name = f"is_{dom.replace(' ', '_').replace('-', '_')}"
-            
-            # 1 si présent, 0 sinon
-            df[col_name] = df["domaine_list"].apply(
-                lambda liste: 1 if dom in [x.strip() for x in liste] else 0
-            )
-            
+        afficher("Traitement des domaines thématiques...")
+
+        # Nettoyage et transformation en liste (une fois par valeur distincte)
+        df[["domaine_clean", "domaine_list"]] = nettoyer_domaines(df["domaine_thematique"])
+
+        # Identification des Top Domaines (> SEUIL_DOMAINE occurrences),
+        # sauf si un encodeur déjà ajusté est fourni (ex : nouvelle année)
+        if encodeur_domaines is None:
+            encodeur_domaines = EncodeurDomaines().fit(df["domaine_thematique"])
+
+        # Création des colonnes binaires (is_beaux_arts, is_histoire...) en une passe
+        indicateurs = encodeur_domaines.transform(df["domaine_thematique"])
+        df[indicateurs.columns.tolist()] = indicateurs
+
         # Nettoyage intermédiaire (optionnel, on peut garder pour verif)
         # df = df.drop(columns=["domaine_clean", "domaine_list"])
 
@@ -106,101 +97,26 @@ def clean_and_enrich(df: pd.DataFrame) -> pd.DataFrame:
         df["region"] = df["region"].astype(str).str.strip()
         df["est_idf"] = (df["region"] == "Île-de-France").astype(int)
 
-    print("\nAperçu df_modele après nettoyage/enrichissement :")
     cols_view = ["id_museofile", "annee", "total", "total_frequentation", "age_musee"]
     # On ajoute quelques colonnes domaines si elles existent pour vérifier
     cols_dom = [c for c in df.columns if c.startswith("is_")][:2]
-    print(df[cols_view + cols_dom].head())
+    apercu("\nAperçu df_modele après nettoyage/enrichissement :", df, cols_view + cols_dom)
 
     
     # ==============================================================================
     # 4. NETTOYAGE DES CATÉGORIES (Utilisation de votre Mapping)
     # ==============================================================================
     if "categorie" in df.columns:
-        print("Nettoyage des catégories...")
-
-        # 1. Fonction de nettoyage texte simple
-        def clean_cat_text(x):
-            if pd.isna(x): return "Autre"
-            x = str(x).lower().strip().rstrip(".")
-            x = x.replace(";", "/").replace(",", "/").replace("|", "/").replace(".", " /")
-            x = " ".join(x.split())
-            return x
-
-        df["categorie"] = df["categorie"].apply(clean_cat_text)
-
-        # 2. Votre dictionnaire de regroupement (C'est le cœur du nettoyage)
-        map_cat = {
-            "ecomusée": "écomusée",
-            "maison d'artiste": "maison musée",
-            "maison d'illustre": "maison musée",
-            "maison des illustres": "maison musée",
-            "musée en zone rurale": "musée en milieu rural",
-            "musée de site : site archéologique": "musée de site",
-            "musée de site : carreau de mine": "musée de site",
-            "architecture contemporaine remarquable (extension)": "architecture contemporaine remarquable",
-            "musée de site : usine": "musée de site",
-            "musée de site / musée en milieu rural" : "musée en milieu rural",
-            "écomusée / musée en milieu rural": "musée en milieu rural",
-            "écomusée / musée en zone rurale": "musée en milieu rural",
-            "musée de site / musée en zone rurale" : " musée en milieu rural",
-            "maison musée / maison des illustres" : "maison musée",
-            "musée littéraire / musée en milieu rural": "musée en milieu rural",
-            "musée de site / jardin remarquable": "jardin remarquable",
-            "domaine national / jardin remarquable": "jardin remarquable",
-            "maison des illustres / musée en milieu rural": "musée en milieu rural",
-            "maison musée / maison des illustres / musée en milieu rural": "musée en milieu rural",
-            "musée de plein air / musée en milieu rural": "musée en milieu rural",
-            "musée de site / architecture contemporaine remarquable": "architecture contemporaine remarquable",
-            "musée d'art sacré / musée en milieu rural": "musée en milieu rural",
-            "musée de site / maison d'artiste" : "maison musée",
-            "musée de site / maison des illustres" : "maison musée",
-            "musée de site / site archéologique / musée en milieu rural": "musée en milieu rural",
-            "ecomusée / musée de plein air / musée de site" : "écomusée",
-            "musée de site / musée en zone rurale / site archéologique" : "musée en milieu rural",
-            "ecomusée / musée de plein air" : "écomusée", 
-            "ecomusée / musée de site" : "écomusée",
-            "musée de site / maison musée / maison des illustres" : "maison musée",
-            "musée de site / musée littéraire" : "musée littéraire",
-            "musée de site / domaine national": "domaine national",
-            "écomusée / musée de site / musée en zone rurale" : "musée en milieu rural",
-            "architecture contemporaine remarquable / musée en milieu rural" :"musée en milieu rural",
-            "musée de plein air / musée de site":"musée de site",
-            "musée de plein air / maison musée / maison des illustres / musée en milieu rural" : "musée en milieu rural",
-            "écomusée / musée de plein air / musée de site / musée en milieu rural" :"musée en milieu rural",
-            "musée de plein air / musée de site / musée en zone rurale":"musée en milieu rural",
-            "musée de site / musée littéraire / maison des illustres (2017)": "maison musée littéraire",
-            "musée littéraire / architecture contemporaine remarquable": "musée littéraire",
-            "musée de site / musée littéraire / maison des illustres / musée en milieu rural" : "musée en milieu rural",
-            "musée de site / maison musée / musée littéraire / maison des illustres / musée en zone rurale": "musée en milieu rural",
-            "maison musée / maison d'artiste / musée littéraire" : "maison musée littéraire",
-            "écomusée / musée de site / musée en milieu rural" : "musée en milieu rural",
-            "écomusée / musée de plein air / musée de site / jardin remarquable / musée en zone rurale" : "musée en milieu rural",
-            "maison musée / maison des illustres / musée en zone rurale" : "musée en milieu rural",
-            "musée littéraire / maison des illustres / musée en zone rurale": "musée en milieu rural",
-            "maison d'artiste / musée littéraire / maison des illustres": "maison musée",
-            "maison musée / maison des illustres / jardin remarquable" : "maison musée",
-            "maison musée / / maison des illustres / musée en milieu rural" : "musée en milieu rural",
-            "musée de mode/ maison des illustres" : "musée de mode",
-            "musée de site / maison d'artiste / musée d'art sacré" : "maison musée",
-            "jardin remarquable / musée en milieu rural" : "musée en milieu rural",
-            "maison musée / musée littéraire / maison des illustres / jardin remarquable" : "maison musée littéraire",
-            "musée de site / maison musée / musée littéraire / maison des illustres" : "maison musée littéraire",
-            "maison musée / musée littéraire" : "maison musée littéraire",
-            "musée littéraire / maison des illustres / musée en milieu rural" : "musée en milieu rural",
-            "maison musée / musée littéraire / maison des illustres / musée en milieu rural" : "musée en milieu rural",
-            "maison musée / musée littéraire / maison des illustres" : "maison musée littéraire",
-            "musée littéraire / maison des illustres" : "maison musée littéraire"
-        }
-
-        # 3. Application du mapping
-        # Si une catégorie n'est pas dans le dictionnaire, on garde le texte nettoyé original
-        df["categorie"] = df["categorie"].replace(map_cat)
-        
-        # Petit regroupement pour les cas très rares (< 10 musées)
-        # On les met dans "Autre" pour éviter d'avoir des colonnes inutiles
-        top_cats = df["categorie"].value_counts()
-        rares = top_cats[top_cats < 10].index
-        df.loc[df["categorie"].isin(rares), "categorie"] = "Autre"
-
-        return df
\ No newline at end of file
+        afficher("Nettoyage des catégories...")
+
+        # Nettoyage texte + regroupement MAP_CAT (une fois par valeur distincte)
+        # Petit regroupement pour les cas très rares (< 10 musées) : on les met
+        # dans "Autre" pour éviter d'avoir des colonnes inutiles
+        if normaliseur_categories is None:
+            normaliseur_categories = NormaliseurCategories().fit(df["categorie"])
+        non_mappees = normaliseur_categories.rapport_non_mappees(df["categorie"])
+        afficher(f"  {len(non_mappees)} catégories brutes hors MAP_CAT "
+                 f"({non_mappees['n_lignes'].sum()} lignes)")
+        df["categorie"] = normaliseur_categories.transform(df["categorie"])
+
+    return appliquer_schema(df, "df_modele_clean")
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Un domaine doit apparaître plus de SEUIL_DOMAINE fois pour avoir sa colonne
+SEUIL_DOMAINE = 50
+
+
+def clean_text_domain(x):
+    """Nettoyage texte d'un domaine thématique brut (séparateurs uniformisés)."""
+    if pd.isna(x): return None
+    x = str(x).lower().strip().rstrip(".")
+    # Uniformisation des séparateurs
+    x = x.replace(";", "/").replace(",", "/").replace("|", "/").replace(".", " /")
+    x = " ".join(x.split())
+    return x
+
+
+def nettoyer_domaines(domaines: pd.Series) -> pd.DataFrame:
+    """Renvoie domaine_clean et domaine_list pour une série de domaines bruts.
+
+    Le nettoyage n'est fait qu'une fois par valeur distincte, puis redistribué
+    sur les lignes (la colonne ne compte que quelques centaines de valeurs).
+    """
+    codes, uniques = pd.factorize(domaines)
+    clean_uniques = [clean_text_domain(x) for x in uniques]
+    listes_uniques = [x.split("/") if x is not None else [] for x in clean_uniques]
+
+    clean = np.array(clean_uniques + [None], dtype=object)[codes]
+    listes = np.empty(len(uniques) + 1, dtype=object)
+    for i, liste in enumerate(listes_uniques + [[]]):
+        listes[i] = liste
+    # Le code -1 (valeur manquante) pointe sur la dernière case : None / []
+    return pd.DataFrame(
+        {"domaine_clean": clean, "domaine_list": listes[codes]},
+        index=domaines.index,
+    )
+
+
+def nom_colonne_domaine(dom: str) -> str:
+    """Nom de colonne propre (ex: "beaux-arts" -> "is_beaux_arts")."""
+    return f"is_{dom.replace(' ', '_').replace('-', '_')}"
+
+
+class EncodeurDomaines:
+    """Encodeur multi-label des domaines thématiques (colonnes is_<domaine>).
+
+    fit() compte les domaines une seule fois et retient ceux qui dépassent le
+    seuil ; transform() réapplique ce vocabulaire figé à de nouvelles lignes
+    (ex : une nouvelle année) sans recalculer les comptages. fit(),
+    transform() et matrice() prennent tous les domaines bruts
+    (domaine_thematique) et les nettoient eux-mêmes.
+    """
+
+    def __init__(self, seuil: int = SEUIL_DOMAINE):
+        self.seuil = seuil
+        self.vocabulaire_: Optional[List[str]] = None
+
+    @staticmethod
+    def _eclater(domaines: pd.Series) -> pd.Series:
+        """Une ligne par (position de ligne, domaine), domaines nettoyés."""
+        premiere = domaines.dropna().head(1)
+        if len(premiere) and isinstance(premiere.iloc[0], list):
+            raise TypeError(
+                "EncodeurDomaines attend les domaines bruts (domaine_thematique), "
+                "pas domaine_list."
+            )
+        domaine_list = nettoyer_domaines(domaines)["domaine_list"]
+        eclate = domaine_list.reset_index(drop=True).explode().str.strip()
+        return eclate[eclate.notna() & (eclate != "")]
+
+    def fit(self, domaines: pd.Series) -> "EncodeurDomaines":
+        """Apprend le vocabulaire à partir d'une série de domaines bruts."""
+        eclate = self._eclater(domaines)
+        compte_domaines = eclate.value_counts()
+        self.vocabulaire_ = compte_domaines[compte_domaines > self.seuil].index.tolist()
+        return self
+
+    def matrice(self, domaines: pd.Series):
+        """Matrice indicatrice creuse (scipy CSR), lignes x vocabulaire."""
+        from scipy import sparse
+
+        lignes, colonnes = self._positions(domaines)
+        valeurs = np.ones(len(lignes), dtype=np.int8)
+        m = sparse.csr_matrix(
+            (valeurs, (lignes, colonnes)),
+            shape=(len(domaines), len(self.vocabulaire_)),
+        )
+        # Un domaine répété dans la même liste ne compte qu'une fois
+        m.data[:] = 1
+        return m
+
+    def _positions(self, domaines: pd.Series):
+        if self.vocabulaire_ is None:
+            raise ValueError("EncodeurDomaines non ajusté : appeler fit() d'abord.")
+        eclate = self._eclater(domaines)
+        colonnes = pd.Index(self.vocabulaire_).get_indexer(eclate.to_numpy())
+        garde = colonnes >= 0
+        return eclate.index.to_numpy()[garde], colonnes[garde]
+
+    def transform(self, domaines: pd.Series, sparse: bool = False) -> pd.DataFrame:
+        """Colonnes is_<domaine> (0/1) alignées sur l'index de domaines.
+
+        Avec sparse=True, les colonnes utilisent le dtype creux de pandas.
+        """
+        lignes, colonnes = self._positions(domaines)
+        dense = np.zeros((len(domaines), len(self.vocabulaire_)), dtype=np.int64)
+        dense[lignes, colonnes] = 1
+
+        # Deux domaines peuvent donner le même nom de colonne : le dernier
+        # l'emporte, à la position du premier (même règle que df[col] = ...)
+        indicateurs: Dict[str, np.ndarray] = {}
+        for j, dom in enumerate(self.vocabulaire_):
+            indicateurs[nom_colonne_domaine(dom)] = dense[:, j]
+
+        out = pd.DataFrame(indicateurs, index=domaines.index)
+        if sparse:
+            out = out.astype(pd.SparseDtype("int64", 0))
+        return out
+
+    def to_dict(self) -> dict:
+        """État sérialisable (JSON) de l'encodeur ajusté."""
+        return {"seuil": self.seuil, "vocabulaire": self.vocabulaire_}
+
+    @classmethod
+    def from_dict(cls, etat: dict) -> "EncodeurDomaines":
+        """Recrée un encodeur ajusté à partir de to_dict()."""
+        encodeur = cls(seuil=etat["seuil"])
+        encodeur.vocabulaire_ = list(etat["vocabulaire"])
+        return encodeur
+
+
+# ==============================================================================
+# CATÉGORIES
+# ==============================================================================
+# Dictionnaire de regroupement des catégories (texte nettoyé -> catégorie)
+MAP_CAT = {
+    "ecomusée": "écomusée",
+    "maison d'artiste": "maison musée",
+    "maison d'illustre": "maison musée",
+    "maison des illustres": "maison musée",
+    "musée en zone rurale": "musée en milieu rural",
+    "musée de site : site archéologique": "musée de site",
+    "musée de site : carreau de mine": "musée de site",
+    "architecture contemporaine remarquable (extension)": "architecture contemporaine remarquable",
+    "musée de site : usine": "musée de site",
+    "musée de site / musée en milieu rural" : "musée en milieu rural",
+    "écomusée / musée en milieu rural": "musée en milieu rural",
+    "écomusée / musée en zone rurale": "musée en milieu rural",
+    "musée de site / musée en zone rurale" : " musée en milieu rural",
+    "maison musée / maison des illustres" : "maison musée",
+    "musée littéraire / musée en milieu rural": "musée en milieu rural",
+    "musée de site / jardin remarquable": "jardin remarquable",
+    "domaine national / jardin remarquable": "jardin remarquable",
+    "maison des illustres / musée en milieu rural": "musée en milieu rural",
+    "maison musée / maison des illustres / musée en milieu rural": "musée en milieu rural",
+    "musée de plein air / musée en milieu rural": "musée en milieu rural",
+    "musée de site / architecture contemporaine remarquable": "architecture contemporaine remarquable",
+    "musée d'art sacré / musée en milieu rural": "musée en milieu rural",
+    "musée de site / maison d'artiste" : "maison musée",
+    "musée de site / maison des illustres" : "maison musée",
+    "musée de site / site archéologique / musée en milieu rural": "musée en milieu rural",
+    "ecomusée / musée de plein air / musée de site" : "écomusée",
+    "musée de site / musée en zone rurale / site archéologique" : "musée en milieu rural",
+    "ecomusée / musée de plein air" : "écomusée", 
+    "ecomusée / musée de site" : "écomusée",
+    "musée de site / maison musée / maison des illustres" : "maison musée",
+    "musée de site / musée littéraire" : "musée littéraire",
+    "musée de site / domaine national": "domaine national",
+    "écomusée / musée de site / musée en zone rurale" : "musée en milieu rural",
+    "architecture contemporaine remarquable / musée en milieu rural" :"musée en milieu rural",
+    "musée de plein air / musée de site":"musée de site",
+    "musée de plein air / maison musée / maison des illustres / musée en milieu rural" : "musée en milieu rural",
+    "écomusée / musée de plein air / musée de site / musée en milieu rural" :"musée en milieu rural",
+    "musée de plein air / musée de site / musée en zone rurale":"musée en milieu rural",
+    "musée de site / musée littéraire / maison des illustres (2017)": "maison musée littéraire",
+    "musée littéraire / architecture contemporaine remarquable": "musée littéraire",
+    "musée de site / musée littéraire / maison des illustres / musée en milieu rural" : "musée en milieu rural",
+    "musée de site / maison musée / musée littéraire / maison des illustres / musée en zone rurale": "musée en milieu rural",
+    "maison musée / maison d'artiste / musée littéraire" : "maison musée littéraire",
+    "écomusée / musée de site / musée en milieu rural" : "musée en milieu rural",
+    "écomusée / musée de plein air / musée de site / jardin remarquable / musée en zone rurale" : "musée en milieu rural",
+    "maison musée / maison des illustres / musée en zone rurale" : "musée en milieu rural",
+    "musée littéraire / maison des illustres / musée en zone rurale": "musée en milieu rural",
+    "maison d'artiste / musée littéraire / maison des illustres": "maison musée",
+    "maison musée / maison des illustres / jardin remarquable" : "maison musée",
+    "maison musée / / maison des illustres / musée en milieu rural" : "musée en milieu rural",
+    "musée de mode/ maison des illustres" : "musée de mode",
+    "musée de site / maison d'artiste / musée d'art sacré" : "maison musée",
+    "jardin remarquable / musée en milieu rural" : "musée en milieu rural",
+    "maison musée / musée littéraire / maison des illustres / jardin remarquable" : "maison musée littéraire",
+    "musée de site / maison musée / musée littéraire / maison des illustres" : "maison musée littéraire",
+    "maison musée / musée littéraire" : "maison musée littéraire",
+    "musée littéraire / maison des illustres / musée en milieu rural" : "musée en milieu rural",
+    "maison musée / musée littéraire / maison des illustres / musée en milieu rural" : "musée en milieu rural",
+    "maison musée / musée littéraire / maison des illustres" : "maison musée littéraire",
+    "musée littéraire / maison des illustres" : "maison musée littéraire"
+}
+
+# Une catégorie portée par moins de SEUIL_CATEGORIE_RARE lignes devient "Autre"
+SEUIL_CATEGORIE_RARE = 10
+
+
+def clean_cat_text(x):
+    """Nettoyage texte simple d'une catégorie brute."""
+    if pd.isna(x): return "Autre"
+    x = str(x).lower().strip().rstrip(".")
+    x = x.replace(";", "/").replace(",", "/").replace("|", "/").replace(".", " /")
+    x = " ".join(x.split())
+    return x
+
+
+@lru_cache(maxsize=None)
+def normaliser_categorie(brute: str) -> str:
+    """Catégorie regroupée pour une valeur brute (mémoïsé entre les appels).
+
+    Si le texte nettoyé n'est pas dans MAP_CAT, on garde le texte nettoyé.
+    """
+    propre = clean_cat_text(brute)
+    return MAP_CAT.get(propre, propre)
+
+
+class NormaliseurCategories:
+    """Normalisation des catégories : nettoyage, regroupement MAP_CAT, rares.
+
+    Le travail se fait sur les valeurs distinctes (factorize -> map -> take),
+    le coût dépend donc du nombre de catégories et non du nombre de lignes.
+    fit() retient les catégories rares ; transform() renvoie une colonne
+    categorical.
+    """
+
+    def __init__(self, seuil_rare: int = SEUIL_CATEGORIE_RARE):
+        self.seuil_rare = seuil_rare
+        self.categories_rares_: Optional[List[str]] = None
+
+    @staticmethod
+    def _regrouper(categories: pd.Series):
+        """Codes par ligne et catégories regroupées distinctes (avant rares)."""
+        codes, uniques = pd.factorize(categories)
+        normalisees = [normaliser_categorie(x) for x in uniques] + ["Autre"]
+        # Le code -1 (valeur manquante) pointe sur la dernière case : "Autre"
+        codes_norm, valeurs = pd.factorize(pd.Index(normalisees))
+        return codes_norm[codes], valeurs
+
+    def fit(self, categories: pd.Series) -> "NormaliseurCategories":
+        """Repère les catégories regroupées trop rares."""
+        codes, valeurs = self._regrouper(categories)
+        compte = np.bincount(codes, minlength=len(valeurs))
+        self.categories_rares_ = [
+            v for v, n in zip(valeurs, compte) if 0 < n < self.seuil_rare
+        ]
+        return self
+
+    def transform(self, categories: pd.Series) -> pd.Series:
+        """Catégories normalisées (dtype category), rares regroupées en "Autre"."""
+        if self.categories_rares_ is None:
+            raise ValueError("NormaliseurCategories non ajusté : appeler fit() d'abord.")
+        codes, valeurs = self._regrouper(categories)
+        rares = set(self.categories_rares_)
+        finales = np.array(
+            ["Autre" if v in rares else v for v in valeurs], dtype=object
+        )[codes]
+        return pd.Series(
+            pd.Categorical(finales), index=categories.index, name=categories.name
+        )
+
+    def rapport_non_mappees(self, categories: pd.Series) -> pd.DataFrame:
+        """Catégories brutes dont le texte nettoyé n'est pas prévu par MAP_CAT.
+
+        Une valeur est signalée si son texte nettoyé n'est ni une clé ni une
+        cible du dictionnaire : elle passe telle quelle (ou part en "Autre").
+        """
+        compte = categories.value_counts(dropna=False)
+        connues = set(MAP_CAT) | set(MAP_CAT.values()) | {"Autre"}
+        rares = set(self.categories_rares_ or [])
+        lignes = []
+        for brute, n in compte.items():
+            propre = clean_cat_text(brute)
+            if propre in connues:
+                continue
+            finale = normaliser_categorie(brute) if pd.notna(brute) else "Autre"
+            lignes.append({
+                "categorie_brute": brute,
+                "categorie_nettoyee": propre,
+                "n_lignes": int(n),
+                "regroupee_autre": finale in rares,
+            })
+        return pd.DataFrame(
+            lignes,
+            columns=["categorie_brute", "categorie_nettoyee", "n_lignes", "regroupee_autre"],
+        )
+
+    def to_dict(self) -> dict:
+        """État sérialisable (JSON) du normaliseur ajusté."""
+        return {"seuil_rare": self.seuil_rare, "categories_rares": self.categories_rares_}
+
+    @classmethod
+    def from_dict(cls, etat: dict) -> "NormaliseurCategories":
+        """Recrée un normaliseur ajusté à partir de to_dict()."""
+        normaliseur = cls(seuil_rare=etat["seuil_rare"])
+        normaliseur.categories_rares_ = list(etat["categories_rares"])
+        return normaliseur
+
+
+def ajuster_encodeur_domaines(df_modele: pd.DataFrame) -> EncodeurDomaines:
+    """Encodeur des domaines ajusté sur df_modele (un musée x année par ligne)."""
+    return EncodeurDomaines().fit(df_modele["domaine_thematique"])
+
+
+def ajuster_normaliseur_categories(df_modele: pd.DataFrame) -> NormaliseurCategories:
+    """Normaliseur des catégories ajusté sur df_modele."""
+    return NormaliseurCategories().fit(df_modele["categorie"])
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from typing import Dict, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class PanelAnnuel:
+    """Panel musée x année trié une seule fois pour les décalages temporels.
+
+    Chaque ligne reçoit une clé entière (code du musée, année) ; la ligne de
+    l'année t-k du même musée est retrouvée par recherche dichotomique sur
+    les clés triées. Les décalages portent donc sur l'année et non sur le
+    rang : si 2020 manque, le t-1 de 2021 est vide (et non 2019).
+
+    Une ligne sans identifiant n'a pas de passé. Si un musée a plusieurs
+    lignes la même année, la première dans l'ordre du frame sert de
+    référence.
+    """
+
+    def __init__(self, df: pd.DataFrame, cle: str = "id_museofile", annee: str = "annee"):
+        codes, _ = pd.factorize(df[cle])
+        annees = df[annee].to_numpy(dtype=np.int64)
+        self.n = len(df)
+        self.decalage_annee = annees - (annees.min() if self.n else 0)
+        etendue = int(self.decalage_annee.max()) + 1 if self.n else 1
+
+        self.valides = codes >= 0
+        self.cles = np.where(self.valides, codes * etendue + self.decalage_annee, -1)
+        # Tri stable : à musée et année égaux, l'ordre du frame est conservé
+        self.ordre = np.lexsort((self.decalage_annee, codes))
+        self.cles_triees = self.cles[self.ordre]
+        self._positions: Dict[int, np.ndarray] = {}
+
+    def positions(self, k: int) -> np.ndarray:
+        """Ligne (position dans le frame) de l'année t-k du même musée, -1 sinon."""
+        if self.n == 0:
+            return np.empty(0, dtype=np.intp)
+        if k not in self._positions:
+            cibles = self.cles - k
+            pos = np.searchsorted(self.cles_triees, cibles, side="left")
+            pos = np.minimum(pos, self.n - 1)
+            trouvee = (
+                self.valides
+                & (self.decalage_annee >= k)
+                & (self.cles_triees[pos] == cibles)
+            )
+            self._positions[k] = np.where(trouvee, self.ordre[pos], -1)
+        return self._positions[k]
+
+    def decaler(self, valeurs: np.ndarray, k: int) -> np.ndarray:
+        """Valeurs de l'année t-k (NaN si absente)."""
+        pos = self.positions(k)
+        out = np.full(self.n, np.nan)
+        trouvees = pos >= 0
+        out[trouvees] = valeurs[pos[trouvees]]
+        return out
+
+
+def _en_float(serie: pd.Series) -> np.ndarray:
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def calculer_features(
+    df: pd.DataFrame,
+    lags: Optional[Mapping[str, Sequence[int]]] = None,
+    maximum: Optional[Mapping[str, Sequence[int]]] = None,
+    moyenne: Optional[Mapping[str, Sequence[int]]] = None,
+    croissance: Optional[Mapping[str, Sequence[int]]] = None,
+    cle: str = "id_museofile",
+    annee: str = "annee",
+) -> pd.DataFrame:
+    """Variables temporelles calculées en une passe sur le panel trié.
+
+    - lags : {"total": (1, 2, 3)} -> total_t_1, total_t_2, total_t_3 ;
+    - maximum / moyenne : {"total": (3,)} -> total_max_3ans / total_moy_3ans,
+      sur les années t-1 à t-3 présentes (NaN si aucune) ;
+    - croissance : {"total": (1,)} -> croissance_total, (x_t - x_{t-k}) / x_{t-k}
+      si x_{t-k} > 0 (croissance_total_2ans pour k = 2, etc.).
+
+    Les ratios (part_gratuit, ...) se décalent comme les effectifs. Le
+    résultat est aligné sur l'index de df, colonnes en float64.
+    """
+    lags, maximum = lags or {}, maximum or {}
+    moyenne, croissance = moyenne or {}, croissance or {}
+    panel = PanelAnnuel(df, cle=cle, annee=annee)
+
+    valeurs: Dict[str, np.ndarray] = {}
+    decales: Dict[tuple, np.ndarray] = {}
+
+    def decale(col: str, k: int) -> np.ndarray:
+        if col not in valeurs:
+            valeurs[col] = _en_float(df[col])
+        if (col, k) not in decales:
+            decales[(col, k)] = panel.decaler(valeurs[col], k)
+        return decales[(col, k)]
+
+    out: Dict[str, np.ndarray] = {}
+    for col, ks in lags.items():
+        for k in ks:
+            out[f"{col}_t_{k}"] = decale(col, k)
+
+    for col, fenetres in maximum.items():
+        for n in fenetres:
+            pile = np.vstack([decale(col, k) for k in range(1, n + 1)])
+            # fmax ignore les NaN (NaN seulement si toute la fenêtre manque)
+            out[f"{col}_max_{n}ans"] = np.fmax.reduce(pile, axis=0)
+
+    for col, fenetres in moyenne.items():
+        for n in fenetres:
+            pile = np.vstack([decale(col, k) for k in range(1, n + 1)])
+            presentes = (~np.isnan(pile)).sum(axis=0)
+            somme = np.nansum(pile, axis=0)
+            out[f"{col}_moy_{n}ans"] = np.divide(
+                somme, presentes, out=np.full(panel.n, np.nan), where=presentes > 0
+            )
+
+    for col, horizons in croissance.items():
+        if col not in valeurs:
+            valeurs[col] = _en_float(df[col])
+        for k in horizons:
+            passe = decale(col, k)
+            nom = f"croissance_{col}" if k == 1 else f"croissance_{col}_{k}ans"
+            out[nom] = np.divide(
+                valeurs[col] - passe, passe,
+                out=np.full(panel.n, np.nan), where=passe > 0,
+            )
+
+    return pd.DataFrame(out, index=df.index)
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+from .appariement import charger_correspondances
+from .build_bases import (
+    build_dim_musees,
+    build_fact_frequentation,
+    build_fact_freq_excel,
+    merge_dataset,
+)
+from .cache import empreinte_frame
+from .chemins import OUTPUT_DIR
+from .cleaning import clean_and_enrich
+from .encodeurs import (
+    EncodeurDomaines,
+    NormaliseurCategories,
+    ajuster_encodeur_domaines,
+    ajuster_normaliseur_categories,
+)
+from .stockage import NOMS_SORTIES, ecrire_table, exporter_sorties, lire_table, table_existe
+
+FICHIER_ETAT = "etat_incremental.json"
+TABLE_PARTITIONS = "partitions_frequentation"
+
+# Valeur de remplacement des id_museofile manquants dans les clés
+# (merge apparie NaN avec NaN : on garde le même comportement)
+SANS_ID = "<sans id_museofile>"
+
+
+def empreintes_partitions(fact_freq: pd.DataFrame) -> pd.DataFrame:
+    """Une empreinte par partition (id_patrimostat, annee) de fact_freq."""
+    out = fact_freq[["id_patrimostat", "annee", "id_museofile"]].copy()
+    out["empreinte"] = pd.util.hash_pandas_object(fact_freq, index=False).to_numpy()
+    return out
+
+
+def _cles(df: pd.DataFrame, decalage: int = 0) -> pd.MultiIndex:
+    """Clés (id_museofile, annee + decalage) d'un frame."""
+    return pd.MultiIndex.from_arrays([
+        df["id_museofile"].astype(object).fillna(SANS_ID).astype(str).to_numpy(),
+        (df["annee"].astype(int) + decalage).to_numpy(),
+    ])
+
+
+def empreintes_sources(
+    freq_raw: pd.DataFrame,
+    museo_raw: pd.DataFrame,
+    correspondances: Optional[pd.DataFrame] = None,
+) -> Dict[str, str]:
+    """Empreintes des entrées dont un changement impose un build complet."""
+    if correspondances is None:
+        correspondances = charger_correspondances()
+    return {
+        "freq_raw": empreinte_frame(freq_raw),
+        "museo_raw": empreinte_frame(museo_raw),
+        "correspondances": empreinte_frame(correspondances),
+    }
+
+
+def sauver_etat(
+    output_dir: Path,
+    freq_raw: pd.DataFrame,
+    museo_raw: pd.DataFrame,
+    fact_freq: pd.DataFrame,
+    encodeur: EncodeurDomaines,
+    normaliseur: NormaliseurCategories,
+    correspondances: Optional[pd.DataFrame] = None,
+) -> None:
+    etat = {
+        "empreintes_sources": empreintes_sources(freq_raw, museo_raw, correspondances),
+        "encodeur_domaines": encodeur.to_dict(),
+        "normaliseur_categories": normaliseur.to_dict(),
+    }
+    (output_dir / FICHIER_ETAT).write_text(json.dumps(etat, ensure_ascii=False, indent=2))
+    ecrire_table(empreintes_partitions(fact_freq), TABLE_PARTITIONS, output_dir, partition_cols=())
+
+
+def build_complet(
+    freq_raw: pd.DataFrame,
+    ent_raw: pd.DataFrame,
+    museo_raw: pd.DataFrame,
+    output_dir: Path = OUTPUT_DIR,
+    encodeur: Optional[EncodeurDomaines] = None,
+    normaliseur: Optional[NormaliseurCategories] = None,
+    csv: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """Reconstruit toutes les tables, les exporte et mémorise l'état incrémental."""
+    correspondances = charger_correspondances()
+    musees = build_dim_musees(museo_raw)
+    fact_freq = build_fact_frequentation(ent_raw, correspondances)
+    fact_excel = build_fact_freq_excel(freq_raw)
+    df_modele = merge_dataset(musees, fact_freq, fact_excel, correspondances)
+
+    # Composants ajustés une fois sur df_modele (un musée x année par ligne),
+    # puis figés pour les ajouts d'années suivants
+    if encodeur is None:
+        encodeur = ajuster_encodeur_domaines(df_modele)
+    if normaliseur is None:
+        normaliseur = ajuster_normaliseur_categories(df_modele)
+    df_modele_clean = clean_and_enrich(df_modele, encodeur, normaliseur)
+
+    tables = {
+        "musees": musees,
+        "fact_freq": fact_freq,
+        "fact_excel": fact_excel,
+        "df_modele": df_modele_clean,
+    }
+    exporter_sorties(tables, output_dir, csv=csv)
+    sauver_etat(output_dir, freq_raw, museo_raw, fact_freq, encodeur, normaliseur, correspondances)
+    return tables
+
+
+def build_incremental(
+    freq_raw: pd.DataFrame,
+    ent_raw: pd.DataFrame,
+    museo_raw: pd.DataFrame,
+    output_dir: Path = OUTPUT_DIR,
+    csv: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """Ne recalcule que les partitions (id_patrimostat, annee) nouvelles ou modifiées.
+
+    Les lignes recalculées sont celles des partitions touchées et de l'année
+    suivante du même musée (total_t_1, croissance_total), puis fusionnées dans
+    les seules partitions annee=... concernées de df_modele déjà exporté.
+    L'encodeur des domaines et le normaliseur des catégories restent ceux du
+    dernier build complet. Si l'Excel, Museofile ou la table de
+    correspondances ont changé, si une année disparaît entièrement (ou en
+    l'absence d'état), on repart d'un build complet. Renvoie fact_freq et
+    les partitions de df_modele réécrites.
+    """
+    chemin_etat = output_dir / FICHIER_ETAT
+    sorties_presentes = chemin_etat.exists() and all(
+        table_existe(nom, output_dir) for nom in list(NOMS_SORTIES.values()) + [TABLE_PARTITIONS]
+    )
+    etat = json.loads(chemin_etat.read_text()) if sorties_presentes else None
+    correspondances = charger_correspondances()
+    if etat is None or etat["empreintes_sources"] != empreintes_sources(
+        freq_raw, museo_raw, correspondances
+    ):
+        print("Pas d'état incrémental utilisable : build complet.")
+        return build_complet(freq_raw, ent_raw, museo_raw, output_dir, csv=csv)
+
+    encodeur = EncodeurDomaines.from_dict(etat["encodeur_domaines"])
+    normaliseur = NormaliseurCategories.from_dict(etat["normaliseur_categories"])
+
+    # Détection des partitions nouvelles, modifiées ou supprimées
+    fact_freq = build_fact_frequentation(ent_raw, correspondances)
+    nouvelles = empreintes_partitions(fact_freq)
+    anciennes = lire_table(TABLE_PARTITIONS, output_dir=output_dir)
+    comp = anciennes.merge(
+        nouvelles, on=["id_patrimostat", "annee"], how="outer",
+        suffixes=("_old", "_new"), indicator=True,
+    )
+    touchees = comp[(comp["_merge"] != "both") | (comp["empreinte_old"] != comp["empreinte_new"])]
+    print(f"Partitions nouvelles ou modifiées : {len(touchees)}")
+
+    # Clés musée x année à recalculer : partitions touchées + année suivante
+    partitions = pd.DataFrame({
+        "id_museofile": touchees["id_museofile_new"].where(
+            touchees["_merge"] != "left_only", touchees["id_museofile_old"]
+        ),
+        "annee": touchees["annee"],
+    })
+    if set(anciennes["annee"]) - set(fact_freq["annee"]):
+        print("Une année a disparu des données : build complet.")
+        return build_complet(freq_raw, ent_raw, museo_raw, output_dir, csv=csv)
+
+    a_recalculer = _cles(partitions).union(_cles(partitions, decalage=1))
+    annees = sorted(
+        int(a) for a in set(a_recalculer.get_level_values(1)) & set(fact_freq["annee"])
+    )
+
+    # Contexte : les lignes de l'année précédente servent au calcul des lags
+    cles_fact = _cles(fact_freq)
+    contexte = cles_fact.isin(a_recalculer) | _cles(fact_freq, decalage=1).isin(a_recalculer)
+
+    # L'Excel est relu sur toutes les années du contexte : une ligne N-1 dont
+    # le total manque est complétée par total_frequentation avant les lags
+    annees_contexte = sorted(int(a) for a in set(fact_freq.loc[contexte, "annee"]))
+    musees = build_dim_musees(museo_raw)
+    fact_excel = lire_table(
+        NOMS_SORTIES["fact_excel"],
+        colonnes=["id_patrimostat", "annee", "total_frequentation"],
+        filtres=[("annee", "in", annees_contexte)] if annees_contexte else None,
+        output_dir=output_dir,
+    )
+    df_sub = merge_dataset(musees, fact_freq[contexte], fact_excel, correspondances)
+    df_sub = clean_and_enrich(df_sub, encodeur, normaliseur)
+    df_sub = df_sub[_cles(df_sub).isin(a_recalculer)]
+
+    # Fusion dans les seules partitions annee=... concernées
+    if annees:
+        ancien = lire_table(
+            NOMS_SORTIES["df_modele"], filtres=[("annee", "in", annees)], output_dir=output_dir
+        )
+        # Blocs vides écartés (nouvelle année : aucune ligne conservée) et
+        # catégories passées en object : les catégories d'une colonne vide
+        # du bloc recalculé ne décident pas du dtype du résultat
+        categories = [c for c in ancien.columns if isinstance(ancien[c].dtype, pd.CategoricalDtype)]
+        blocs = [
+            b.astype({c: object for c in categories if c in b.columns})
+            for b in (ancien[~_cles(ancien).isin(a_recalculer)], df_sub) if len(b)
+        ]
+        df_modele = pd.concat(blocs, ignore_index=True) if blocs else df_sub.reset_index(drop=True)
+        df_modele = df_modele.sort_values(
+            ["annee", "id_patrimostat"], kind="stable"
+        ).reset_index(drop=True)
+        for col in categories:
+            df_modele[col] = df_modele[col].astype("category")
+        ecrire_table(df_modele, NOMS_SORTIES["df_modele"], output_dir, seulement_partitions=True)
+    else:
+        print("Aucune partition à recalculer.")
+        df_modele = df_sub
+
+    ecrire_table(fact_freq, NOMS_SORTIES["fact_freq"], output_dir, csv=csv)
+    if csv:
+        lire_table(NOMS_SORTIES["df_modele"], output_dir=output_dir).sort_values(
+            ["id_patrimostat", "annee"], kind="stable"
+        ).to_csv(output_dir / f"{NOMS_SORTIES['df_modele']}.csv", index=False)
+    sauver_etat(output_dir, freq_raw, museo_raw, fact_freq, encodeur, normaliseur, correspondances)
+    print(f"Lignes recalculées : {len(df_sub)} (années {annees})")
+    return {"fact_freq": fact_freq, "df_modele": df_modele}
+
+
+def verifier_equivalence(
+    freq_raw: pd.DataFrame,
+    ent_raw: pd.DataFrame,
+    museo_raw: pd.DataFrame,
+    annee: Optional[int] = None,
+) -> None:
+    """Contrôle build complet vs build incrémental sur l'ajout d'une année.
+
+    On exporte un build complet sans l'année `annee` (la dernière par défaut),
+    on ajoute cette année en incrémental, puis on compare le df_modele obtenu
+    à un build complet sur toutes les données (mêmes composants ajustés).
+    Lève une AssertionError en cas d'écart.
+    """
+    annees = pd.to_numeric(ent_raw["annee"])
+    annee = int(annees.max()) if annee is None else annee
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dir_inc, dir_complet = Path(tmp) / "incremental", Path(tmp) / "complet"
+
+        build_complet(freq_raw, ent_raw[annees != annee], museo_raw, dir_inc)
+        build_incremental(freq_raw, ent_raw, museo_raw, dir_inc)
+
+        etat = json.loads((dir_inc / FICHIER_ETAT).read_text())
+        build_complet(
+            freq_raw, ent_raw, museo_raw, dir_complet,
+            encodeur=EncodeurDomaines.from_dict(etat["encodeur_domaines"]),
+            normaliseur=NormaliseurCategories.from_dict(etat["normaliseur_categories"]),
+        )
+
+        for nom in ("fact_freq", "df_modele"):
+            pd.testing.assert_frame_equal(
+                lire_table(NOMS_SORTIES[nom], output_dir=dir_inc),
+                lire_table(NOMS_SORTIES[nom], output_dir=dir_complet),
+            )
+
+    print(f"Build incrémental ({annee}) identique au build complet.")
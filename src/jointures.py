@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.errors import MergeError
+
+
+def _codes(valeurs: pd.Series, modalites: pd.Index) -> np.ndarray:
+    """Position de chaque valeur dans `modalites` (-1 si absente).
+
+    Pour une colonne catégorielle, la recherche ne porte que sur les
+    catégories, puis on indexe par les codes entiers.
+    """
+    if isinstance(valeurs.dtype, pd.CategoricalDtype):
+        codes_categories = modalites.get_indexer(valeurs.cat.categories)
+        # isna plutôt que get_indexer([nan]) : None et NaN ne s'apparient pas dans un Index objet
+        manquantes = np.flatnonzero(modalites.isna())
+        code_manquant = manquantes[0] if len(manquantes) else -1
+        codes = valeurs.cat.codes.to_numpy()
+        return np.where(codes >= 0, codes_categories[codes], code_manquant)
+    return modalites.get_indexer(valeurs)
+
+
+class IndexDimension:
+    """Table de dimension indexée sur une clé (simple ou composite).
+
+    Chaque colonne de la clé est factorisée une fois (modalités de la
+    dimension), puis les codes sont combinés en un entier int64 : les
+    jointures deviennent des recherches d'entiers (get_indexer + take).
+    Comme pandas.merge, une clé manquante (NaN) s'apparie avec NaN.
+    """
+
+    def __init__(self, table: pd.DataFrame, cles: Sequence[str], nom: Optional[str] = None):
+        self.table = table
+        self.cles = list(cles)
+        self.nom = nom or "dimension"
+        self.modalites: List[pd.Index] = []
+        for col in self.cles:
+            valeurs = table[col]
+            if isinstance(valeurs.dtype, pd.CategoricalDtype):
+                valeurs = valeurs.astype(valeurs.cat.categories.dtype)
+            self.modalites.append(pd.Index(valeurs.unique()))
+        self.index = pd.Index(self.cle_entiere(table))
+
+    def cle_entiere(self, df: pd.DataFrame) -> np.ndarray:
+        """Clé combinée int64 des lignes de df (-1 si une composante est inconnue)."""
+        cle = np.zeros(len(df), dtype=np.int64)
+        inconnue = np.zeros(len(df), dtype=bool)
+        for col, modalites in zip(self.cles, self.modalites):
+            codes = _codes(df[col], modalites)
+            inconnue |= codes < 0
+            cle = cle * len(modalites) + codes
+        cle[inconnue] = -1
+        return cle
+
+    def positions(self, df: pd.DataFrame, validate: str = "many_to_one") -> np.ndarray:
+        """Ligne de la dimension associée à chaque ligne de df (-1 si aucune).
+
+        validate : "many_to_one" (clé unique côté dimension) ou "one_to_one"
+        (clé unique des deux côtés), comme pandas.merge ; lève MergeError sinon.
+        """
+        if validate not in ("many_to_one", "one_to_one"):
+            raise ValueError(f"validate non supporté : {validate}")
+        if not self.index.is_unique:
+            raise MergeError(f"Clé {self.cles} non unique dans {self.nom} ({validate})")
+        cle = self.cle_entiere(df)
+        if validate == "one_to_one":
+            connues = cle[cle >= 0]
+            if len(np.unique(connues)) != len(connues):
+                raise MergeError(f"Clé {self.cles} non unique côté gauche ({validate})")
+        return self.index.get_indexer(cle)
+
+
+def colonnes_alignees(
+    dimension: IndexDimension, positions: np.ndarray, colonnes: Sequence[str]
+) -> dict:
+    """Colonnes de la dimension réordonnées selon `positions` (NaN si -1)."""
+    return {
+        col: pd.api.extensions.take(
+            dimension.table[col].array
+            if isinstance(dimension.table[col].dtype, pd.api.extensions.ExtensionDtype)
+            else dimension.table[col].to_numpy(),
+            positions,
+            allow_fill=True,
+        )
+        for col in colonnes
+    }
+
+
+def cles_non_appariees(df: pd.DataFrame, cles: Sequence[str], positions: np.ndarray) -> pd.DataFrame:
+    """Clés distinctes de df sans correspondance (positions -1) et leur nombre de lignes."""
+    manquantes = df.loc[positions < 0, list(cles)]
+    return (
+        manquantes.groupby(list(cles), dropna=False, observed=True, sort=False)
+        .size()
+        .rename("n_lignes")
+        .reset_index()
+    )
+
+
+def jointure_gauche(
+    gauche: pd.DataFrame,
+    jointures: Sequence[Tuple[IndexDimension, Sequence[str]]],
+    validate: str = "many_to_one",
+) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """Équivalent de merges à gauche successifs sur des dimensions indexées.
+
+    jointures : (dimension, colonnes à rapatrier) ; les clés de chaque
+    dimension doivent être des colonnes de gauche. Le frame joint est
+    construit en une fois (index 0..n-1, ordre de gauche conservé) ; les
+    colonnes de gauche homonymes sont remplacées (pas de suffixes _x/_y).
+    Renvoie aussi, par dimension, les clés sans correspondance.
+    """
+    ajout, non_apparies = {}, {}
+    for dimension, colonnes in jointures:
+        positions = dimension.positions(gauche, validate=validate)
+        ajout.update(colonnes_alignees(dimension, positions, colonnes))
+        non_apparies[dimension.nom] = cles_non_appariees(gauche, dimension.cles, positions)
+
+    gardees = [c for c in gauche.columns if c not in ajout]
+    joint = pd.concat(
+        [gauche[gardees].reset_index(drop=True), pd.DataFrame(ajout)],
+        axis=1,
+    )
+    return joint, non_apparies
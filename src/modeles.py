@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .cache import empreinte_frame
+from .chemins import CACHE_DIR, MODELES_DIR, OUTPUT_DIR
+from .features import calculer_features
+from .spatial import IndexSpatial, features_spatiales
+from .stockage import lire_table
+
+TARGET = "total"
+ANNEE_COUPURE = 2022
+# Plis de validation croisée de LassoCV (regroupés par musée)
+N_PLIS = 5
+
+# Variables du LASSO (modèle conjoncturel, avec historique)
+FEATURES_NUM = [
+    "log_total_max_3ans",
+    "log_total_t_1",
+    "log_total_t_2",
+    "log_total_t_3",
+    "age_musee",
+    "part_gratuit_t_1",
+    "part_individuels_t_1",
+]
+FEATURES_CAT = ["region", "est_idf", "is_covid", "is_reprise", "is_geant"]
+# Historique requis pour qu'une ligne entre dans le LASSO (entraînement et scoring)
+HISTORIQUE_LASSO = ["log_total_t_1", "log_total_t_3"]
+# Variables de voisinage (preparer_variables avec un IndexSpatial) ; un paquet
+# modèle qui en utilise est marqué spatial=True et rescoré avec l'index
+FEATURES_SPATIALES = [
+    "n_musees_10km", "n_musees_50km",
+    "freq_voisins_10km", "freq_voisins_50km", "dist_geant_km",
+]
+
+# Random Forest structurel : colonnes exclues (identifiants, cible, historique, texte)
+COLONNES_EXCLUES_RF = [
+    # Identifiants et localisation précise
+    "id_patrimostat", "id_museofile", "nom_officiel", "ville", "codeInseeCommune",
+    "dateappellation", "ferme", "anneefermeture",
+    "has_excel", "age_musee_missing", "annee_creation", "departement",
+    # La réponse
+    "total", "total_frequentation", "payant", "gratuit",
+    "individuel", "scolaires", "groupes_hors_scolaires",
+    "moins_18_ans_hors_scolaires", "_18_25_ans",
+    "part_gratuit", "part_scolaires", "part_individuels", "croissance_total",
+    # L'historique
+    "total_t_1", "total_t_2", "total_t_3", "total_max_3ans",
+    "part_gratuit_t_1", "part_scolaires_t_1", "part_individuels_t_1",
+    "log_total_t_1", "log_total_t_2", "log_total_t_3", "log_total_max_3ans",
+    "is_geant", "is_reprise", "is_covid",
+    "freq_voisins_10km", "freq_voisins_50km", "dist_geant_km",
+    # Texte
+    "domaine_thematique", "domaine_clean", "domaine_list",
+]
+
+# Cache des préprocesseurs ajustés (Pipeline(memory=...))
+CACHE_SKLEARN_DIR = CACHE_DIR / "sklearn"
+
+
+def preparer_variables(df: pd.DataFrame, spatial: Optional[IndexSpatial] = None) -> pd.DataFrame:
+    """Ajoute les variables des modèles à df_modele (effectifs en float).
+
+    Lags t-1..t-3, maximum sur 3 ans et ratios décalés (src/features.py),
+    leurs logs, puis les indicateurs de contexte (reprise, Covid, géant).
+    Avec un index spatial sur les musées, ajoute aussi FEATURES_SPATIALES
+    (src/spatial.py).
+    """
+    df = df.copy()
+    temporelles = calculer_features(
+        df,
+        lags={
+            "total": (1, 2, 3),
+            "part_gratuit": (1,), "part_scolaires": (1,), "part_individuels": (1,),
+        },
+        maximum={"total": (3,)},
+    )
+    df[temporelles.columns.tolist()] = temporelles
+
+    for col in ["total_t_1", "total_t_2", "total_t_3", "total_max_3ans"]:
+        df[f"log_{col}"] = np.log1p(df[col])
+
+    # 2022/2023 : années de rebond ; 2020/2021 : Covid
+    df["is_reprise"] = df["annee"].isin([2022, 2023]).astype(int)
+    df["is_covid"] = df["annee"].isin([2020, 2021]).astype(int)
+    # Géant : plus de 100k visiteurs sur l'une des 3 dernières années
+    df["is_geant"] = (df["total_max_3ans"] > 100000).astype(int)
+
+    if spatial is not None:
+        voisinage = features_spatiales(df, spatial)
+        df[voisinage.columns.tolist()] = voisinage
+    return df
+
+
+def index_spatial(output_dir: Path = OUTPUT_DIR) -> IndexSpatial:
+    """IndexSpatial des musées exportés (table musees), coordonnées invalides écartées."""
+    musees = lire_table(
+        "musees", colonnes=["id_museofile", "latitude", "longitude", "coords_valides"],
+        output_dir=output_dir,
+    )
+    musees.loc[~musees["coords_valides"].astype(bool), ["latitude", "longitude"]] = np.nan
+    return IndexSpatial(musees)
+
+
+def donnees_lasso(df: pd.DataFrame) -> pd.DataFrame:
+    """Lignes utilisables par le LASSO (historique t-1 et t-3 et cible connus)."""
+    return df.dropna(subset=HISTORIQUE_LASSO + [TARGET]).reset_index(drop=True)
+
+
+def indicatrices_structurelles(df: pd.DataFrame, features: Optional[List[str]] = None) -> pd.DataFrame:
+    """Colonnes hors COLONNES_EXCLUES_RF, catégories en indicatrices (NaN conservés).
+
+    Sans `features` : indicatrices drop_first (entraînement). Avec la liste
+    des variables d'un modèle déjà entraîné, les colonnes sont alignées
+    dessus : indicatrices absentes à 0, modalités inconnues ignorées.
+    """
+    X = df.drop(columns=[c for c in COLONNES_EXCLUES_RF if c in df.columns])
+    if features is None:
+        return pd.get_dummies(X, drop_first=True)
+    return pd.get_dummies(X).reindex(columns=features, fill_value=0)
+
+
+def variables_structurelles(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """Variables du Random Forest structurel et cible log(1 + total).
+
+    Colonnes hors COLONNES_EXCLUES_RF, catégories en indicatrices
+    (drop_first), valeurs manquantes remplacées par la médiane. La colonne
+    annee est conservée pour le découpage temporel.
+    """
+    df = df.dropna(subset=[TARGET])
+    features = indicatrices_structurelles(df)
+    features = features.fillna(features.median())
+    return features, np.log1p(df[TARGET])
+
+
+def plis_par_musee(ids: pd.Series, n_plis: int = N_PLIS) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Plis de validation croisée regroupant toutes les années d'un musée.
+
+    Indépendants de l'ordre des lignes : des plis contigus sur un frame trié
+    par année (ordre de lire_table) isolent des années entières, Covid
+    compris, et LassoCV choisit alors un alpha ~50 fois trop fort.
+    """
+    from sklearn.model_selection import GroupKFold
+
+    groupes = pd.factorize(ids.astype(str), sort=True)[0]
+    return list(GroupKFold(n_splits=n_plis).split(np.zeros(len(groupes)), groups=groupes))
+
+
+def construire_lasso(
+    features_num: List[str] = FEATURES_NUM,
+    features_cat: List[str] = FEATURES_CAT,
+    n_jobs: Optional[int] = -1,
+    memoire: Optional[Path] = CACHE_SKLEARN_DIR,
+    cv=N_PLIS,
+):
+    """Pipeline LASSO : imputation + standardisation / one-hot, cible en log.
+
+    - cv : nombre de plis ou plis explicites (plis_par_musee) ;
+    - les plis de LassoCV sont ajustés en parallèle (n_jobs) ; pour chaque
+      pli, la descente de coordonnées parcourt les 100 alphas du plus fort
+      au plus faible en repartant de la solution précédente (warm start) ;
+    - avec `memoire`, le préprocesseur ajusté est mis en cache sur disque
+      (joblib.Memory) et réutilisé tant que données et paramètres sont les
+      mêmes.
+    """
+    from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import LassoCV
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    num_transformer = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler()),
+    ])
+    cat_transformer = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="constant", fill_value="Manquant")),
+        ("onehot", OneHotEncoder(handle_unknown="ignore", drop="first")),
+    ])
+    preprocessor = ColumnTransformer(transformers=[
+        ("num", num_transformer, features_num),
+        ("cat", cat_transformer, features_cat),
+    ])
+
+    return Pipeline(
+        steps=[
+            ("preprocessor", preprocessor),
+            ("regressor", TransformedTargetRegressor(
+                regressor=LassoCV(cv=cv, random_state=42, alphas=100, max_iter=20000, n_jobs=n_jobs),
+                func=np.log1p,
+                inverse_func=np.expm1,
+            )),
+        ],
+        memory=str(memoire) if memoire is not None else None,
+    )
+
+
+def construire_foret(n_jobs: Optional[int] = -1):
+    """Random Forest structurel (100 arbres ajustés en parallèle)."""
+    from sklearn.ensemble import RandomForestRegressor
+
+    return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+
+
+def entrainer_lasso(
+    df: pd.DataFrame,
+    annee_coupure: int = ANNEE_COUPURE,
+    n_jobs: Optional[int] = -1,
+    memoire: Optional[Path] = CACHE_SKLEARN_DIR,
+    spatial: bool = False,
+) -> Dict:
+    """Ajuste le LASSO sur les années < annee_coupure (df issu de preparer_variables).
+
+    Renvoie le paquet modèle (voir sauver_modele) avec les métriques sur
+    les années >= annee_coupure. memoire : voir construire_lasso (None pour
+    un ajustement sans cache, ex : mesures de performance). Avec
+    spatial=True, FEATURES_SPATIALES s'ajoutent aux variables numériques
+    (df préparé avec un IndexSpatial).
+    """
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    data = donnees_lasso(df)
+    features_num = FEATURES_NUM + (FEATURES_SPATIALES if spatial else [])
+    features = features_num + FEATURES_CAT
+    train, test = data[data["annee"] < annee_coupure], data[data["annee"] >= annee_coupure]
+    X_train, y_train = train[features], train[TARGET]
+
+    plis = plis_par_musee(train["id_museofile"])
+    modele = construire_lasso(features_num, n_jobs=n_jobs, memoire=memoire, cv=plis).fit(X_train, y_train)
+
+    metriques = {}
+    if len(test):
+        y_pred = modele.predict(test[features])
+        metriques = {
+            "rmse": float(np.sqrt(mean_squared_error(test[TARGET], y_pred))),
+            # Baseline naïve : la fréquentation de l'an dernier
+            "rmse_naive": float(np.sqrt(mean_squared_error(test[TARGET], test["total_t_1"]))),
+            "mae": float(mean_absolute_error(test[TARGET], y_pred)),
+            "r2": float(r2_score(test[TARGET], y_pred)),
+        }
+    return paquet_modele(modele, features, X_train, y_train, annee_coupure, metriques)
+
+
+def entrainer_foret(
+    df: pd.DataFrame,
+    annee_test: Optional[int] = None,
+    n_jobs: Optional[int] = -1,
+) -> Dict:
+    """Ajuste le Random Forest structurel sur les années < annee_test.
+
+    Par défaut, annee_test est la dernière année disponible. Le modèle
+    prédit log(1 + total) ; le paquet garde aussi les médianes d'imputation.
+    """
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    df = df.dropna(subset=[TARGET])
+    features, y = indicatrices_structurelles(df), np.log1p(df[TARGET])
+    medianes = features.median()
+    features = features.fillna(medianes)
+    annee_test = int(features["annee"].max()) if annee_test is None else annee_test
+    train, test = features["annee"] < annee_test, features["annee"] == annee_test
+    X_train = features[train].drop(columns=["annee"])
+
+    modele = construire_foret(n_jobs=n_jobs).fit(X_train, y[train])
+
+    metriques = {}
+    if test.any():
+        y_pred_log = modele.predict(features[test].drop(columns=["annee"]))
+        metriques = {
+            "r2_log": float(r2_score(y[test], y_pred_log)),
+            "mae": float(mean_absolute_error(np.expm1(y[test]), np.expm1(y_pred_log))),
+        }
+    paquet = paquet_modele(modele, X_train.columns.tolist(), X_train, y[train], annee_test, metriques)
+    # Médianes d'imputation, réutilisées pour scorer de nouvelles lignes
+    paquet["medianes"] = medianes.drop("annee").to_dict()
+    return paquet
+
+
+def paquet_modele(modele, features: List[str], X: pd.DataFrame, y: pd.Series,
+                  annee_coupure: int, metriques: Dict) -> Dict:
+    """Modèle ajusté + ce qu'il faut pour le réutiliser sans réentraîner."""
+    import sklearn
+
+    return {
+        "modele": modele,
+        "features": list(features),
+        # Variables de voisinage : les données à scorer demandent un IndexSpatial
+        "spatial": any(f in FEATURES_SPATIALES for f in features),
+        "empreinte_donnees": empreinte_frame(pd.concat([X, y.rename("__cible__")], axis=1)),
+        "n_lignes": len(X),
+        "annee_coupure": annee_coupure,
+        "metriques": metriques,
+        "sklearn": sklearn.__version__,
+        "entraine_le": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def sauver_modele(paquet: Dict, nom: str, dossier: Path = MODELES_DIR) -> Path:
+    """Sérialise un paquet modèle avec joblib (dossier/nom.joblib)."""
+    import joblib
+
+    dossier.mkdir(parents=True, exist_ok=True)
+    chemin = dossier / f"{nom}.joblib"
+    joblib.dump(paquet, chemin, compress=3)
+    return chemin
+
+
+def charger_modele(nom: str, dossier: Path = MODELES_DIR) -> Dict:
+    """Relit un paquet modèle ; avertit si la version de scikit-learn diffère."""
+    import warnings
+
+    import joblib
+    import sklearn
+
+    paquet = joblib.load(dossier / f"{nom}.joblib")
+    if paquet["sklearn"] != sklearn.__version__:
+        warnings.warn(
+            f"Modèle {nom} entraîné avec scikit-learn {paquet['sklearn']}, "
+            f"version installée {sklearn.__version__}"
+        )
+    return paquet
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import pickle
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .appariement import FICHIER_CORRESPONDANCES, charger_correspondances
+from .build_bases import (
+    build_dim_musees,
+    build_fact_frequentation,
+    build_fact_freq_excel,
+    load_raw_source,
+    merge_dataset,
+    sources_brutes,
+)
+from .cache import empreinte_fichier
+from .chemins import CACHE_DIR, DATA_DIR
+from .cleaning import clean_and_enrich
+from .encodeurs import ajuster_encodeur_domaines, ajuster_normaliseur_categories
+from .profilage import Profileur
+
+# À incrémenter si le format des résultats mis en cache change
+VERSION_CACHE_ETAPES = 1
+CACHE_ETAPES_DIR = CACHE_DIR / "etapes"
+
+
+@dataclass(frozen=True)
+class Etape:
+    """Une étape du pipeline : fonction(*entrees, **options).
+
+    - entrees : noms des étapes dont les résultats sont passés en arguments ;
+    - fichier : fichier source lu par l'étape (son contenu entre dans la clé) ;
+    - persister : False pour ne pas mettre le résultat en cache sur disque
+      (ex : lectures brutes, déjà en cache Arrow).
+    """
+    nom: str
+    fonction: Callable[..., Any]
+    entrees: Tuple[str, ...] = ()
+    options: Dict[str, Any] = field(default_factory=dict)
+    fichier: Optional[Path] = None
+    persister: bool = True
+
+
+def etapes_par_defaut(data_dir: Path = DATA_DIR, use_cache: bool = True) -> List[Etape]:
+    """Graphe du build : lectures -> tables -> fusion -> composants -> nettoyage.
+
+    data_dir : dossier des fichiers bruts et de la table de correspondances ;
+    use_cache=False relit les fichiers sans passer par le cache Arrow.
+    """
+    fichiers = {nom: chemin for nom, (chemin, _, _) in sources_brutes(data_dir).items()}
+    # Options des lectures : seulement celles qui diffèrent du build habituel
+    lecture, options_correspondances = {}, {}
+    if data_dir != DATA_DIR:
+        lecture["data_dir"] = data_dir
+        options_correspondances["chemin"] = data_dir / FICHIER_CORRESPONDANCES.name
+    if not use_cache:
+        lecture["use_cache"] = False
+    # Table de correspondances relue : facultative
+    correspondances = data_dir / FICHIER_CORRESPONDANCES.name
+    correspondances = correspondances if correspondances.exists() else None
+    return [
+        Etape("freq_raw", load_raw_source, options={"nom": "freq_raw", **lecture},
+              fichier=fichiers["freq_raw"], persister=False),
+        Etape("ent_raw", load_raw_source, options={"nom": "ent_raw", **lecture},
+              fichier=fichiers["ent_raw"], persister=False),
+        Etape("museo_raw", load_raw_source, options={"nom": "museo_raw", **lecture},
+              fichier=fichiers["museo_raw"], persister=False),
+        Etape("correspondances", charger_correspondances,
+              options=options_correspondances,
+              fichier=correspondances, persister=False),
+        Etape("musees", build_dim_musees, ("museo_raw",)),
+        Etape("fact_freq", build_fact_frequentation, ("ent_raw", "correspondances")),
+        Etape("fact_excel", build_fact_freq_excel, ("freq_raw",)),
+        Etape("df_modele", merge_dataset,
+              ("musees", "fact_freq", "fact_excel", "correspondances")),
+        Etape("encodeur_domaines", ajuster_encodeur_domaines, ("df_modele",)),
+        Etape("normaliseur_categories", ajuster_normaliseur_categories, ("df_modele",)),
+        Etape("df_modele_clean", clean_and_enrich,
+              ("df_modele", "encodeur_domaines", "normaliseur_categories")),
+    ]
+
+
+def _noms_code(code) -> Iterable[str]:
+    """Noms globaux et attributs lus par un code objet (fonctions internes comprises)."""
+    yield from code.co_names
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            yield from _noms_code(const)
+
+
+def _valeur_stable(valeur: Any, dependances: List[Any]) -> str:
+    """Représentation d'une constante, identique d'une exécution à l'autre.
+
+    Les ensembles sont triés (ordre dépendant du hachage des chaînes) ; les
+    fonctions et classes rencontrées sont ajoutées à `dependances`.
+    """
+    if inspect.isfunction(valeur) or inspect.isclass(valeur):
+        dependances.append(valeur)
+        return f"{valeur.__module__}.{valeur.__qualname__}"
+    if isinstance(valeur, (set, frozenset)):
+        return "{" + ", ".join(sorted(_valeur_stable(v, dependances) for v in valeur)) + "}"
+    if isinstance(valeur, dict):
+        return "{" + ", ".join(
+            f"{_valeur_stable(k, dependances)}: {_valeur_stable(v, dependances)}"
+            for k, v in valeur.items()
+        ) + "}"
+    if isinstance(valeur, (list, tuple)):
+        return "[" + ", ".join(_valeur_stable(v, dependances) for v in valeur) + "]"
+    texte = repr(valeur)
+    # Objet sans repr stable (adresse mémoire) : seul son type compte
+    return type(valeur).__qualname__ if " at 0x" in texte else texte
+
+
+def _sources_utilisees(fonction: Callable) -> Dict[str, str]:
+    """Source des fonctions et classes du paquet appelées par une fonction.
+
+    On suit les noms globaux référencés par le code, de fonction en
+    fonction : seules les fonctions et classes réellement atteintes entrent
+    dans l'empreinte, avec les constantes qu'elles lisent et leurs valeurs
+    par défaut. Modifier qualite.py ou stockage.py n'invalide donc pas les
+    étapes du build, modifier encodeurs.py invalide le nettoyage.
+    """
+    paquet = fonction.__module__.split(".")[0]
+
+    def du_paquet(obj) -> bool:
+        nom = obj.__name__ if inspect.ismodule(obj) else getattr(obj, "__module__", None)
+        return isinstance(nom, str) and nom.split(".")[0] == paquet
+
+    sources: Dict[str, str] = {}
+    a_voir: List[Any] = [fonction]
+    while a_voir:
+        obj = inspect.unwrap(a_voir.pop())
+        nom = f"{obj.__module__}.{obj.__qualname__}"
+        if nom in sources:
+            continue
+        sources[nom] = inspect.getsource(obj)
+
+        if inspect.isclass(obj):
+            a_voir.extend(b for b in obj.__bases__ if du_paquet(b))
+            for attribut in vars(obj).values():
+                attribut = getattr(attribut, "__func__", getattr(attribut, "fget", attribut))
+                if inspect.isfunction(attribut):
+                    a_voir.append(attribut)
+            continue
+
+        defauts = (obj.__defaults__ or (), obj.__kwdefaults__ or {})
+        sources[nom] += _valeur_stable(defauts, a_voir)
+        for n in set(_noms_code(obj.__code__)):
+            if n not in obj.__globals__:
+                continue
+            valeur = obj.__globals__[n]
+            if inspect.ismodule(valeur):
+                if du_paquet(valeur):
+                    sources[valeur.__name__] = inspect.getsource(valeur)
+            elif callable(valeur):
+                # Fonctions et classes du paquet (lru_cache compris) ; le reste
+                # (numpy, pandas...) n'entre pas dans l'empreinte
+                cible = inspect.unwrap(valeur)
+                if du_paquet(cible) and (inspect.isfunction(cible) or inspect.isclass(cible)):
+                    a_voir.append(cible)
+            else:
+                # Constante lue par la fonction (seuils, tables de correspondance...)
+                sources[f"{obj.__module__}.{n}"] = _valeur_stable(valeur, a_voir)
+    return sources
+
+
+def empreinte_code(fonction: Callable) -> str:
+    """Empreinte du source de la fonction et de ce qu'elle appelle dans le paquet."""
+    h = hashlib.sha256()
+    for nom, source in sorted(_sources_utilisees(fonction).items()):
+        h.update(nom.encode("utf-8"))
+        h.update(source.encode("utf-8"))
+    return h.hexdigest()
+
+
+def ordre_topologique(etapes: Sequence[Etape]) -> List[Etape]:
+    """Étapes triées pour que chaque étape suive ses entrées."""
+    par_nom = {e.nom: e for e in etapes}
+    ordre, etat = [], {}
+
+    def visiter(nom: str, chemin: Tuple[str, ...]) -> None:
+        if nom not in par_nom:
+            raise KeyError(f"Étape inconnue : {nom} (requise par {chemin[-1]})")
+        if etat.get(nom) == "fait":
+            return
+        if etat.get(nom) == "en_cours":
+            raise ValueError(f"Cycle dans le pipeline : {' -> '.join(chemin + (nom,))}")
+        etat[nom] = "en_cours"
+        for entree in par_nom[nom].entrees:
+            visiter(entree, chemin + (nom,))
+        etat[nom] = "fait"
+        ordre.append(par_nom[nom])
+
+    for e in etapes:
+        visiter(e.nom, ())
+    return ordre
+
+
+def cles_etapes(etapes: Sequence[Etape]) -> Dict[str, str]:
+    """Clé de cache de chaque étape.
+
+    La clé combine le code de l'étape, ses options, le contenu de son fichier
+    source et les clés de ses entrées : elle change dès qu'un élément en amont
+    change, sans avoir à calculer les résultats intermédiaires.
+    """
+    cles: Dict[str, str] = {}
+    for e in ordre_topologique(etapes):
+        signature = json.dumps({
+            "code": empreinte_code(e.fonction),
+            "options": e.options,
+            "fichier": empreinte_fichier(e.fichier) if e.fichier is not None else None,
+            "entrees": [cles[n] for n in e.entrees],
+            "version": VERSION_CACHE_ETAPES,
+        }, sort_keys=True, default=str)
+        cles[e.nom] = hashlib.sha256(signature.encode("utf-8")).hexdigest()[:16]
+    return cles
+
+
+def _descendants(etapes: Sequence[Etape], noms: Iterable[str]) -> set:
+    """Étapes données et toutes celles qui en dépendent."""
+    resultat = set(noms)
+    for e in ordre_topologique(etapes):
+        if resultat.intersection(e.entrees):
+            resultat.add(e.nom)
+    return resultat
+
+
+def _chemin_cache(nom: str, cle: str, cache_dir: Path) -> Path:
+    return cache_dir / f"{nom}-{cle}.pkl"
+
+
+def _sauver_resultat(resultat: Any, nom: str, cle: str, cache_dir: Path) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for ancien in cache_dir.glob(f"{nom}-*.pkl"):
+        ancien.unlink()
+    chemin = _chemin_cache(nom, cle, cache_dir)
+    tmp = chemin.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(resultat, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(chemin)
+
+
+def _charger_resultat(nom: str, cle: str, cache_dir: Path) -> Any:
+    with open(_chemin_cache(nom, cle, cache_dir), "rb") as f:
+        return pickle.load(f)
+
+
+def executer(
+    etapes: Optional[Sequence[Etape]] = None,
+    cibles: Optional[Iterable[str]] = None,
+    depuis: Optional[str] = None,
+    sans_cache: bool = False,
+    max_workers: int = 3,
+    cache_dir: Path = CACHE_ETAPES_DIR,
+    profileur: Optional[Profileur] = None,
+) -> Dict[str, Any]:
+    """Exécute le graphe jusqu'aux étapes `cibles` et renvoie leurs résultats.
+
+    - cibles : étapes voulues (par défaut, celles dont rien ne dépend) ; seules
+      les étapes en amont nécessaires sont calculées ou relues ;
+    - depuis : force le recalcul de cette étape et de ses descendantes, les
+      étapes en amont sont relues depuis le cache si possible ;
+    - sans_cache : recalcule tout (le cache est tout de même mis à jour) ;
+    - profileur : mesure chaque étape calculée ou relue (temps, mémoire,
+      formes) ; les étapes s'exécutent alors l'une après l'autre pour que
+      les pics mémoire leur soient bien attribués.
+
+    Une étape est relue depuis le cache si sa clé n'a pas changé, sinon elle
+    est recalculée. Les étapes indépendantes (ex : les trois tables) tournent
+    en parallèle dans un pool de threads.
+    """
+    etapes = ordre_topologique(etapes if etapes is not None else etapes_par_defaut())
+    par_nom = {e.nom: e for e in etapes}
+    if cibles is None:
+        utilisees = {n for e in etapes for n in e.entrees}
+        cibles = [e.nom for e in etapes if e.nom not in utilisees]
+    cibles = list(cibles)
+    for nom in cibles + ([depuis] if depuis else []):
+        if nom not in par_nom:
+            raise KeyError(f"Étape inconnue : {nom} (étapes : {list(par_nom)})")
+
+    cles = cles_etapes(etapes)
+    forcees = _descendants(etapes, [depuis]) if depuis else set()
+
+    # Étape à calculer (forcée, non persistée ou absente du cache) : ses
+    # entrées sont requises ; sinon elle est simplement relue depuis le cache
+    a_calculer, a_charger = set(), set()
+
+    def requerir(nom: str) -> None:
+        if nom in a_calculer or nom in a_charger:
+            return
+        e = par_nom[nom]
+        if (sans_cache or nom in forcees or not e.persister
+                or not _chemin_cache(nom, cles[nom], cache_dir).exists()):
+            a_calculer.add(nom)
+            for entree in e.entrees:
+                requerir(entree)
+        else:
+            a_charger.add(nom)
+
+    for nom in cibles:
+        requerir(nom)
+
+    def lancer(e: Etape, *args) -> Any:
+        if profileur is None:
+            return e.fonction(*args, **e.options)
+        with profileur.etape(e.nom, entrees=dict(zip(e.entrees, args)), statut="calcul") as m:
+            m["sortie"] = e.fonction(*args, **e.options)
+        return m["sortie"]
+
+    def relire(nom: str) -> Any:
+        if profileur is None:
+            return _charger_resultat(nom, cles[nom], cache_dir)
+        with profileur.etape(nom, statut="cache") as m:
+            m["sortie"] = _charger_resultat(nom, cles[nom], cache_dir)
+        return m["sortie"]
+
+    if profileur is not None:
+        max_workers = 1
+
+    resultats: Dict[str, Any] = {}
+    for nom in sorted(a_charger):
+        print(f"[cache] {nom}")
+        resultats[nom] = relire(nom)
+
+    restantes = [e for e in etapes if e.nom in a_calculer]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        en_cours = {}
+        while restantes or en_cours:
+            pretes = [e for e in restantes if all(n in resultats for n in e.entrees)]
+            for e in pretes:
+                restantes.remove(e)
+                print(f"[calcul] {e.nom}")
+                args = [resultats[n] for n in e.entrees]
+                en_cours[pool.submit(lancer, e, *args)] = e
+            finies, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for futur in finies:
+                e = en_cours.pop(futur)
+                resultats[e.nom] = futur.result()
+                if e.persister:
+                    _sauver_resultat(resultats[e.nom], e.nom, cles[e.nom], cache_dir)
+
+    return {nom: resultats[nom] for nom in cibles}
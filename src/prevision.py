@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .chemins import OUTPUT_DIR
+from .modeles import (
+    FEATURES_SPATIALES, HISTORIQUE_LASSO, TARGET, indicatrices_structurelles, preparer_variables,
+)
+from .schema import en_float
+from .spatial import IndexSpatial
+from .stockage import lire_manifeste, lire_table
+
+# Profondeur d'historique des variables (lags t-1..t-3, max sur 3 ans)
+HISTORIQUE = 3
+TAILLE_LOT = 50_000
+
+# Colonnes de df_modele lues pour le LASSO (le Random Forest lit tout)
+COLONNES_LASSO = [
+    "id_museofile", "nom_officiel", "annee", "region", "est_idf", "age_musee",
+    "total", "part_gratuit", "part_scolaires", "part_individuels",
+]
+COLONNES_SORTIE = ["id_museofile", "nom_officiel", "region", "annee", "Reel", "Predit", "Erreur_Rel"]
+
+
+def derniere_annee(output_dir: Path = OUTPUT_DIR) -> int:
+    """Dernière année de df_modele, lue dans le manifeste."""
+    manifeste = lire_manifeste("df_modele_musees", output_dir)
+    return max(p["valeurs"]["annee"] for p in manifeste["partitions"])
+
+
+def charger_historique(annee: int, colonnes: Optional[List[str]] = None,
+                       output_dir: Path = OUTPUT_DIR) -> pd.DataFrame:
+    """df_modele des années annee-3 à annee (partitions voisines non lues)."""
+    df = lire_table(
+        "df_modele_musees",
+        colonnes=colonnes,
+        filtres=[("annee", ">=", annee - HISTORIQUE), ("annee", "<=", annee)],
+        output_dir=output_dir,
+    )
+    return en_float(df)
+
+
+def lignes_cibles(historique: pd.DataFrame, annee: int) -> pd.DataFrame:
+    """Lignes à scorer pour `annee`.
+
+    Si l'année est déjà dans df_modele, ce sont ses lignes (le réel est
+    connu). Sinon (N+1), une ligne par musée présent en annee-1 : variables
+    fixes reprises, âge + 1, effectifs et ratios inconnus.
+    """
+    connues = historique[historique["annee"] == annee]
+    if len(connues):
+        return connues
+    precedente = historique[(historique["annee"] == annee - 1) & historique["id_museofile"].notna()]
+    cibles = precedente.drop_duplicates("id_museofile").copy()
+    cibles["annee"] = annee
+    if "age_musee" in cibles.columns:
+        cibles["age_musee"] = cibles["age_musee"] + 1
+    inconnues = [c for c in [TARGET, "part_gratuit", "part_scolaires", "part_individuels"]
+                 if c in cibles.columns]
+    cibles[inconnues] = np.nan
+    return cibles
+
+
+def donnees_prevision(historique: pd.DataFrame, annee: int,
+                      spatial: Optional[IndexSpatial] = None) -> pd.DataFrame:
+    """Lignes de `annee` avec les variables des modèles (preparer_variables).
+
+    spatial : index des musées, requis pour un paquet marqué spatial.
+    """
+    passe = historique[historique["annee"] < annee]
+    cibles = lignes_cibles(historique, annee)
+    fenetre = pd.concat([passe, cibles], ignore_index=True)
+    fenetre = preparer_variables(fenetre, spatial)
+    return fenetre[fenetre["annee"] == annee].reset_index(drop=True)
+
+
+def matrice(paquet: Dict, donnees: pd.DataFrame) -> pd.DataFrame:
+    """Variables du modèle, dans l'ordre de l'entraînement."""
+    # Sans cette garde, le Random Forest recevrait des n_musees_* à 0
+    manquantes = [f for f in paquet["features"] if f in FEATURES_SPATIALES and f not in donnees]
+    if manquantes:
+        raise ValueError(
+            f"Variables de voisinage absentes des données ({', '.join(manquantes)}) : "
+            "préparer les données avec un IndexSpatial (modeles.index_spatial)."
+        )
+    if "medianes" in paquet:  # Random Forest structurel
+        X = indicatrices_structurelles(donnees, paquet["features"])
+        return X.fillna(paquet["medianes"])
+    return donnees[paquet["features"]]
+
+
+def predire_par_lots(modele, X: pd.DataFrame, taille_lot: int = TAILLE_LOT) -> np.ndarray:
+    """modele.predict par lots de taille_lot lignes (mémoire bornée)."""
+    if len(X) == 0:
+        return np.empty(0)
+    return np.concatenate([
+        modele.predict(X.iloc[debut:debut + taille_lot])
+        for debut in range(0, len(X), taille_lot)
+    ])
+
+
+def scorer(paquet: Dict, donnees: pd.DataFrame, taille_lot: int = TAILLE_LOT) -> pd.DataFrame:
+    """Prédictions du paquet modèle sur donnees (issu de donnees_prevision).
+
+    Predit est en nombre de visiteurs (le Random Forest prédit le log).
+    Pour le LASSO, Predit reste vide sur les lignes sans historique t-1 et
+    t-3 (exclues de l'entraînement par donnees_lasso). Erreur_Rel =
+    (Predit - Reel) / (Reel + 1) en %, vide si le réel est inconnu.
+    """
+    X = matrice(paquet, donnees)
+    if "medianes" in paquet:
+        predit = np.expm1(predire_par_lots(paquet["modele"], X, taille_lot))
+    else:
+        predit = np.full(len(X), np.nan)
+        avec_historique = donnees[HISTORIQUE_LASSO].notna().all(axis=1).to_numpy()
+        predit[avec_historique] = predire_par_lots(paquet["modele"], X[avec_historique], taille_lot)
+
+    resultats = donnees[[c for c in COLONNES_SORTIE[:4] if c in donnees.columns]].copy()
+    resultats["Reel"] = donnees[TARGET]
+    resultats["Predit"] = predit
+    resultats["Erreur_Rel"] = (resultats["Predit"] - resultats["Reel"]) / (resultats["Reel"] + 1) * 100
+    resultats["Predit"] = resultats["Predit"].round(0)
+    return resultats
+
+
+def chemin_previsions(nom: str, annee: int, output_dir: Path = OUTPUT_DIR) -> Path:
+    return output_dir / f"previsions_{nom}_{annee}.csv"
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+try:  # absent sous Windows
+    import resource
+except ImportError:
+    resource = None
+
+# Aperçus head() et diagnostics des étapes de build (coupés par definir_apercus(False))
+_APERCUS = True
+
+
+def definir_apercus(actifs: bool) -> None:
+    """Active ou coupe les aperçus head() et diagnostics des étapes de build."""
+    global _APERCUS
+    _APERCUS = actifs
+
+
+def afficher(*args, **kwargs) -> None:
+    """print() d'un diagnostic d'étape (tailles, lignes non appariées...), sauf en mode silencieux."""
+    if _APERCUS:
+        print(*args, **kwargs)
+
+
+def apercu(titre: str, df: pd.DataFrame, colonnes: Optional[List[str]] = None, n: int = 5) -> None:
+    """Affiche titre + df[colonnes].head(n), sauf en mode silencieux."""
+    if not _APERCUS:
+        return
+    print(titre)
+    print((df if colonnes is None else df[colonnes]).head(n))
+
+
+def rss_max_mo() -> Optional[float]:
+    """Pic de mémoire résidente du processus (Mo), None si indisponible."""
+    if resource is None:
+        return None
+    # ru_maxrss est en Ko sous Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def decrire_frame(obj: Any) -> Optional[Dict[str, Any]]:
+    """Forme et mémoire (deep=True) d'un DataFrame ou d'une Series, sinon None."""
+    if not isinstance(obj, (pd.DataFrame, pd.Series)):
+        return None
+    memoire = obj.memory_usage(deep=True)
+    memoire = memoire.sum() if isinstance(obj, pd.DataFrame) else memoire
+    return {"forme": list(obj.shape), "memoire_mo": round(memoire / 2**20, 3)}
+
+
+class Profileur:
+    """Enregistre, pour chaque étape, temps, mémoire et frames en entrée/sortie.
+
+    Usage :
+        prof = Profileur()
+        with prof.etape("musees", entrees={"museo_raw": museo_raw}) as m:
+            m["sortie"] = build_dim_musees(museo_raw)
+        prof.exporter("profil.json")
+
+    ou prof.profiler(fonction) pour décorer une fonction. Le pic tracemalloc
+    est global au processus : pour l'attribuer à une étape, les étapes
+    doivent s'exécuter l'une après l'autre.
+    """
+
+    def __init__(self, memoire: bool = True):
+        self.memoire = memoire
+        self.mesures: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def etape(self, nom: str, entrees: Optional[Dict[str, Any]] = None, **infos) -> Iterator[dict]:
+        """Mesure le bloc ; le résultat peut être déposé dans m["sortie"]."""
+        m: Dict[str, Any] = {}
+        demarrage = self.memoire and not tracemalloc.is_tracing()
+        if demarrage:
+            tracemalloc.start()
+        if self.memoire:
+            tracemalloc.reset_peak()
+            memoire_debut = tracemalloc.get_traced_memory()[0]
+        debut = time.perf_counter()
+        try:
+            yield m
+        finally:
+            duree = time.perf_counter() - debut
+            pic = None
+            if self.memoire:
+                pic = (tracemalloc.get_traced_memory()[1] - memoire_debut) / 2**20
+            if demarrage:
+                tracemalloc.stop()
+            self.mesures.append({
+                "etape": nom,
+                **infos,
+                "duree_s": round(duree, 4),
+                "pic_tracemalloc_mo": round(pic, 3) if pic is not None else None,
+                "rss_max_mo": rss_max_mo(),
+                "entrees": {k: decrire_frame(v) for k, v in (entrees or {}).items()},
+                "sortie": decrire_frame(m.get("sortie")),
+            })
+
+    def profiler(self, fonction: Callable, nom: Optional[str] = None) -> Callable:
+        """Décore une fonction : chaque appel est mesuré comme une étape."""
+        def enveloppe(*args, **kwargs):
+            entrees = {f"arg{i}": a for i, a in enumerate(args)}
+            entrees.update(kwargs)
+            with self.etape(nom or fonction.__name__, entrees=entrees) as m:
+                m["sortie"] = fonction(*args, **kwargs)
+            return m["sortie"]
+
+        enveloppe.__name__ = fonction.__name__
+        enveloppe.__doc__ = fonction.__doc__
+        return enveloppe
+
+    def tableau(self) -> pd.DataFrame:
+        """Une ligne par mesure, formes et mémoires des frames à plat."""
+        lignes = []
+        for m in self.mesures:
+            ligne = {k: v for k, v in m.items() if k not in ("entrees", "sortie")}
+            entrees = [e for e in m["entrees"].values() if e is not None]
+            ligne["lignes_entree"] = sum(e["forme"][0] for e in entrees) if entrees else None
+            ligne["memoire_entree_mo"] = sum(e["memoire_mo"] for e in entrees) if entrees else None
+            sortie = m["sortie"]
+            ligne["forme_sortie"] = "x".join(map(str, sortie["forme"])) if sortie else None
+            ligne["memoire_sortie_mo"] = sortie["memoire_mo"] if sortie else None
+            lignes.append(ligne)
+        return pd.DataFrame(lignes)
+
+    def exporter(self, chemin: Path) -> None:
+        """Écrit les mesures en JSON (détail complet) ou CSV (tableau à plat)."""
+        chemin = Path(chemin)
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        if chemin.suffix == ".csv":
+            self.tableau().to_csv(chemin, index=False)
+        else:
+            chemin.write_text(json.dumps(self.mesures, ensure_ascii=False, indent=2))
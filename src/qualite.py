@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .chemins import DATA_DIR, OUTPUT_DIR
+from .features import PanelAnnuel
+from .jointures import IndexDimension
+from .stockage import NOMS_SORTIES, lire_manifeste, lire_table
+
+
+@dataclass
+class Regle:
+    """Règle qualité déclarative sur une table du pipeline.
+
+    type : "unicite", "plage", "somme", "continuite", "couverture" ou
+    "non_manquant" (voir VERIFICATIONS). seuil : part maximale de lignes en
+    échec tolérée ; None pour une règle informative (taux seulement).
+    options["exceptions"] : valeurs connues de la première colonne (ou de
+    options["colonne_exceptions"]) dont les lignes ne comptent pas en échec.
+    """
+
+    nom: str
+    table: str
+    type: str
+    colonnes: Tuple[str, ...]
+    options: Dict[str, Any] = field(default_factory=dict)
+    seuil: Optional[float] = 0.0
+
+
+PARTS = ("part_gratuit", "part_scolaires", "part_individuels")
+COLONNES_MANQUANTS = ("age_musee", "total_t_1", "croissance_total", "region", "latitude", "longitude")
+EFFECTIFS = ("payant", "gratuit", "total")
+
+# Exceptions connues (données 2014-2023), à compléter après vérification :
+# une ligne (table, regle, id_museofile, motif) par musée dont les lignes
+# ne comptent pas en échec (musées à plusieurs établissements Patrimostat,
+# id_museofile absents du fichier Museofile...)
+FICHIER_EXCEPTIONS = DATA_DIR / "exceptions_qualite.csv"
+
+
+def charger_exceptions(chemin: Path = FICHIER_EXCEPTIONS) -> Dict[Tuple[str, str], Tuple[str, ...]]:
+    """(table, regle) -> id_museofile exceptés (vide si le fichier n'existe pas)."""
+    if not Path(chemin).exists():
+        return {}
+    table = pd.read_csv(chemin, dtype=str, keep_default_na=False)
+    return {cle: tuple(groupe["id_museofile"]) for cle, groupe in table.groupby(["table", "regle"], sort=False)}
+
+
+def regles_par_defaut(chemin_exceptions: Path = FICHIER_EXCEPTIONS) -> List[Regle]:
+    """Règles des tables musees, fact_freq, fact_excel et df_modele.
+
+    Les exceptions connues (options["exceptions"]) sont relues dans
+    chemin_exceptions, par table et nom de règle.
+    """
+    exceptions = charger_exceptions(chemin_exceptions)
+    regles = [
+        Regle("id_unique", "musees", "unicite", ("id_museofile",)),
+        Regle("latitude_valide", "musees", "plage", ("latitude",), {"min": -90, "max": 90}),
+        Regle("longitude_valide", "musees", "plage", ("longitude",), {"min": -180, "max": 180}),
+
+        Regle("partition_unique", "fact_freq", "unicite", ("id_patrimostat", "annee")),
+        Regle("effectifs_positifs", "fact_freq", "plage", EFFECTIFS, {"min": 0}),
+        Regle("excel_unique", "fact_excel", "unicite", ("id_patrimostat", "annee")),
+        Regle("excel_positif", "fact_excel", "plage", ("total_frequentation",), {"min": 0}),
+
+        Regle("musee_annee_unique", "df_modele", "unicite", ("id_museofile", "annee")),
+        Regle("effectifs_positifs", "df_modele", "plage", EFFECTIFS, {"min": 0}),
+        Regle("parts_entre_0_et_1", "df_modele", "plage", PARTS, {"min": 0, "max": 1}, seuil=0.01),
+        Regle("payant_plus_gratuit", "df_modele", "somme", EFFECTIFS, {"tolerance": 0.01}, seuil=0.01),
+        Regle("annees_consecutives", "df_modele", "continuite", ("id_museofile", "annee"), seuil=None),
+        Regle("musee_dans_museofile", "df_modele", "couverture", ("id_museofile",), {"reference": "musees"}),
+    ]
+    regles += [
+        Regle(f"{col}_renseigne", "df_modele", "non_manquant", (col,), seuil=None)
+        for col in COLONNES_MANQUANTS
+    ]
+    for regle in regles:
+        if (regle.table, regle.nom) in exceptions:
+            regle.options["exceptions"] = exceptions[(regle.table, regle.nom)]
+    return regles
+
+
+class Balayage:
+    """Colonnes d'une table lues une fois et partagées par toutes ses règles."""
+
+    def __init__(self, df: pd.DataFrame, colonnes: Iterable[str]):
+        self.df = df[[c for c in dict.fromkeys(colonnes) if c in df.columns]]
+        self._flottants: Dict[str, np.ndarray] = {}
+        self._codes: Dict[str, Tuple[np.ndarray, pd.Index]] = {}
+
+    def codes(self, col: str) -> Tuple[np.ndarray, pd.Index]:
+        """pd.factorize de la colonne (codes, valeurs distinctes), calculé une fois."""
+        if col not in self._codes:
+            self._codes[col] = pd.factorize(self.df[col])
+        return self._codes[col]
+
+    def resume(self, col: str) -> Dict[str, Any]:
+        """Nombre de valeurs distinctes (hors manquants) ; min et max si numérique."""
+        resume = {"n_distincts": len(self.codes(col)[1]), "min": None, "max": None}
+        if pd.api.types.is_numeric_dtype(self.df[col]) and resume["n_distincts"]:
+            valeurs = self.flottant(col)
+            resume.update(min=np.nanmin(valeurs), max=np.nanmax(valeurs))
+        return resume
+
+    def flottant(self, col: str) -> np.ndarray:
+        if col not in self._flottants:
+            self._flottants[col] = pd.to_numeric(self.df[col], errors="coerce").to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+        return self._flottants[col]
+
+
+def _unicite(b: Balayage, regle: Regle, **_) -> np.ndarray:
+    cles = b.df[list(regle.colonnes)]
+    doublon = cles.duplicated(keep=False).to_numpy()
+    if regle.options.get("ignorer_manquants", True):
+        doublon &= cles.notna().all(axis=1).to_numpy()
+    return doublon
+
+
+def _plage(b: Balayage, regle: Regle, **_) -> np.ndarray:
+    echec = np.zeros(len(b.df), dtype=bool)
+    for col in regle.colonnes:
+        valeurs = b.flottant(col)
+        if "min" in regle.options:
+            echec |= valeurs < regle.options["min"]
+        if "max" in regle.options:
+            echec |= valeurs > regle.options["max"]
+    return echec
+
+
+def _somme(b: Balayage, regle: Regle, **_) -> np.ndarray:
+    """Somme des premières colonnes ≈ dernière, à tolerance (relative) près."""
+    *parts, total = regle.colonnes
+    somme = np.sum([b.flottant(c) for c in parts], axis=0)
+    attendu = b.flottant(total)
+    ecart = np.abs(somme - attendu)
+    # NaN (valeur absente) : comparaison fausse, pas d'échec
+    return ecart > regle.options.get("tolerance", 0) * np.maximum(np.abs(attendu), 1)
+
+
+def _continuite(b: Balayage, regle: Regle, contexte: Optional[pd.DataFrame] = None, **_) -> np.ndarray:
+    """Ligne dont le musée a une année antérieure, mais pas l'année précédente."""
+    cle, annee = regle.colonnes
+    histoire = contexte if contexte is not None else b.df
+    panel = PanelAnnuel(histoire, cle=cle, annee=annee)
+    annees = histoire[annee].to_numpy(dtype=np.int64)
+    premiere = pd.Series(annees).groupby(pd.factorize(histoire[cle])[0]).transform("min").to_numpy()
+    trou = panel.valides & (annees > premiere) & (panel.positions(1) < 0)
+    if contexte is None:
+        return trou
+    # Report sur les lignes contrôlées, par clé (musée, année)
+    avec_trou = pd.MultiIndex.from_arrays([histoire[cle].astype(object), annees])[trou]
+    cles = pd.MultiIndex.from_arrays([b.df[cle].astype(object), b.df[annee].to_numpy(dtype=np.int64)])
+    return cles.isin(avec_trou)
+
+
+def _couverture(b: Balayage, regle: Regle, references: Dict[str, pd.DataFrame], **_) -> np.ndarray:
+    """Clé absente de la table de référence (ex : musée absent de Museofile)."""
+    reference = references[regle.options["reference"]]
+    cles_reference = regle.options.get("cles_reference", regle.colonnes)
+    dimension = IndexDimension(reference.rename(columns=dict(zip(cles_reference, regle.colonnes))),
+                               regle.colonnes)
+    connue = pd.Index(dimension.cle_entiere(b.df)).isin(dimension.index)
+    renseignee = b.df[list(regle.colonnes)].notna().all(axis=1).to_numpy()
+    return renseignee & ~connue
+
+
+def _non_manquant(b: Balayage, regle: Regle, **_) -> np.ndarray:
+    return b.df[list(regle.colonnes)].isna().any(axis=1).to_numpy()
+
+
+VERIFICATIONS: Dict[str, Callable[..., np.ndarray]] = {
+    "unicite": _unicite,
+    "plage": _plage,
+    "somme": _somme,
+    "continuite": _continuite,
+    "couverture": _couverture,
+    "non_manquant": _non_manquant,
+}
+
+
+class ResultatQualite:
+    """Rapport des règles (une ligne par règle) et lignes en échec de chacune."""
+
+    def __init__(self, rapport: pd.DataFrame, tables: Dict[str, pd.DataFrame],
+                 masques: Dict[Tuple[str, str], np.ndarray],
+                 resume: Optional[pd.DataFrame] = None):
+        self.rapport = rapport
+        # Valeurs distinctes, min et max des colonnes demandées (evaluer(resume=...))
+        self.resume = resume if resume is not None else pd.DataFrame()
+        self._tables = tables
+        self._masques = masques
+
+    @property
+    def ok(self) -> bool:
+        return not (self.rapport["statut"] == "echec").any()
+
+    def echecs(self, table: str, regle: str) -> pd.DataFrame:
+        """Lignes de `table` en échec pour `regle` (toutes les colonnes disponibles)."""
+        return self._tables[table][self._masques[(table, regle)]]
+
+    def exporter_echecs(self, dossier: Path) -> List[Path]:
+        """Un CSV par règle en échec (hors règles informatives) : dossier/table__regle.csv."""
+        dossier = Path(dossier)
+        dossier.mkdir(parents=True, exist_ok=True)
+        chemins = []
+        for ligne in self.rapport[self.rapport["statut"] == "echec"].itertuples():
+            chemin = dossier / f"{ligne.table}__{ligne.regle}.csv"
+            self.echecs(ligne.table, ligne.regle).to_csv(chemin)
+            chemins.append(chemin)
+        return chemins
+
+
+def evaluer(
+    tables: Dict[str, pd.DataFrame],
+    regles: Optional[Sequence[Regle]] = None,
+    annees: Optional[Sequence[int]] = None,
+    contextes: Optional[Dict[str, pd.DataFrame]] = None,
+    resume: Optional[Dict[str, Sequence[str]]] = None,
+) -> ResultatQualite:
+    """Évalue les règles table par table.
+
+    Les colonnes utilisées par les règles d'une table sont extraites une
+    fois (Balayage) puis chaque règle calcule un masque vectorisé des
+    lignes en échec. Les règles des tables absentes sont ignorées.
+
+    - annees : ne contrôle que ces partitions (tables ayant une colonne
+      annee), par exemple les années ajoutées en incrémental ;
+    - contextes : historique (clé, annee) complet d'une table pour la
+      règle de continuité quand `tables` n'en contient qu'une partie ;
+    - resume : colonnes par table dont on veut le nombre de valeurs
+      distinctes, le min et le max, tirés du même balayage.
+    """
+    regles = regles_par_defaut() if regles is None else regles
+    contextes, resume = contextes or {}, resume or {}
+    lignes, controlees, masques, resumes = [], {}, {}, []
+
+    for table in dict.fromkeys([r.table for r in regles] + list(resume)):
+        if table not in tables:
+            continue
+        df = tables[table]
+        regles_table = [r for r in regles if r.table == table]
+        if annees is not None and "annee" in df.columns:
+            df = df[df["annee"].isin(list(annees))]
+        controlees[table] = df
+        colonnes = [c for r in regles_table for c in r.colonnes]
+        colonnes += [r.options["colonne_exceptions"] for r in regles_table
+                     if "colonne_exceptions" in r.options]
+        balayage = Balayage(df, colonnes + list(resume.get(table, ())))
+        resumes += [{"table": table, "colonne": col, **balayage.resume(col)}
+                    for col in resume.get(table, ())]
+
+        for regle in regles_table:
+            manquantes = [c for c in regle.colonnes if c not in df.columns]
+            if manquantes:
+                raise KeyError(f"Règle {table}.{regle.nom} : colonnes absentes {manquantes}")
+            contexte = contextes.get(table)
+            if contexte is None and annees is not None and regle.type == "continuite":
+                contexte = tables[table]
+            masque = VERIFICATIONS[regle.type](
+                balayage, regle, references=tables, contexte=contexte
+            )
+            n_exceptions = 0
+            if regle.options.get("exceptions"):
+                codes, valeurs = balayage.codes(regle.options.get("colonne_exceptions", regle.colonnes[0]))
+                connues = valeurs.astype(str).isin(list(regle.options["exceptions"]))
+                exceptee = (codes >= 0) & connues[np.maximum(codes, 0)]
+                n_exceptions = int((masque & exceptee).sum())
+                masque = masque & ~exceptee
+            n_echecs = int(masque.sum())
+            taux = n_echecs / len(df) if len(df) else 0.0
+            if regle.seuil is None:
+                statut = "info"
+            else:
+                statut = "ok" if taux <= regle.seuil else "echec"
+            lignes.append({
+                "table": table, "regle": regle.nom, "type": regle.type,
+                "colonnes": ", ".join(regle.colonnes),
+                "n_lignes": len(df), "n_echecs": n_echecs, "n_exceptions": n_exceptions, "taux": taux,
+                "seuil": regle.seuil, "statut": statut,
+            })
+            masques[(table, regle.nom)] = masque
+
+    return ResultatQualite(pd.DataFrame(lignes), controlees, masques, pd.DataFrame(resumes))
+
+
+def controler_sorties(
+    annees: Optional[Sequence[int]] = None,
+    regles: Optional[Sequence[Regle]] = None,
+    output_dir: Path = OUTPUT_DIR,
+) -> ResultatQualite:
+    """Évalue les règles sur les tables exportées dans output_dir.
+
+    Seules les colonnes utilisées par les règles sont lues ; avec `annees`,
+    seules ces partitions le sont (plus, pour la continuité, la clé et
+    l'année de tout l'historique).
+    """
+    regles = regles_par_defaut() if regles is None else regles
+    references = {r.options["reference"] for r in regles if r.type == "couverture"}
+    tables, contextes = {}, {}
+    for table in dict.fromkeys(r.table for r in regles) | dict.fromkeys(references):
+        nom = NOMS_SORTIES[table]
+        colonnes = [c for r in regles if r.table == table for c in r.colonnes]
+        colonnes += [r.options["colonne_exceptions"] for r in regles
+                     if r.table == table and "colonne_exceptions" in r.options]
+        colonnes += [c for r in regles if r.type == "couverture"
+                     and r.options["reference"] == table
+                     for c in r.options.get("cles_reference", r.colonnes)]
+        partitionnee = "annee" in lire_manifeste(nom, output_dir)["partition_cols"]
+        filtrer = annees is not None and partitionnee and table not in references
+        tables[table] = lire_table(
+            nom, colonnes=list(dict.fromkeys(colonnes)),
+            filtres=[("annee", "in", list(annees))] if filtrer else None,
+            output_dir=output_dir,
+        )
+        continuite = [r for r in regles if r.table == table and r.type == "continuite"]
+        if filtrer and continuite:
+            contextes[table] = lire_table(nom, colonnes=list(continuite[0].colonnes),
+                                          output_dir=output_dir)
+    return evaluer(tables, regles, annees=annees, contextes=contextes)
+
+
+def afficher_rapport(resultat: ResultatQualite) -> None:
+    """Rapport lisible : règles en échec signalées, taux de manquants en %."""
+    rapport = resultat.rapport.copy()
+    rapport["taux"] = (rapport["taux"] * 100).round(2).astype(str) + " %"
+    print(rapport.drop(columns=["type", "colonnes"]).to_string(index=False))
+    en_echec = resultat.rapport[resultat.rapport["statut"] == "echec"]
+    for ligne in en_echec.itertuples():
+        print(f"Règle {ligne.table}.{ligne.regle} non respectée : "
+              f"{ligne.n_echecs} lignes ({ligne.taux:.2%} > {ligne.seuil:.2%})")
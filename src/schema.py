@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import pandas as pd
+
+from .profilage import afficher
+
+# Schéma mémoire compact des tables du pipeline (colonnes absentes ignorées)
+
+# Chaînes répétées d'une année sur l'autre (identifiants, noms, géographie)
+COLONNES_CATEGORIE = [
+    "id_patrimostat", "id_museofile", "nom_du_musee", "nom_officiel",
+    "region", "departement", "ville", "codeInseeCommune",
+    "dateappellation", "ferme", "anneefermeture",
+    "categorie", "domaine_thematique", "domaine_clean",
+]
+
+# Effectifs de visiteurs : entiers avec valeurs manquantes (max ~10 M < 2**31)
+COLONNES_EFFECTIFS = [
+    "payant", "gratuit", "total",
+    "individuel", "scolaires", "groupes_hors_scolaires",
+    "moins_18_ans_hors_scolaires", "_18_25_ans",
+    "total_frequentation", "total_t_1",
+]
+
+# Indicateurs 0/1 (en plus des colonnes is_<domaine>)
+COLONNES_INDICATEURS = ["has_excel", "age_musee_missing", "est_idf"]
+PREFIXE_INDICATEURS = "is_"
+
+
+def dtypes_schema(df: pd.DataFrame) -> Dict[str, str]:
+    """Dtype cible de chaque colonne de df couverte par le schéma."""
+    dtypes = {}
+    for col in df.columns:
+        if col in COLONNES_CATEGORIE:
+            dtypes[col] = "category"
+        elif col in COLONNES_EFFECTIFS:
+            dtypes[col] = "Int32"
+        elif col == "annee":
+            dtypes[col] = "int16"
+        elif col in COLONNES_INDICATEURS or col.startswith(PREFIXE_INDICATEURS):
+            dtypes[col] = "uint8"
+    return dtypes
+
+
+def memoire(df: pd.DataFrame) -> int:
+    """Empreinte mémoire en octets (chaînes comprises)."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def appliquer_schema(df: pd.DataFrame, table: Optional[str] = None) -> pd.DataFrame:
+    """Convertit df au schéma compact, valeurs inchangées.
+
+    Les effectifs doivent être entiers (NaN -> <NA>) : une valeur non entière
+    lève une erreur plutôt que d'être tronquée. Avec `table`, affiche le gain
+    mémoire obtenu (sauf en mode silencieux).
+    """
+    avant = memoire(df) if table is not None else None
+    df = df.copy()
+    for col, dtype in dtypes_schema(df).items():
+        if str(df[col].dtype) == dtype:
+            continue
+        if dtype == "category":
+            df[col] = df[col].astype("category")
+        elif dtype == "Int32":
+            # float -> Int32 vérifie que les valeurs sont entières
+            df[col] = pd.to_numeric(df[col]).astype("Int32")
+        else:
+            valeurs = pd.to_numeric(df[col])
+            converties = valeurs.astype(dtype)
+            if not (converties == valeurs).all():
+                raise ValueError(f"{col} : valeurs hors de la plage de {dtype}")
+            df[col] = converties
+    if table is not None:
+        apres = memoire(df)
+        afficher(f"  Schéma {table} : {avant / 2**20:.2f} Mo -> {apres / 2**20:.2f} Mo "
+                 f"(-{(avant - apres) / 2**20:.2f} Mo, -{1 - apres / avant:.0%})")
+    return df
+
+
+def en_float(df: pd.DataFrame) -> pd.DataFrame:
+    """Effectifs du schéma repassés en float64 (NaN) pour les calculs."""
+    df = df.copy()
+    for col in COLONNES_EFFECTIFS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
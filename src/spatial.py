@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+RAYON_TERRE_KM = 6371.0088
+RAYONS_KM = (10, 50)
+
+
+class IndexSpatial:
+    """Index haversine (BallTree) sur les coordonnées des musées, construit une fois.
+
+    Les requêtes (rayon, plus proche voisin) sont faites en lot pour tous
+    les musées : le voisinage d'un rayon donné est une matrice creuse
+    musée x musée (sans la diagonale), réutilisée pour toutes les années.
+    Les musées sans coordonnées n'ont pas de voisins.
+    """
+
+    def __init__(self, musees: pd.DataFrame, cle: str = "id_museofile"):
+        from sklearn.neighbors import BallTree
+
+        musees = musees[musees[cle].notna()].drop_duplicates(cle)
+        self.ids = pd.Index(musees[cle].astype(str))
+        coords = musees[["latitude", "longitude"]].apply(pd.to_numeric, errors="coerce")
+        self.localises = coords.notna().all(axis=1).to_numpy()
+        self.radians_musees = np.radians(coords.to_numpy(dtype=np.float64))
+        self.radians = self.radians_musees[self.localises]
+        # Ligne de l'arbre -> position dans ids
+        self.positions = np.flatnonzero(self.localises)
+        self.arbre = BallTree(self.radians, metric="haversine")
+        self._voisinages: Dict[float, "object"] = {}
+
+    def voisinage(self, rayon_km: float):
+        """Matrice creuse (CSR) des paires de musées distants de moins de rayon_km."""
+        from scipy import sparse
+
+        if rayon_km not in self._voisinages:
+            voisins = self.arbre.query_radius(self.radians, r=rayon_km / RAYON_TERRE_KM)
+            tailles = np.fromiter((len(v) for v in voisins), dtype=np.int64, count=len(voisins))
+            lignes = np.repeat(self.positions, tailles)
+            colonnes = self.positions[np.concatenate(voisins)] if len(voisins) else np.empty(0, int)
+            hors_diagonale = lignes != colonnes
+            n = len(self.ids)
+            self._voisinages[rayon_km] = sparse.csr_matrix(
+                (np.ones(hors_diagonale.sum()), (lignes[hors_diagonale], colonnes[hors_diagonale])),
+                shape=(n, n),
+            )
+        return self._voisinages[rayon_km]
+
+    def distance_plus_proche(self, cibles: np.ndarray) -> np.ndarray:
+        """Distance (km) de chaque musée au plus proche musée de `cibles` (masque), lui-même exclu."""
+        distances = np.full(len(self.ids), np.nan)
+        cibles = cibles & self.localises
+        if cibles.sum() == 0:
+            return distances
+        from sklearn.neighbors import BallTree
+
+        arbre = BallTree(self.radians_musees[cibles], metric="haversine")
+        # k = 2 : le premier voisin d'un musée cible est lui-même
+        k = min(2, int(cibles.sum()))
+        dist, ind = arbre.query(self.radians, k=k)
+        positions_cibles = np.flatnonzero(cibles)
+        soi_meme = positions_cibles[ind[:, 0]] == self.positions
+        plus_proche = dist[:, 0].copy()
+        if k == 2:
+            plus_proche[soi_meme] = dist[soi_meme, 1]
+        else:
+            plus_proche[soi_meme] = np.nan
+        distances[self.positions] = plus_proche * RAYON_TERRE_KM
+        return distances
+
+
+def features_spatiales(
+    df: pd.DataFrame,
+    index: IndexSpatial,
+    rayons_km: Sequence[float] = RAYONS_KM,
+    colonne_freq: str = "total_t_1",
+    colonne_geant: Optional[str] = "is_geant",
+    cle: str = "id_museofile",
+    annee: str = "annee",
+) -> pd.DataFrame:
+    """Variables de voisinage pour chaque ligne musée x année de df.
+
+    - n_musees_{r}km : nombre de musées à moins de r km ;
+    - freq_voisins_{r}km : somme de `colonne_freq` (ex : fréquentation t-1)
+      des musées à moins de r km la même année (produit matrice creuse x
+      matrice musée x année) ;
+    - dist_geant_km : distance au plus proche autre musée géant de l'année
+      (`colonne_geant`, 1 = géant).
+
+    Résultat aligné sur l'index de df, NaN si le musée n'est pas localisé.
+    """
+    position = index.ids.get_indexer(df[cle].astype(str).where(df[cle].notna()))
+    connue = (position >= 0) & index.localises[np.maximum(position, 0)]
+    annees, code_annee = np.unique(df[annee].to_numpy(), return_inverse=True)
+
+    def par_ligne(valeurs: np.ndarray) -> np.ndarray:
+        # vecteur par musée ou matrice musée x année -> valeur de chaque ligne de df
+        out = np.full(len(df), np.nan)
+        if valeurs.ndim == 1:
+            out[connue] = valeurs[position[connue]]
+        else:
+            out[connue] = valeurs[position[connue], code_annee[connue]]
+        return out
+
+    def musee_annee(colonne: str) -> np.ndarray:
+        # Valeurs de df rangées en matrice musée x année (0 si absente)
+        valeurs = pd.to_numeric(df[colonne], errors="coerce").to_numpy(dtype=np.float64)
+        matrice = np.zeros((len(index.ids), len(annees)))
+        presentes = (position >= 0) & ~np.isnan(valeurs)
+        matrice[position[presentes], code_annee[presentes]] = valeurs[presentes]
+        return matrice
+
+    out: Dict[str, np.ndarray] = {}
+    freq = musee_annee(colonne_freq) if colonne_freq else None
+    for rayon in rayons_km:
+        voisinage = index.voisinage(rayon)
+        nom = f"{rayon:g}km"
+        nombre = np.asarray(voisinage.sum(axis=1)).ravel()
+        out[f"n_musees_{nom}"] = par_ligne(nombre)
+        if freq is not None:
+            out[f"freq_voisins_{nom}"] = par_ligne(voisinage @ freq)
+
+    if colonne_geant:
+        geants = musee_annee(colonne_geant) > 0
+        distances = np.column_stack([index.distance_plus_proche(geants[:, j]) for j in range(len(annees))])
+        out["dist_geant_km"] = par_ligne(distances)
+
+    return pd.DataFrame(out, index=df.index)
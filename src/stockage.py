@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .chemins import OUTPUT_DIR
+
+FICHIER_MANIFESTE = "_manifest.json"
+COMPRESSION = "zstd"
+
+# Tables de sortie du pipeline (nom du dataset dans output/)
+NOMS_SORTIES = {
+    "musees": "musees",
+    "fact_freq": "frequentation_annuelle",
+    "fact_excel": "frequentation_excel_long",
+    "df_modele": "df_modele_musees",
+}
+
+
+def chemin_table(nom: str, output_dir: Path = OUTPUT_DIR) -> Path:
+    """Dossier du dataset Parquet d'une table."""
+    return output_dir / nom
+
+
+def lire_manifeste(nom: str, output_dir: Path = OUTPUT_DIR) -> dict:
+    """Manifeste JSON d'une table (colonnes, dtypes, partitions, lignes)."""
+    return json.loads((chemin_table(nom, output_dir) / FICHIER_MANIFESTE).read_text())
+
+
+def table_existe(nom: str, output_dir: Path = OUTPUT_DIR) -> bool:
+    return (chemin_table(nom, output_dir) / FICHIER_MANIFESTE).exists()
+
+
+def ecrire_table(
+    df: pd.DataFrame,
+    nom: str,
+    output_dir: Path = OUTPUT_DIR,
+    partition_cols: Sequence[str] = ("annee",),
+    csv: bool = False,
+    seulement_partitions: bool = False,
+) -> None:
+    """Écrit une table en Parquet compressé, partitionné (ex : annee=2023/).
+
+    - partition_cols : colonnes de partitionnement (vide = un seul fichier),
+      par exemple ("annee", "region") ;
+    - csv : exporte aussi nom.csv (ancien format, optionnel) ;
+    - seulement_partitions : ne remplace que les partitions présentes dans df
+      (les autres sont conservées), utile pour l'ajout d'une année.
+
+    Un manifeste _manifest.json décrit le schéma et les partitions écrites.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    dossier = chemin_table(nom, output_dir)
+    partition_cols = [c for c in partition_cols if c in df.columns]
+
+    ancien = None
+    if seulement_partitions and table_existe(nom, output_dir):
+        ancien = lire_manifeste(nom, output_dir)
+    if ancien is not None and ancien["partition_cols"] != partition_cols:
+        raise ValueError(
+            f"Partitionnement différent de la table existante {nom} : "
+            f"{ancien['partition_cols']} vs {partition_cols}"
+        )
+    if ancien is None and dossier.exists():
+        shutil.rmtree(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if partition_cols:
+        pq.write_to_dataset(
+            table,
+            dossier,
+            partition_cols=partition_cols,
+            basename_template="part-{i}.parquet",
+            existing_data_behavior="delete_matching",
+            compression=COMPRESSION,
+        )
+        comptes = df.groupby(partition_cols, dropna=False, observed=True).size()
+        partitions = []
+        for cle, n in comptes.items():
+            cle = cle if isinstance(cle, tuple) else (cle,)
+            partitions.append({
+                "valeurs": {c: _jsonable(v) for c, v in zip(partition_cols, cle)},
+                "n_lignes": int(n),
+            })
+    else:
+        pq.write_table(table, dossier / "part-0.parquet", compression=COMPRESSION)
+        partitions = []
+
+    if ancien is not None:
+        # On garde les partitions non réécrites
+        nouvelles = {json.dumps(p["valeurs"], sort_keys=True) for p in partitions}
+        partitions = [
+            p for p in ancien["partitions"]
+            if json.dumps(p["valeurs"], sort_keys=True) not in nouvelles
+        ] + partitions
+        partitions.sort(key=lambda p: json.dumps(p["valeurs"], sort_keys=True))
+
+    manifeste = {
+        "table": nom,
+        "format": "parquet",
+        "compression": COMPRESSION,
+        "partition_cols": partition_cols,
+        "colonnes": [{"nom": c, "dtype": str(df[c].dtype)} for c in df.columns],
+        "n_lignes": sum(p["n_lignes"] for p in partitions) if partitions else len(df),
+        "partitions": partitions,
+        "ecrit_le": datetime.now().isoformat(timespec="seconds"),
+    }
+    (dossier / FICHIER_MANIFESTE).write_text(json.dumps(manifeste, ensure_ascii=False, indent=2))
+
+    if csv:
+        df.to_csv(output_dir / f"{nom}.csv", index=False)
+
+
+def exporter_sorties(
+    tables: Dict[str, pd.DataFrame],
+    output_dir: Path = OUTPUT_DIR,
+    csv: bool = False,
+) -> None:
+    """Écrit les tables du pipeline dans output_dir (Parquet partitionné par annee).
+
+    Avec csv=True, les anciens fichiers CSV sont aussi exportés.
+    """
+    for nom, df in tables.items():
+        ecrire_table(df, NOMS_SORTIES[nom], output_dir, csv=csv)
+
+
+def _jsonable(v):
+    """Valeur de partition sérialisable en JSON (numpy -> python)."""
+    if pd.isna(v):
+        return None
+    return v.item() if hasattr(v, "item") else v
+
+
+def lire_table(
+    nom: str,
+    colonnes: Optional[List[str]] = None,
+    filtres: Optional[List[Tuple]] = None,
+    output_dir: Path = OUTPUT_DIR,
+) -> pd.DataFrame:
+    """Relit une table écrite par ecrire_table.
+
+    - colonnes : projection, seules ces colonnes sont lues sur disque ;
+    - filtres : prédicats au format pyarrow, ex : [("annee", ">=", 2022)].
+      Les filtres sur une colonne de partition évitent d'ouvrir les autres
+      partitions, les autres s'appuient sur les statistiques Parquet.
+
+    Les dtypes d'origine (y compris la colonne de partition) sont restaurés.
+    Les lignes sortent partition par partition.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    manifeste = lire_manifeste(nom, output_dir)
+    dtypes = {c["nom"]: c["dtype"] for c in manifeste["colonnes"]}
+    colonnes = list(colonnes) if colonnes is not None else list(dtypes)
+
+    table = pq.read_table(
+        chemin_table(nom, output_dir),
+        columns=colonnes,
+        filters=filtres,
+        partitioning="hive" if manifeste["partition_cols"] else None,
+    )
+    listes = [f.name for f in table.schema if pa.types.is_list(f.type)]
+    df = table.to_pandas()
+
+    # Colonnes de partition (relues en dictionnaire) et catégories dont les
+    # dictionnaires diffèrent d'un fichier à l'autre : dtype du manifeste
+    for col in df.columns:
+        if str(df[col].dtype) != dtypes[col]:
+            df[col] = df[col].astype(object).astype(dtypes[col])
+    # Catégories effectivement présentes, triées
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            presentes = df[col].cat.remove_unused_categories()
+            df[col] = presentes.cat.reorder_categories(sorted(presentes.cat.categories))
+    # Arrow renvoie les listes sous forme de tableaux numpy
+    for col in listes:
+        df[col] = [list(x) if x is not None else None for x in df[col]]
+
+    return df[colonnes]
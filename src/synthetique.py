@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .build_bases import load_raw_source, sources_brutes, split_coords
+
+# Dispersion du facteur d'échelle de fréquentation tiré pour chaque musée
+SIGMA_FREQUENTATION = 0.3
+# Écart-type du bruit sur les coordonnées (degrés)
+BRUIT_COORDONNEES = 0.01
+# Décalage en longitude de chaque pays supplémentaire (degrés) ; la
+# longitude est ramenée dans [-180, 180[ (les pays se chevauchent
+# au-delà de 360 / DECALAGE_PAYS = 18 pays)
+DECALAGE_PAYS = 20.0
+
+COLONNES_EFFECTIFS_ENTREES = [
+    "payant", "gratuit", "total", "individuel", "scolaires",
+    "groupes_hors_scolaires", "moins_18_ans_hors_scolaires", "_18_25_ans",
+]
+
+
+def charger_reference() -> Dict[str, pd.DataFrame]:
+    """Fichiers bruts réels (data/), modèles des données synthétiques."""
+    return {nom: load_raw_source(nom) for nom in ("museo_raw", "ent_raw", "freq_raw")}
+
+
+def _tirer_musees(ids: np.ndarray, echelle: float, rng: np.random.Generator) -> pd.DataFrame:
+    """Musée modèle de chaque musée synthétique, et son numéro de copie.
+
+    Chaque modèle est repris int(echelle) fois, la partie fractionnaire est
+    tirée sans remise : à x1, x10, ... les distributions réelles sont
+    exactement reproduites.
+    """
+    entier = int(echelle)
+    reste = int(round((echelle - entier) * len(ids)))
+    positions = np.concatenate([
+        np.tile(np.arange(len(ids)), entier),
+        rng.choice(len(ids), size=reste, replace=False),
+    ])
+    copie = np.concatenate([np.repeat(np.arange(entier), len(ids)), np.full(reste, entier)])
+    return pd.DataFrame({"modele": ids[positions], "copie": copie})
+
+
+def _suffixer_pays(valeurs: pd.Series, pays: np.ndarray) -> pd.Series:
+    # Régions et départements du pays p > 0 : libellés distincts "(p + 1)"
+    suffixe = pd.Series(np.where(pays > 0, " (" + (pays + 1).astype(str) + ")", ""), index=valeurs.index)
+    return valeurs.where(valeurs.isna() | (pays == 0), valeurs.astype(str) + suffixe)
+
+
+def _lignes_par_modele(cles: pd.Series, modeles: np.ndarray) -> tuple:
+    """Positions des lignes de chaque modèle (toutes ses années), musée par musée.
+
+    Renvoie (positions dans le frame réel, musée synthétique de chaque ligne).
+    """
+    ordre = np.argsort(cles.to_numpy(), kind="stable")
+    cles_triees = cles.to_numpy()[ordre]
+    uniques, debuts, tailles = np.unique(cles_triees, return_index=True, return_counts=True)
+    k = np.searchsorted(uniques, modeles)
+    connu = (k < len(uniques)) & (uniques[np.minimum(k, len(uniques) - 1)] == modeles)
+    musees = np.flatnonzero(connu)
+    n = tailles[k[musees]]
+    # Décalage de chaque ligne dans le bloc de son modèle
+    decalage = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    positions = ordre[np.repeat(debuts[k[musees]], n) + decalage]
+    return positions, np.repeat(musees, n)
+
+
+def generer_sources(
+    echelle: float = 1.0,
+    pays: int = 1,
+    annees_excel: Optional[Sequence[int]] = None,
+    graine: int = 0,
+    reference: Optional[Dict[str, pd.DataFrame]] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Fichiers bruts synthétiques (museo_raw, ent_raw, freq_raw) au schéma des réels.
+
+    Chaque musée synthétique reprend un musée réel (noms, catégories,
+    domaines, manquants, historique des années), avec de nouveaux
+    identifiants, des effectifs multipliés par un facteur log-normal et des
+    coordonnées bruitées :
+    - echelle : nombre de musées, en multiple du nombre réel ;
+    - pays : musées répartis sur plusieurs pays (régions et départements
+      distincts, coordonnées décalées) ;
+    - annees_excel : colonnes années de l'Excel large (par défaut 2001-2016),
+      valeurs reprises cycliquement des années réelles.
+    Les liens entre fichiers (id_patrimostat, id_museofile, musées non
+    rattachés) suivent ceux des fichiers réels.
+    """
+    rng = np.random.default_rng(graine)
+    reference = reference if reference is not None else charger_reference()
+    museo, ent, excel = reference["museo_raw"], reference["ent_raw"], reference["freq_raw"]
+
+    # Musées synthétiques : un par id_patrimostat réel (fréquentation ou Excel) x échelle
+    ids = np.array(sorted(set(ent["IDPatrimostat"].dropna()) | set(excel["REF DU MUSEE"].dropna())))
+    musees = _tirer_musees(ids, echelle, rng)
+    musees["pays"] = rng.integers(0, pays, size=len(musees))
+    musees["facteur"] = rng.lognormal(0.0, SIGMA_FREQUENTATION, size=len(musees))
+    # id_patrimostat : département du modèle + numéro à 5 chiffres unique dans le département
+    departement = musees["modele"].str[:2]
+    numero = musees.groupby(departement).cumcount()
+    musees["id_patrimostat"] = departement + numero.map("{:05d}".format)
+
+    # id_museofile : même musée Museofile pour les ids Patrimostat qui le partagent
+    museofile_modele = ent.drop_duplicates("IDPatrimostat").set_index("IDPatrimostat")["IDMuseofile"]
+    musees["museofile_modele"] = musees["modele"].map(museofile_modele)
+    cle = musees["museofile_modele"] + "|" + musees["copie"].astype(str) + "|" + musees["pays"].astype(str)
+    codes, _ = pd.factorize(cle)
+    connus = musees["museofile_modele"].isin(museo["Identifiant"])
+    # Ids inconnus de Museofile dans les données réelles : inconnus ici aussi
+    musees["id_museofile"] = pd.Series(
+        np.where(connus, "M", "X"), index=musees.index
+    ) + pd.Series(codes, index=musees.index).map("{:06d}".format)
+    musees.loc[musees["museofile_modele"].isna(), "id_museofile"] = np.nan
+
+    return {
+        "museo_raw": _museofile(museo, musees, echelle, rng),
+        "ent_raw": _entrees(ent, musees),
+        "freq_raw": _excel(excel, musees, annees_excel),
+    }
+
+
+def _museofile(museo: pd.DataFrame, musees: pd.DataFrame, echelle: float,
+               rng: np.random.Generator) -> pd.DataFrame:
+    # Une fiche par id_museofile synthétique connu, plus les fiches réelles
+    # qu'aucune fréquentation ne référence (répétées echelle fois)
+    fiches = musees.dropna(subset=["id_museofile"]).drop_duplicates("id_museofile")
+    fiches = fiches[fiches["id_museofile"].str.startswith("M")]
+    positions = museo.reset_index(drop=True).reset_index().set_index("Identifiant")["index"]
+    lignes = positions.loc[fiches["museofile_modele"]].to_numpy()
+    identifiants = fiches["id_museofile"].to_numpy()
+    pays = fiches["pays"].to_numpy()
+
+    isoles = np.flatnonzero(~museo["Identifiant"].isin(musees["museofile_modele"]).to_numpy())
+    isoles = _tirer_musees(isoles, echelle, rng)
+    lignes = np.concatenate([lignes, isoles["modele"].to_numpy()])
+    identifiants = np.concatenate([
+        identifiants, ("I" + pd.Series(np.arange(len(isoles))).map("{:06d}".format)).to_numpy(),
+    ])
+    pays = np.concatenate([pays, np.zeros(len(isoles), dtype=pays.dtype)])
+
+    out = museo.iloc[lignes].reset_index(drop=True)
+    out["Identifiant"] = identifiants
+    for col in ("Region", "Departement"):
+        out[col] = _suffixer_pays(out[col], pays)
+
+    # Coordonnées bruitées (et décalées par pays) ; les chaînes invalides restent telles quelles
+    coords = split_coords(out["Coordonnees"])
+    valides = coords["coords_valides"].to_numpy(dtype=bool)
+    lat = coords["latitude"].to_numpy() + rng.normal(0, BRUIT_COORDONNEES, len(out))
+    lon = coords["longitude"].to_numpy() + rng.normal(0, BRUIT_COORDONNEES, len(out)) + pays * DECALAGE_PAYS
+    # Rotation autour de l'axe des pôles : distances entre musées d'un même pays conservées
+    lon = (lon + 180) % 360 - 180
+    texte = pd.Series(lat).map("{:.6f}".format) + ", " + pd.Series(lon).map("{:.6f}".format)
+    out["Coordonnees"] = out["Coordonnees"].where(~valides, texte.to_numpy())
+    return out
+
+
+def _entrees(ent: pd.DataFrame, musees: pd.DataFrame) -> pd.DataFrame:
+    # Toutes les années du modèle, effectifs multipliés par le facteur du musée
+    positions, musee = _lignes_par_modele(ent["IDPatrimostat"], musees["modele"].to_numpy())
+    out = ent.iloc[positions].reset_index(drop=True)
+    infos = musees.iloc[musee].reset_index(drop=True)
+    out["IDPatrimostat"] = infos["id_patrimostat"].to_numpy()
+    out["IDMuseofile"] = infos["id_museofile"].to_numpy()
+    pays = infos["pays"].to_numpy()
+    for col in ("region", "departement"):
+        out[col] = _suffixer_pays(out[col], pays)
+
+    facteur = infos["facteur"].to_numpy()
+    coherent = (out["payant"] + out["gratuit"] == out["total"]).to_numpy()
+    for col in COLONNES_EFFECTIFS_ENTREES:
+        out[col] = np.round(out[col].to_numpy(dtype=np.float64) * facteur)
+    # total = payant + gratuit là où c'était le cas dans les données réelles
+    out.loc[coherent, "total"] = out.loc[coherent, "payant"] + out.loc[coherent, "gratuit"]
+    return out
+
+
+def _excel(excel: pd.DataFrame, musees: pd.DataFrame, annees_excel: Optional[Sequence[int]]) -> pd.DataFrame:
+    # Une ligne par musée synthétique présent dans l'Excel, années en colonnes
+    positions, musee = _lignes_par_modele(excel["REF DU MUSEE"], musees["modele"].to_numpy())
+    out = excel.iloc[positions].reset_index(drop=True)
+    infos = musees.iloc[musee].reset_index(drop=True)
+    out["REF DU MUSEE"] = infos["id_patrimostat"].to_numpy()
+    pays = infos["pays"].to_numpy()
+    out["NEW REGIONS"] = _suffixer_pays(out["NEW REGIONS"], pays).str.upper()
+
+    annees_reelles = [c for c in excel.columns if str(c).isdigit()]
+    annees = [str(a) for a in annees_excel] if annees_excel is not None else annees_reelles
+    premiere = int(annees_reelles[0])
+    facteur = infos["facteur"].to_numpy()
+    colonnes = {}
+    for annee in annees:
+        # Les codes (NC, SO, F...) sont conservés, les effectifs mis à l'échelle
+        modele = annees_reelles[(int(annee) - premiere) % len(annees_reelles)]
+        brut = out[modele]
+        valeurs = pd.to_numeric(brut, errors="coerce")
+        effectif = np.round(valeurs.to_numpy() * facteur)
+        texte = pd.Series(effectif, dtype="float64").map("{:.0f}".format)
+        colonnes[annee] = brut.where(valeurs.isna(), texte.to_numpy())
+
+    fixes = [c for c in out.columns if not str(c).isdigit() and not str(c).startswith("Unnamed")]
+    notes = [c for c in out.columns if str(c).startswith("Unnamed")]
+    return pd.concat([out[fixes], pd.DataFrame(colonnes), out[notes]], axis=1)
+
+
+def ecrire_sources(sources: Dict[str, pd.DataFrame], data_dir: Path) -> Dict[str, Path]:
+    """Écrit les fichiers bruts sous leurs noms et formats réels dans data_dir.
+
+    Relus par load_raw_source(nom, data_dir=data_dir) ou le pipeline
+    (etapes_par_defaut(data_dir)).
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    chemins = {}
+    for nom, (chemin, _, options) in sources_brutes(data_dir).items():
+        df = sources[nom]
+        if chemin.suffix == ".xlsx":
+            # Colonnes années et effectifs en nombres, comme dans le fichier réel
+            df = df.copy()
+            for col in [c for c in df.columns if str(c).isdigit()]:
+                valeurs = pd.to_numeric(df[col], errors="coerce")
+                df[col] = df[col].where(valeurs.isna(), valeurs).astype(object)
+            df = df.rename(columns=lambda c: "" if str(c).startswith("Unnamed") else c)
+            df.to_excel(chemin, index=False)
+        else:
+            df.to_csv(chemin, sep=options["sep"], index=False)
+        chemins[nom] = chemin
+    return chemins
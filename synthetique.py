@@ -0,0 +1,34 @@
+import argparse
+import time
+from pathlib import Path
+
+from src.synthetique import ecrire_sources, generer_sources
+
+
+def main(sortie: str, echelle: float = 1.0, pays: int = 1, annees_excel=None, graine: int = 0):
+    debut = time.perf_counter()
+    sources = generer_sources(echelle, pays=pays, annees_excel=annees_excel, graine=graine)
+    chemins = ecrire_sources(sources, Path(sortie))
+
+    for nom, chemin in chemins.items():
+        print(f"  {nom:<10} {sources[nom].shape} -> {chemin}")
+    print(f"Données synthétiques x{echelle:g} ({pays} pays) écrites en "
+          f"{time.perf_counter() - debut:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fichiers bruts synthétiques (Museofile, Entrées, Excel) au schéma des fichiers de data/."
+    )
+    parser.add_argument("sortie", help="dossier des fichiers générés (noms identiques à data/)")
+    parser.add_argument("--echelle", type=float, default=1.0,
+                        help="nombre de musées, en multiple des données réelles")
+    parser.add_argument("--pays", type=int, default=1,
+                        help="pays (régions, départements et coordonnées distincts)")
+    parser.add_argument("--annees-excel", type=int, nargs=2, metavar=("DEBUT", "FIN"),
+                        help="colonnes années de l'Excel large (par défaut 2001 2016)")
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    annees = range(args.annees_excel[0], args.annees_excel[1] + 1) if args.annees_excel else None
+    main(args.sortie, echelle=args.echelle, pays=args.pays, annees_excel=annees, graine=args.graine)
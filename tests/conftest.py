@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Les tests importent src.* depuis la racine du dépôt, comme les scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.build_bases import load_raw_source  # noqa: E402
+from src.profilage import definir_apercus  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def sans_apercus():
+    definir_apercus(False)
+
+
+@pytest.fixture(scope="session")
+def sources_reelles():
+    """freq_raw, ent_raw, museo_raw de data/ (relus via le cache Arrow)."""
+    return tuple(load_raw_source(nom) for nom in ("freq_raw", "ent_raw", "museo_raw"))
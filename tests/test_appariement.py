@@ -0,0 +1,65 @@
+import pandas as pd
+
+from src.appariement import apparier, normaliser, normaliser_noms, proposer_correspondances
+
+
+def _table(lignes):
+    df = pd.DataFrame(lignes, columns=["cle", "nom", "ville", "departement"])
+    df["commune"] = normaliser(df["ville"])
+    return df
+
+
+def test_normalisation():
+    noms = pd.Series(["Musée de ST-ÉTIENNE", "musee de Saint Etienne"])
+    assert normaliser_noms(noms).tolist() == ["saint etienne", "saint etienne"]
+
+
+def test_apparier_dans_le_bloc_seulement():
+    sources = _table([("s1", "Musée des Beaux-Arts", "Lyon", "69")])
+    cibles = _table([
+        ("c1", "Musée des Beaux-Arts", "Rouen", "76"),
+        ("c2", "Musée des beaux arts", "LYON", "69"),
+    ])
+    paires = apparier(sources, cibles)
+    assert paires[["cle_source", "cle_cible", "bloc"]].values.tolist() == [["s1", "c2", "commune"]]
+
+
+def test_repli_sur_le_departement():
+    sources = _table([("s1", "Musée de la Mine", "Saint-Étienne", "42")])
+    cibles = _table([("c1", "Musée de la mine", "Roche-la-Molière", "42")])
+    assert apparier(sources, cibles)["bloc"].tolist() == ["departement"]
+
+
+def test_un_a_un():
+    # Deux sources proches d'une même cible : seule la meilleure l'obtient
+    sources = _table([
+        ("s1", "Musée d'Orsay", "Paris", "75"),
+        ("s2", "Musée d'Orsay annexe", "Paris", "75"),
+    ])
+    cibles = _table([("c1", "Musée d'Orsay", "Paris", "75")])
+    paires = apparier(sources, cibles)
+    assert paires[["cle_source", "cle_cible"]].values.tolist() == [["s1", "c1"]]
+
+
+def test_paires_auto_a_relire_par_defaut():
+    musees = pd.DataFrame(columns=["id_museofile", "nom_officiel", "ville", "departement"])
+    fact_freq = pd.DataFrame({
+        "id_patrimostat": ["3417210"], "id_museofile": [None],
+        "nom_du_musee": ["musée de l'hôtel d'Espeyran"], "ville": ["MONTPELLIER"],
+        "departement": ["Hérault"], "annee": [2017],
+    })
+    fact_excel = pd.DataFrame({
+        "id_patrimostat": ["3417910"], "nom_musee_excel": ["Musée de l'Hôtel d'Espeyran"],
+        "ville_excel": ["MONTPELLIER"],
+    })
+    table = proposer_correspondances(musees, fact_freq, fact_excel)
+    excel = table[table["lien"] == "excel"]
+    assert excel[["statut", "valide"]].values.tolist() == [["auto", ""]]
+
+    table = proposer_correspondances(musees, fact_freq, fact_excel, valider_auto=True)
+    assert table.loc[table["lien"] == "excel", "valide"].tolist() == ["oui"]
+
+    # Une décision relue l'emporte, avec ou sans validation d'office
+    relue = table.assign(valide="non")
+    table = proposer_correspondances(musees, fact_freq, fact_excel, existantes=relue, valider_auto=True)
+    assert table.loc[table["lien"] == "excel", "valide"].tolist() == ["non"]
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import backtest
+from src.backtest import evaluer_pli, origines, preparer_backtest, tableau_metriques
+
+
+@pytest.fixture
+def donnees():
+    # 12 musées sur 2014-2019, deux régions
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"id_museofile": [f"M{i:02d}" for i in range(12)]}).merge(
+        pd.DataFrame({"annee": range(2014, 2020)}), how="cross"
+    )
+    niveau = df["id_museofile"].str[1:].astype(int).to_numpy() + 1
+    df["total"] = (niveau * 5_000 * rng.uniform(0.8, 1.2, len(df))).round()
+    df["region"] = np.where(niveau % 2, "Bretagne", "Occitanie")
+    df["est_idf"] = 0
+    df["age_musee"] = 10.0
+    for col in ("part_gratuit", "part_scolaires", "part_individuels"):
+        df[col] = 0.5
+    return preparer_backtest(df)
+
+
+def test_origines(donnees):
+    # t-3 connu à partir de 2017 ; il faut au moins une année évaluable avant
+    assert origines(donnees) == [2018, 2019]
+    assert origines(donnees, premiere=2019) == [2019]
+
+
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+@pytest.mark.parametrize("modele", ["naif", "lasso", "foret"])
+def test_evaluer_pli_sans_annee_de_test(donnees, modele, monkeypatch):
+    # Les modèles ne reçoivent à l'entraînement que des années < origine
+    vues = []
+    for nom in ("construire_lasso", "construire_foret"):
+        construire = getattr(backtest, nom)
+
+        def espion(*args, _construire=construire, **kwargs):
+            estimateur = _construire(*args, **kwargs)
+            fit = estimateur.fit
+
+            def fit_espion(X, y):
+                vues.append(donnees["df"].loc[X.index, "annee"].unique())
+                return fit(X, y)
+
+            estimateur.fit = fit_espion
+            return estimateur
+
+        monkeypatch.setattr(backtest, nom, espion)
+
+    predictions = evaluer_pli(modele, 2019, donnees)
+    assert predictions["origine"].eq(2019).all()
+    assert len(predictions) == 12 and predictions["predit"].notna().all()
+    if modele != "naif":
+        assert len(vues) == 1 and set(vues[0]) and max(vues[0]) < 2019
+
+
+def test_evaluer_pli_modele_inconnu(donnees):
+    with pytest.raises(ValueError, match="Modèle inconnu"):
+        evaluer_pli("arima", 2019, donnees)
+
+
+def test_tableau_metriques():
+    predictions = pd.DataFrame({
+        "modele": ["naif"] * 4 + ["lasso"] * 4,
+        "origine": [2018, 2018, 2019, 2019] * 2,
+        "region": ["A", "B", "A", "B"] * 2,
+        "reel": [10.0, 20.0, 30.0, 40.0] * 2,
+        "predit": [10.0, 20.0, 30.0, 40.0, 12.0, 18.0, 33.0, 37.0],
+    })
+    tableau = tableau_metriques(predictions)
+    # 2 modèles x (global + 2 années + 2 régions)
+    assert tableau.shape == (10, 7)
+    assert tableau.columns.tolist() == ["modele", "niveau", "valeur", "n", "rmse", "mae", "r2"]
+    assert tableau.groupby("niveau").size().to_dict() == {"annee": 4, "global": 2, "region": 4}
+    globale = tableau[tableau["niveau"] == "global"].set_index("modele")
+    assert globale.loc["naif", ["rmse", "mae", "r2"]].tolist() == [0.0, 0.0, 1.0]
+    assert globale.loc["lasso", "n"] == 4
+    assert globale.loc["lasso", "mae"] == pytest.approx(2.5)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.errors import MergeError
+
+from src.build_bases import merge_dataset, split_coords
+
+
+def test_split_coords():
+    coords = pd.Series(
+        ["48.85, 2.35", " -21.1 ,55.5 ", "1_0,2", "１２,３", None, "48.8; 2.3",
+         "1,2,3", "nan, 2", "inf,1", "91,2", "45,-181", "abc,2"],
+        index=range(10, 22),
+    )
+    out = split_coords(coords)
+    assert out.index.tolist() == coords.index.tolist()
+    assert out["coords_valides"].tolist() == [True] * 4 + [False] * 8
+    # Même lecture des nombres que float()
+    assert out["latitude"].iloc[:4].tolist() == [48.85, -21.1, 10.0, 12.0]
+    assert out["longitude"].iloc[:4].tolist() == [2.35, 55.5, 2.0, 3.0]
+    # Coordonnée rejetée : les deux parties manquent
+    assert out.loc[~out["coords_valides"], ["latitude", "longitude"]].isna().all().all()
+
+
+def test_split_coords_vide():
+    out = split_coords(pd.Series([], dtype=object))
+    assert out.columns.tolist() == ["latitude", "longitude", "coords_valides"]
+    assert len(out) == 0 and out["latitude"].dtype == np.float64
+
+
+def test_merge_dataset_cles_uniques():
+    musees = pd.DataFrame({
+        "id_museofile": ["M1", "M2"], "nom_officiel": ["a", "b"], "region": ["R", "R"],
+        "departement": ["D", "D"], "categorie": ["c", "c"], "domaine_thematique": ["d", "d"],
+        "annee_creation": [1900.0, np.nan], "latitude": [45.0, 46.0], "longitude": [2.0, 3.0],
+    })
+    fact_freq = pd.DataFrame({
+        "id_patrimostat": ["P1", "P1", "P2", "P3"], "id_museofile": ["M1", "M1", "M2", "M9"],
+        "annee": [2018, 2019, 2019, 2019], "total": [10, 12, 5, 7],
+    })
+    fact_excel = pd.DataFrame({"id_patrimostat": ["P1", "P2"], "annee": [2018, 2019],
+                               "total_frequentation": [11.0, 6.0]})
+
+    df = merge_dataset(musees, fact_freq, fact_excel)
+    assert len(df) == len(fact_freq)
+    assert df["nom_officiel"].isna().tolist() == [False, False, False, True]
+    assert df["total_frequentation"].fillna(-1).tolist() == [11, -1, 6, -1]
+
+    # Clé de dimension dupliquée : MergeError, là où pd.merge dupliquait les lignes
+    with pytest.raises(MergeError, match="musees"):
+        merge_dataset(pd.concat([musees, musees.iloc[[0]]]), fact_freq, fact_excel)
+    with pytest.raises(MergeError, match="fact_excel"):
+        merge_dataset(musees, fact_freq, pd.concat([fact_excel, fact_excel.iloc[[1]]]))
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from src.cache import charger_avec_cache
+
+
+def _ecrire(chemin, valeurs):
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"x": valeurs}).to_csv(chemin, index=False)
+    return chemin
+
+
+def test_caches_de_deux_dossiers_coexistent(tmp_path):
+    cache_dir = tmp_path / "cache"
+    reel = _ecrire(tmp_path / "data" / "source.csv", [1, 2])
+    synth = _ecrire(tmp_path / "data_synth" / "source.csv", [3, 4, 5])
+    appels = []
+
+    def lecteur(chemin):
+        appels.append(chemin)
+        return pd.read_csv(chemin)
+
+    for chemin in (reel, synth, reel, synth):
+        charger_avec_cache(chemin, lecteur, cache_dir=cache_dir)
+    # Un parsing par dossier : le cache de l'un n'évince pas celui de l'autre
+    assert appels == [reel, synth]
+    assert len(list(cache_dir.glob("*.arrow"))) == 2
+    assert charger_avec_cache(reel, lecteur, cache_dir=cache_dir)["x"].tolist() == [1, 2]
+
+    # Fichier modifié : seule son ancienne version est remplacée
+    _ecrire(reel, [1, 2, 6])
+    assert charger_avec_cache(reel, lecteur, cache_dir=cache_dir)["x"].tolist() == [1, 2, 6]
+    assert len(list(cache_dir.glob("*.arrow"))) == 2
+    assert charger_avec_cache(synth, lecteur, cache_dir=cache_dir)["x"].tolist() == [3, 4, 5]
+    assert appels == [reel, synth, reel]
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.carte import agreger_musees, geojson_points, points_carte, popups_html, theme_carte
+
+
+@pytest.fixture
+def df():
+    # M1 sur deux ans, M2 sans coordonnées, une ligne sans identifiant
+    return pd.DataFrame({
+        "id_museofile": ["M1", "M1", "M2", None, "M3"],
+        "nom_officiel": ["Musée <Arts> & Métiers", "Musée <Arts> & Métiers", "Sans GPS", "Anonyme", "Musée d'histoire"],
+        "ville": ["Paris", "Paris", "Lyon", "Nice", np.nan],
+        "annee": [2022, 2023, 2023, 2023, np.nan],
+        "total": [1000.0, 2500.4, 10.0, 5.0, np.nan],
+        "latitude": [48.86, 48.86, np.nan, 43.7, 45.0],
+        "longitude": [2.35, 2.35, 4.8, 7.27, 1.0],
+        "is_beaux_arts": [1, 1, 0, 0, 0],
+        "is_histoire": [1, 1, 0, 0, 1],
+    })
+
+
+def test_theme_carte(df):
+    # Premier thème trouvé dans l'ordre de DOMAINES_THEMES, colonnes absentes ignorées
+    assert theme_carte(df).tolist() == ["Art & Beaux-Arts"] * 2 + ["Autre"] * 2 + ["Histoire"]
+    assert theme_carte(df[["total"]]).eq("Autre").all()
+
+
+def test_points_carte_et_popups(df):
+    points = points_carte(df)
+    # Coordonnées manquantes écartées, index remis à zéro
+    assert points["id_museofile"].tolist() == ["M1", "M1", None, "M3"]
+    assert points.index.tolist() == [0, 1, 2, 3]
+
+    popup = points.loc[1, "popup"]
+    assert "Musée &lt;Arts&gt; &amp; Métiers" in popup and "<Arts>" not in popup
+    assert "<b>Visiteurs (2023) :</b> 2,500" in popup
+    assert points.loc[0, "tooltip"] == "Musée &lt;Arts&gt; &amp; Métiers (Art & Beaux-Arts)"
+    # Année inconnue : "?" ; effectif inconnu : 0
+    assert "Visiteurs (?) :</b> 0" in points.loc[3, "popup"]
+    assert popups_html(points).index.equals(points.index)
+
+
+def test_agreger_musees(df):
+    musees = agreger_musees(df)
+    # Une ligne par musée localisé et identifié, sa dernière année
+    assert sorted(musees["id_museofile"]) == ["M1", "M3"]
+    m1 = musees.set_index("id_museofile").loc["M1"]
+    assert m1["annee"] == 2023 and m1["annees_connues"] == 2
+    assert m1["total_moyen"] == pytest.approx(1750.2)
+    assert {"theme", "popup", "tooltip"} <= set(musees.columns)
+
+
+def test_geojson_points(df):
+    points = points_carte(df)
+    collection = json.loads(json.dumps(geojson_points(points)))
+    assert collection["type"] == "FeatureCollection"
+    assert len(collection["features"]) == len(points)
+    feature = collection["features"][0]
+    assert feature["geometry"] == {"type": "Point", "coordinates": [2.35, 48.86]}
+    assert feature["properties"] == {"popup": points.loc[0, "popup"], "tooltip": points.loc[0, "tooltip"]}
+    assert geojson_points(points.iloc[:0])["features"] == []
+
+
+def test_carte_musees(df):
+    pytest.importorskip("folium")
+    from src.carte import carte_musees
+
+    rendu = carte_musees(points_carte(df)).get_root().render()
+    # Un calque par thème présent
+    assert "Histoire" in rendu and "Sciences & Techniques" not in rendu
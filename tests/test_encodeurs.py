@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+from src.encodeurs import EncodeurDomaines, nettoyer_domaines
+
+
+@pytest.fixture
+def domaines():
+    return pd.Series(
+        ["Beaux-Arts; Histoire", "histoire", None, "Beaux-arts.", "Sciences"],
+        index=[10, 11, 12, 13, 14],
+    )
+
+
+def test_fit_transform_memes_entrees(domaines):
+    enc = EncodeurDomaines(seuil=1).fit(domaines)
+    out = enc.transform(domaines)
+    assert out.index.tolist() == domaines.index.tolist()
+    assert out["is_beaux_arts"].tolist() == [1, 0, 0, 1, 0]
+    assert out["is_histoire"].tolist() == [1, 1, 0, 0, 0]
+    assert "is_sciences" not in out
+
+
+def test_matrice_coherente_avec_transform(domaines):
+    enc = EncodeurDomaines(seuil=1).fit(domaines)
+    assert (enc.matrice(domaines).toarray() == enc.transform(domaines).to_numpy()).all()
+
+
+def test_domaine_list_refusee(domaines):
+    enc = EncodeurDomaines(seuil=1).fit(domaines)
+    with pytest.raises(TypeError):
+        enc.transform(nettoyer_domaines(domaines)["domaine_list"])
+
+
+def test_non_ajuste(domaines):
+    with pytest.raises(ValueError):
+        EncodeurDomaines().transform(domaines)
+
+
+def _categories_reference(categories, seuil_rare=10):
+    # Version d'origine de clean_and_enrich : apply + replace(MAP_CAT) + rares
+    from src.encodeurs import MAP_CAT, clean_cat_text
+
+    out = categories.apply(clean_cat_text).replace(MAP_CAT)
+    compte = out.value_counts()
+    out[out.isin(compte[compte < seuil_rare].index)] = "Autre"
+    return out
+
+
+@pytest.fixture
+def categories():
+    return pd.Series(
+        ["Maison des illustres"] * 3
+        + ["Musée de France", "musée de france.", " MUSÉE  DE FRANCE "]
+        + ["Musée de site ; Musée en zone rurale"] * 2  # vers " musée en milieu rural"
+        + ["Ecomusée, Musée de site", "Label inconnu", None, None],
+        index=range(100, 112),
+    )
+
+
+@pytest.mark.parametrize("seuil", [1, 2, 3, 4])
+def test_normaliseur_categories_parite(categories, seuil):
+    from src.encodeurs import NormaliseurCategories
+
+    out = NormaliseurCategories(seuil_rare=seuil).fit(categories).transform(categories)
+    assert isinstance(out.dtype, pd.CategoricalDtype)
+    pd.testing.assert_series_equal(out.astype(object), _categories_reference(categories, seuil).astype(object))
+
+
+def test_normaliseur_categories_parite_museofile(sources_reelles):
+    from src.encodeurs import NormaliseurCategories
+
+    categories = sources_reelles[2]["Categorie"]
+    out = NormaliseurCategories().fit(categories).transform(categories)
+    pd.testing.assert_series_equal(out.astype(object), _categories_reference(categories).astype(object))
+
+
+def test_rapport_non_mappees(categories):
+    from src.encodeurs import NormaliseurCategories
+
+    normaliseur = NormaliseurCategories(seuil_rare=2).fit(categories)
+    rapport = normaliseur.rapport_non_mappees(categories)
+    # Ni clé ni cible de MAP_CAT : "musée de france" (3 graphies), le label
+    # inconnu et "ecomusée/ musée de site" (virgule sans espace après nettoyage)
+    assert sorted(rapport["categorie_nettoyee"]) == (
+        ["ecomusée/ musée de site", "label inconnu"] + ["musée de france"] * 3
+    )
+    inconnu = rapport.set_index("categorie_nettoyee").loc["label inconnu"]
+    assert inconnu["n_lignes"] == 1 and inconnu["regroupee_autre"]
+    assert not rapport.loc[rapport["categorie_nettoyee"] == "musée de france", "regroupee_autre"].any()
+    assert rapport["n_lignes"].sum() == 5
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features import PanelAnnuel, calculer_features
+
+
+def _decalage_naif(df, col, k):
+    # t-k par recherche de (musée, annee - k) ; première ligne en cas de doublon
+    reference = df.dropna(subset=["id"]).drop_duplicates(["id", "annee"])
+    valeurs = reference.set_index(["id", "annee"])[col]
+    cles = pd.MultiIndex.from_arrays([df["id"], df["annee"] - k])
+    out = valeurs.reindex(cles).to_numpy(dtype=float)
+    out[df["id"].isna().to_numpy()] = np.nan
+    return out
+
+
+def test_lags_avec_trous_manquants_et_doublons():
+    df = pd.DataFrame({
+        "id":    ["A", "A", "A", "B", None, "B", "B", "A"],
+        "annee": [2021, 2018, 2019, 2019, 2020, 2020, 2020, 2022],
+        "x":     [3.0, 1.0, 2.0, 10.0, 99.0, 20.0, 21.0, 4.0],
+    })
+    panel = PanelAnnuel(df, cle="id")
+    # A : 2020 manque, le t-1 de 2021 est vide (pas 2019)
+    assert np.isnan(panel.decaler(df["x"].to_numpy(), 1)[0])
+    assert panel.decaler(df["x"].to_numpy(), 2)[0] == 2.0
+    # Sans identifiant : pas de passé ; doublon B 2020 : la première ligne sert
+    assert panel.positions(1)[4] == -1
+    assert panel.positions(1)[[5, 6]].tolist() == [3, 3]
+    assert panel.positions(1)[7] == 0
+    for k in (1, 2, 3):
+        np.testing.assert_array_equal(panel.decaler(df["x"].to_numpy(), k), _decalage_naif(df, "x", k))
+
+
+def test_lags_aleatoires_contre_naif():
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        "id": pd.Series(rng.choice(["M1", "M2", "M3", "M4", None], size=n), dtype=object),
+        "annee": rng.integers(2010, 2024, size=n),
+        "x": rng.normal(size=n),
+    })
+    panel = PanelAnnuel(df, cle="id")
+    for k in (1, 2, 5):
+        np.testing.assert_array_equal(panel.decaler(df["x"].to_numpy(), k), _decalage_naif(df, "x", k))
+
+
+def test_panel_vide():
+    panel = PanelAnnuel(pd.DataFrame({"id_museofile": [], "annee": []}))
+    assert len(panel.positions(1)) == 0
+
+
+@pytest.fixture
+def panel_simple():
+    return pd.DataFrame({
+        "id_museofile": ["A", "A", "A", "A", "B"],
+        "annee": [2019, 2020, 2021, 2023, 2020],
+        "total": [100.0, 0.0, 50.0, 80.0, np.nan],
+    }, index=[5, 6, 7, 8, 9])
+
+
+def test_calculer_features(panel_simple):
+    out = calculer_features(
+        panel_simple, lags={"total": (1,)}, maximum={"total": (3,)},
+        moyenne={"total": (2,)}, croissance={"total": (1,)},
+    )
+    assert out.index.tolist() == panel_simple.index.tolist()
+    np.testing.assert_array_equal(out["total_t_1"], [np.nan, 100, 0, np.nan, np.nan])
+    np.testing.assert_array_equal(out["total_max_3ans"], [np.nan, 100, 100, 50, np.nan])
+    np.testing.assert_array_equal(out["total_moy_2ans"], [np.nan, 100, 50, 50, np.nan])
+    # t-1 nul : croissance non définie
+    np.testing.assert_array_equal(out["croissance_total"], [np.nan, -1, np.nan, np.nan, np.nan])
@@ -0,0 +1,53 @@
+import json
+
+import pandas as pd
+
+from src.encodeurs import EncodeurDomaines, NormaliseurCategories
+from src.incremental import FICHIER_ETAT, build_complet, build_incremental
+from src.stockage import NOMS_SORTIES, lire_table
+
+
+def _comparer_au_build_complet(freq_raw, ent_raw, museo_raw, dir_inc, dir_complet):
+    # Build complet avec les composants figés par le build incrémental
+    etat = json.loads((dir_inc / FICHIER_ETAT).read_text())
+    build_complet(
+        freq_raw, ent_raw, museo_raw, dir_complet,
+        encodeur=EncodeurDomaines.from_dict(etat["encodeur_domaines"]),
+        normaliseur=NormaliseurCategories.from_dict(etat["normaliseur_categories"]),
+    )
+    for nom in ("fact_freq", "df_modele"):
+        pd.testing.assert_frame_equal(
+            lire_table(NOMS_SORTIES[nom], output_dir=dir_inc),
+            lire_table(NOMS_SORTIES[nom], output_dir=dir_complet),
+        )
+
+
+def test_modification_dans_la_periode_excel(sources_reelles, tmp_path):
+    # Total 2014 manquant (complété par l'Excel), puis 2015 modifié : le lag
+    # de 2015 doit venir de l'Excel 2014, relu en contexte
+    freq_raw, ent_raw, museo_raw = sources_reelles
+    musee = ent_raw["IDPatrimostat"] == "7510706"
+    ent_raw = ent_raw.copy()
+    ent_raw.loc[musee & (ent_raw["annee"] == 2014), "total"] = float("nan")
+    build_complet(freq_raw, ent_raw, museo_raw, tmp_path / "incremental")
+
+    ent_modifie = ent_raw.copy()
+    ent_modifie.loc[musee & (ent_modifie["annee"] == 2015), "total"] = 50000.0
+    build_incremental(freq_raw, ent_modifie, museo_raw, tmp_path / "incremental")
+
+    df = lire_table(NOMS_SORTIES["df_modele"], output_dir=tmp_path / "incremental")
+    ligne = df[(df["id_patrimostat"].astype(str) == "7510706") & (df["annee"] == 2015)]
+    assert ligne["total_t_1"].tolist() == [58195]
+    _comparer_au_build_complet(
+        freq_raw, ent_modifie, museo_raw, tmp_path / "incremental", tmp_path / "complet"
+    )
+
+
+def test_ajout_derniere_annee(sources_reelles, tmp_path):
+    freq_raw, ent_raw, museo_raw = sources_reelles
+    derniere = ent_raw["annee"].max()
+    build_complet(freq_raw, ent_raw[ent_raw["annee"] != derniere], museo_raw, tmp_path / "incremental")
+    build_incremental(freq_raw, ent_raw, museo_raw, tmp_path / "incremental")
+    _comparer_au_build_complet(
+        freq_raw, ent_raw, museo_raw, tmp_path / "incremental", tmp_path / "complet"
+    )
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.errors import MergeError
+
+from src.jointures import IndexDimension, jointure_gauche
+
+
+@pytest.fixture
+def tables():
+    gauche = pd.DataFrame({
+        "id": ["A", "B", None, "C", "A", "Z", None],
+        "region": ["IDF", "IDF", "Bretagne", None, "IDF", "Bretagne", None],
+        "annee": [2020, 2021, 2020, 2020, 2022, 2021, 2021],
+        "nom": ["ancien"] * 7,
+    })
+    musees = pd.DataFrame({
+        "id": ["A", "B", "C", None],
+        "nom": ["Louvre", "Orsay", "Quai", "sans id"],
+        "ville": pd.Categorical(["Paris", "Paris", None, "Brest"]),
+    })
+    regions = pd.DataFrame({
+        "region": ["IDF", "Bretagne", None],
+        "annee": [2020, 2020, 2021],
+        "population": [12.3, 3.4, 0.0],
+    })
+    return gauche, musees, regions
+
+
+def _merges(gauche, musees, regions):
+    attendu = gauche.drop(columns="nom").merge(musees, on="id", how="left", validate="many_to_one")
+    return attendu.merge(regions, on=["region", "annee"], how="left", validate="many_to_one")
+
+
+def test_equivalent_aux_merges(tables):
+    gauche, musees, regions = tables
+    joint, non_apparies = jointure_gauche(gauche, [
+        (IndexDimension(musees, ["id"], "musees"), ["nom", "ville"]),
+        (IndexDimension(regions, ["region", "annee"], "regions"), ["population"]),
+    ])
+    attendu = _merges(gauche, musees, regions)
+    pd.testing.assert_frame_equal(joint, attendu[joint.columns])
+    assert non_apparies["musees"].to_dict("records") == [{"id": "Z", "n_lignes": 1}]
+    assert non_apparies["regions"]["n_lignes"].tolist() == [1, 1, 1, 1]
+
+
+def test_cles_categorielles(tables):
+    gauche, musees, regions = tables
+    gauche = gauche.astype({"id": "category", "region": "category"})
+    # Catégories différentes de celles de la dimension
+    gauche["id"] = gauche["id"].cat.add_categories(["Y"])
+    joint, _ = jointure_gauche(gauche, [
+        (IndexDimension(musees.astype({"id": "category"}), ["id"], "musees"), ["nom", "ville"]),
+        (IndexDimension(regions, ["region", "annee"], "regions"), ["population"]),
+    ])
+    attendu = _merges(tables[0], musees, regions)
+    pd.testing.assert_frame_equal(
+        joint[["nom", "ville", "population"]], attendu[["nom", "ville", "population"]]
+    )
+
+
+def test_aleatoire_contre_merge():
+    rng = np.random.default_rng(1)
+    modalites = np.array(["a", "b", "c", "d", None], dtype=object)
+    dimension = pd.DataFrame({"k1": modalites[:4].repeat(3), "k2": np.tile([1, 2, 3], 4)})
+    dimension["valeur"] = rng.normal(size=len(dimension))
+    gauche = pd.DataFrame({
+        "k1": rng.choice(modalites, size=300), "k2": rng.integers(0, 5, size=300),
+    })
+    joint, non_apparies = jointure_gauche(gauche, [(IndexDimension(dimension, ["k1", "k2"]), ["valeur"])])
+    attendu = gauche.merge(dimension, on=["k1", "k2"], how="left")
+    pd.testing.assert_frame_equal(joint, attendu)
+    assert non_apparies["dimension"]["n_lignes"].sum() == attendu["valeur"].isna().sum()
+
+
+def test_cle_non_unique():
+    dimension = IndexDimension(pd.DataFrame({"id": ["A", "A"], "v": [1, 2]}), ["id"])
+    with pytest.raises(MergeError):
+        dimension.positions(pd.DataFrame({"id": ["A"]}))
+
+    dimension = IndexDimension(pd.DataFrame({"id": ["A", "B"], "v": [1, 2]}), ["id"])
+    gauche = pd.DataFrame({"id": ["A", "A"]})
+    assert dimension.positions(gauche).tolist() == [0, 0]
+    with pytest.raises(MergeError):
+        dimension.positions(gauche, validate="one_to_one")
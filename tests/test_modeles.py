@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modeles import (
+    COLONNES_EXCLUES_RF, FEATURES_CAT, FEATURES_NUM, FEATURES_SPATIALES, charger_modele,
+    entrainer_lasso, indicatrices_structurelles, plis_par_musee, preparer_variables, sauver_modele,
+)
+
+
+@pytest.fixture
+def panel():
+    # 20 musées sur 2016-2023, fréquentation propre à chaque musée
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"id_museofile": [f"M{i:02d}" for i in range(20)]}).merge(
+        pd.DataFrame({"annee": range(2016, 2024)}), how="cross"
+    )
+    niveau = df["id_museofile"].str[1:].astype(int).to_numpy() + 1
+    df["total"] = (niveau * 10_000 * rng.uniform(0.8, 1.2, len(df))).round()
+    df["region"] = np.where(niveau % 2, "Bretagne", "Île-de-France")
+    df["est_idf"] = (niveau % 2 == 0).astype(int)
+    df["age_musee"] = 30.0
+    for col in ("part_gratuit", "part_scolaires", "part_individuels"):
+        df[col] = rng.uniform(0, 1, len(df))
+    return df
+
+
+def test_preparer_variables_colonnes(panel):
+    df = preparer_variables(panel)
+    assert set(FEATURES_NUM + FEATURES_CAT) <= set(df.columns)
+    assert not set(FEATURES_SPATIALES) & set(df.columns)
+    assert len(df) == len(panel) and df.index.equals(panel.index)
+    premiere = df["annee"] == 2016
+    assert df.loc[premiere, "log_total_t_1"].isna().all()
+    np.testing.assert_allclose(df.loc[~premiere, "log_total_t_1"], np.log1p(df.loc[~premiere, "total_t_1"]))
+    assert df["is_geant"].tolist() == (df["total_max_3ans"] > 100000).astype(int).tolist()
+    assert df.loc[df["annee"] == 2020, "is_covid"].eq(1).all()
+
+
+def test_indicatrices_structurelles_sans_historique(panel):
+    df = preparer_variables(panel)
+    X = indicatrices_structurelles(df)
+    assert not set(COLONNES_EXCLUES_RF) & set(X.columns)
+    assert "annee" in X.columns and "region_Île-de-France" in X.columns
+    # Alignement sur les variables d'un modèle entraîné
+    alignees = indicatrices_structurelles(df.head(1), features=["age_musee", "region_Corse"])
+    assert alignees.columns.tolist() == ["age_musee", "region_Corse"]
+    assert alignees["region_Corse"].tolist() == [0]
+
+
+def test_plis_par_musee(panel):
+    plis = plis_par_musee(panel["id_museofile"])
+    assert len(plis) == 5
+    for train, test in plis:
+        assert not set(panel["id_museofile"].iloc[train]) & set(panel["id_museofile"].iloc[test])
+    # Mêmes musées par pli quel que soit l'ordre des lignes
+    melange = panel.sample(frac=1, random_state=1)
+    assert _musees_par_pli(melange) == _musees_par_pli(panel)
+
+
+def _musees_par_pli(df):
+    return sorted(sorted(set(df["id_museofile"].iloc[test])) for _, test in plis_par_musee(df["id_museofile"]))
+
+
+# is_reprise vaut 0 à l'entraînement, 1 en 2022-2023
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+def test_sauver_charger_modele(panel, tmp_path):
+    df = preparer_variables(panel)
+    paquet = entrainer_lasso(df, annee_coupure=2022, n_jobs=1, memoire=None)
+    assert paquet["features"] == FEATURES_NUM + FEATURES_CAT and not paquet["spatial"]
+    assert set(paquet["metriques"]) == {"rmse", "rmse_naive", "mae", "r2"}
+
+    chemin = sauver_modele(paquet, "lasso", dossier=tmp_path)
+    assert chemin == tmp_path / "lasso.joblib"
+    relu = charger_modele("lasso", dossier=tmp_path)
+    for cle in ("features", "empreinte_donnees", "n_lignes", "annee_coupure", "metriques", "sklearn"):
+        assert relu[cle] == paquet[cle]
+    X = df.loc[df["annee"] == 2023, paquet["features"]]
+    np.testing.assert_array_equal(relu["modele"].predict(X), paquet["modele"].predict(X))
+
+
+def test_charger_modele_autre_version(tmp_path):
+    paquet = {"modele": None, "features": [], "sklearn": "0.0"}
+    sauver_modele(paquet, "ancien", dossier=tmp_path)
+    with pytest.warns(UserWarning, match="scikit-learn 0.0"):
+        charger_modele("ancien", dossier=tmp_path)
@@ -0,0 +1,45 @@
+import pytest
+
+from src.pipeline import Etape, _sources_utilisees, cles_etapes, empreinte_code, ordre_topologique
+
+SEUIL = 10
+MOTS = {"a", "b"}
+
+
+def _aide(x):
+    return x + SEUIL
+
+
+def _etape(x):
+    return _aide(x) if x not in MOTS else x
+
+
+def _autre(x):
+    return x
+
+
+def test_empreinte_limitee_au_code_appele():
+    sources = _sources_utilisees(_etape)
+    assert f"{__name__}._aide" in sources
+    assert f"{__name__}.SEUIL" in sources
+    assert f"{__name__}._autre" not in sources
+
+
+def test_empreinte_suit_les_constantes(monkeypatch):
+    avant = empreinte_code(_etape)
+    monkeypatch.setattr(f"{__name__}.SEUIL", 11)
+    assert empreinte_code(_etape) != avant
+    assert empreinte_code(_autre) == empreinte_code(_autre)
+
+
+def test_cles_propagees_aux_descendantes(monkeypatch):
+    etapes = [Etape("a", _autre), Etape("b", _etape, ("a",)), Etape("c", _autre, ("a",))]
+    avant = cles_etapes(etapes)
+    monkeypatch.setattr(f"{__name__}.SEUIL", 11)
+    apres = cles_etapes(etapes)
+    assert [n for n in avant if avant[n] != apres[n]] == ["b"]
+
+
+def test_cycle_detecte():
+    with pytest.raises(ValueError, match="Cycle"):
+        ordre_topologique([Etape("a", _autre, ("b",)), Etape("b", _autre, ("a",))])
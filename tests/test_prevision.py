@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.modeles import preparer_variables
+from src.prevision import matrice
+from src.spatial import IndexSpatial
+
+
+@pytest.fixture
+def panel():
+    # 3 musées sur 4 ans, deux à Paris, un à Lyon
+    musees = pd.DataFrame({
+        "id_museofile": ["M1", "M2", "M3"],
+        "latitude": [48.86, 48.87, 45.76],
+        "longitude": [2.34, 2.33, 4.83],
+    })
+    df = musees.merge(pd.DataFrame({"annee": [2019, 2020, 2021, 2022]}), how="cross")
+    df["total"] = np.arange(len(df), dtype=float) * 1000
+    df["age_musee"] = 20.0
+    for col in ("part_gratuit", "part_scolaires", "part_individuels"):
+        df[col] = 0.5
+    return musees, df
+
+
+def test_foret_spatiale_sans_index_refusee(panel):
+    musees, df = panel
+    paquet = {"features": ["latitude", "n_musees_10km"], "medianes": {}, "modele": None}
+    with pytest.raises(ValueError, match="voisinage"):
+        matrice(paquet, preparer_variables(df))
+
+    X = matrice(paquet, preparer_variables(df, IndexSpatial(musees)))
+    # Deux musées parisiens à moins de 10 km l'un de l'autre, Lyon isolé
+    assert X.groupby(df["id_museofile"])["n_musees_10km"].first().tolist() == [1, 1, 0]
+
+
+class _Constant:
+    def predict(self, X):
+        return np.full(len(X), 100.0)
+
+
+def test_lasso_sans_historique_non_score(panel):
+    _, df = panel
+    from src.modeles import FEATURES_NUM
+    from src.prevision import scorer
+
+    donnees = preparer_variables(df)
+    donnees = donnees[donnees["annee"] == 2022].reset_index(drop=True)
+    donnees.loc[0, "total_t_3"] = np.nan
+    donnees.loc[0, "log_total_t_3"] = np.nan
+    resultats = scorer({"features": FEATURES_NUM, "modele": _Constant()}, donnees)
+    assert resultats["Predit"].isna().tolist() == [True, False, False]
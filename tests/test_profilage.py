@@ -0,0 +1,66 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src import profilage
+from src.profilage import Profileur, afficher, apercu
+from src.schema import appliquer_schema
+
+
+def test_etape_et_profiler():
+    profileur = Profileur()
+    entree = pd.DataFrame({"x": range(1000)})
+    with profileur.etape("double", entrees={"entree": entree, "n": 2}, statut="calcul") as m:
+        m["sortie"] = pd.concat([entree, entree])
+    somme = profileur.profiler(lambda df: df["x"].sum(), nom="somme")(entree)
+
+    assert somme == 499500
+    assert [m["etape"] for m in profileur.mesures] == ["double", "somme"]
+    mesure = profileur.mesures[0]
+    assert mesure["statut"] == "calcul"
+    assert mesure["entrees"]["entree"]["forme"] == [1000, 1]
+    assert mesure["entrees"]["n"] is None
+    assert mesure["sortie"]["forme"] == [2000, 1]
+    assert mesure["duree_s"] >= 0 and mesure["pic_tracemalloc_mo"] >= 0
+    # Une sortie non tabulaire n'est pas décrite
+    assert profileur.mesures[1]["sortie"] is None
+
+
+def test_etape_mesuree_malgre_exception():
+    profileur = Profileur(memoire=False)
+    with pytest.raises(KeyError):
+        with profileur.etape("echec"):
+            raise KeyError("x")
+    assert profileur.mesures[0]["etape"] == "echec"
+    assert profileur.mesures[0]["pic_tracemalloc_mo"] is None
+
+
+def test_exporter(tmp_path):
+    profileur = Profileur(memoire=False)
+    with profileur.etape("a", entrees={"df": pd.DataFrame({"x": [1, 2]})}) as m:
+        m["sortie"] = pd.DataFrame({"x": [1], "y": [2]})
+    with profileur.etape("b"):
+        pass
+
+    profileur.exporter(tmp_path / "profil" / "mesures.json")
+    relu = json.loads((tmp_path / "profil" / "mesures.json").read_text())
+    assert relu == json.loads(json.dumps(profileur.mesures))
+
+    profileur.exporter(tmp_path / "mesures.csv")
+    tableau = pd.read_csv(tmp_path / "mesures.csv")
+    assert tableau["etape"].tolist() == ["a", "b"]
+    assert tableau.loc[0, "forme_sortie"] == "1x2" and tableau.loc[0, "lignes_entree"] == 2
+    assert tableau.loc[1, ["forme_sortie", "lignes_entree"]].isna().all()
+
+
+@pytest.mark.parametrize("actifs", [True, False])
+def test_mode_silencieux(actifs, monkeypatch, capsys):
+    monkeypatch.setattr(profilage, "_APERCUS", actifs)
+    df = pd.DataFrame({"total": [1.0, 2.0]})
+    apercu("Aperçu", df)
+    afficher("Taille", df.shape)
+    appliquer_schema(df, "t")
+    sortie = capsys.readouterr().out
+    assert ("Aperçu" in sortie and "Taille (2, 1)" in sortie and "Schéma t" in sortie) == actifs
+    assert (sortie == "") != actifs
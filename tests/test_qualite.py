@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from src.qualite import FICHIER_EXCEPTIONS, Regle, charger_exceptions, evaluer, regles_par_defaut
+
+
+def _rapport(resultat):
+    return resultat.rapport.set_index("regle")
+
+
+def test_unicite_exceptions_et_manquants():
+    df = pd.DataFrame({
+        "id_museofile": ["M1", "M1", "M2", "M2", None, None, "M3"],
+        "annee": [2020, 2020, 2020, 2020, 2020, 2020, 2020],
+    })
+    regles = [
+        Regle("stricte", "t", "unicite", ("id_museofile", "annee")),
+        Regle("avec_exception", "t", "unicite", ("id_museofile", "annee"), {"exceptions": ("M1",)}),
+    ]
+    resultat = evaluer({"t": df}, regles)
+    rapport = _rapport(resultat)
+    # Les clés manquantes ne sont pas des doublons
+    assert rapport.loc["stricte", ["n_echecs", "statut"]].tolist() == [4, "echec"]
+    assert rapport.loc["avec_exception", ["n_echecs", "n_exceptions"]].tolist() == [2, 2]
+    assert resultat.echecs("t", "avec_exception")["id_museofile"].tolist() == ["M2", "M2"]
+
+
+def test_plage_somme_et_seuil():
+    df = pd.DataFrame({
+        "payant": [10, 5, -1, np.nan],
+        "gratuit": [0, 5, 1, 3],
+        "total": [10, 11, 0, 3],
+    })
+    regles = [
+        Regle("positifs", "t", "plage", ("payant", "gratuit", "total"), {"min": 0}),
+        Regle("somme", "t", "somme", ("payant", "gratuit", "total"), {"tolerance": 0.01}, seuil=0.3),
+        Regle("info", "t", "non_manquant", ("payant",), seuil=None),
+    ]
+    rapport = _rapport(evaluer({"t": df}, regles))
+    assert rapport.loc["positifs", ["n_echecs", "statut"]].tolist() == [1, "echec"]
+    # 5 + 5 != 11 ; NaN non compté
+    assert rapport.loc["somme", ["n_echecs", "statut"]].tolist() == [1, "ok"]
+    assert rapport.loc["info", ["n_echecs", "statut"]].tolist() == [1, "info"]
+
+
+def test_continuite_avec_contexte():
+    df = pd.DataFrame({"id": ["A", "A", "A", "B", "B"], "annee": [2018, 2019, 2021, 2020, 2021]})
+    regle = Regle("continuite", "t", "continuite", ("id", "annee"), seuil=None)
+    resultat = evaluer({"t": df}, [regle])
+    assert resultat.echecs("t", "continuite")[["id", "annee"]].values.tolist() == [["A", 2021]]
+
+    # Seule l'année 2021 contrôlée, l'historique complet sert de contexte
+    resultat = evaluer({"t": df}, [regle], annees=[2021])
+    assert resultat.echecs("t", "continuite")[["id", "annee"]].values.tolist() == [["A", 2021]]
+
+
+def test_couverture_et_resume():
+    musees = pd.DataFrame({"id_museofile": ["M1", "M2"]})
+    df = pd.DataFrame({"id_museofile": ["M1", "M3", None, "M4"], "annee": [2019, 2020, 2020, 2021]})
+    regle = Regle("couverture", "df", "couverture", ("id_museofile",),
+                  {"reference": "musees", "exceptions": ("M4",)})
+    resultat = evaluer({"df": df, "musees": musees}, [regle],
+                       resume={"df": ["id_museofile", "annee"], "musees": ["id_museofile"]})
+    assert _rapport(resultat).loc["couverture", ["n_echecs", "n_exceptions"]].tolist() == [1, 1]
+    resume = resultat.resume.set_index(["table", "colonne"])
+    assert resume.loc[("df", "id_museofile"), "n_distincts"] == 3
+    assert resume.loc[("df", "annee"), ["min", "max"]].tolist() == [2019, 2021]
+    assert resume.loc[("musees", "id_museofile"), "n_distincts"] == 2
+
+
+def test_exceptions_relues_du_fichier(tmp_path):
+    chemin = tmp_path / "exceptions.csv"
+    pd.DataFrame({
+        "table": ["df_modele", "df_modele", "musees"],
+        "regle": ["musee_annee_unique", "musee_annee_unique", "id_unique"],
+        "id_museofile": ["M1", "M2", "M3"],
+        "motif": ["", "", ""],
+    }).to_csv(chemin, index=False)
+    regles = {(r.table, r.nom): r for r in regles_par_defaut(chemin)}
+    assert regles[("df_modele", "musee_annee_unique")].options["exceptions"] == ("M1", "M2")
+    assert regles[("musees", "id_unique")].options["exceptions"] == ("M3",)
+    assert "exceptions" not in regles[("df_modele", "musee_dans_museofile")].options
+
+    # Fichier versionné : une règle connue et un id_museofile par ligne
+    versionne = pd.read_csv(FICHIER_EXCEPTIONS, dtype=str)
+    cles = set(map(tuple, versionne[["table", "regle"]].values))
+    assert cles <= set(map(tuple, regles)) and not versionne.duplicated(["table", "regle", "id_museofile"]).any()
+    assert len(charger_exceptions()[("df_modele", "musee_dans_museofile")]) == 15
+    assert charger_exceptions(tmp_path / "absent.csv") == {}
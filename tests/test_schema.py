@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.schema import appliquer_schema, en_float
+from src.stockage import ecrire_table, lire_table
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({
+        "id_museofile": ["M1", "M1", None, "M2"],
+        "region": ["IDF", "IDF", "Bretagne", None],
+        "annee": [2021, 2022, 2022, 2023],
+        "total": [1500.0, np.nan, 0.0, 8_000_000.0],
+        "payant": [1000, 20, 0, 3],
+        "est_idf": [1.0, 1.0, 0.0, 0.0],
+        "is_art": [True, True, False, False],
+        "part_gratuit": [0.3, np.nan, 1.0, 0.5],
+    })
+
+
+def test_dtypes_et_valeurs(table):
+    compact = appliquer_schema(table)
+    assert compact.dtypes.astype(str).to_dict() == {
+        "id_museofile": "category", "region": "category", "annee": "int16",
+        "total": "Int32", "payant": "Int32", "est_idf": "uint8", "is_art": "uint8",
+        "part_gratuit": "float64",
+    }
+    # Valeurs identiques une fois repassées en float / objet
+    retour = en_float(compact)
+    assert retour["total"].dtype == "float64"
+    pd.testing.assert_series_equal(retour["total"], table["total"])
+    pd.testing.assert_series_equal(retour["payant"], table["payant"].astype(float))
+    assert compact["region"].isna().equals(table["region"].isna())
+    assert compact["region"].dropna().tolist() == table["region"].dropna().tolist()
+    assert compact["is_art"].tolist() == [1, 1, 0, 0]
+    # Idempotent
+    pd.testing.assert_frame_equal(appliquer_schema(compact), compact)
+
+
+def test_valeurs_refusees(table):
+    with pytest.raises((TypeError, ValueError)):
+        appliquer_schema(table.assign(total=[1.5, 2.0, 3.0, 4.0]))
+    with pytest.raises(ValueError):
+        appliquer_schema(table.assign(est_idf=[0, 1, 2, 300]))
+
+
+def test_aller_retour_parquet(table, tmp_path):
+    compact = appliquer_schema(table)
+    ecrire_table(compact, "t", output_dir=tmp_path)
+    relu = lire_table("t", output_dir=tmp_path)
+    pd.testing.assert_frame_equal(relu.reset_index(drop=True), compact.reset_index(drop=True))
@@ -0,0 +1,16 @@
+from src.build_bases import split_coords
+from src.synthetique import charger_reference, generer_sources
+
+
+def test_sources_au_schema_reel_et_coordonnees_bornees():
+    reference = charger_reference()
+    sources = generer_sources(echelle=0.3, pays=12, reference=reference)
+    for nom, df in sources.items():
+        assert df.columns.tolist() == reference[nom].columns.tolist()
+        assert df.dtypes.tolist() == reference[nom].dtypes.tolist()
+
+    # 12 pays décalés de 20° : longitudes ramenées dans [-180, 180[
+    # (toutes les coordonnées de Museofile sont valides)
+    coords = split_coords(sources["museo_raw"]["Coordonnees"])
+    assert coords["coords_valides"].all()
+    assert coords["longitude"].between(-180, 180).all()